@@ -1,16 +1,46 @@
 
 
-from fastapi import FastAPI
+import os
+from typing import List
+from fastapi import FastAPI, Body, Request
 from uvicorn import run as app_run
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
 
-from train import training as start_training
 from ner.pipeline.prediction_pipeline import ModelPredictor
+from ner.pipeline.batch_scheduler import MicroBatchScheduler
+from ner.pipeline.inference_executor import InferenceExecutor
+from ner.pipeline.stream_pipeline import NdjsonStreamPredictor, NdjsonStreamingResponse
+from ner.pipeline.model_watcher import ModelWatcher
+from ner.entity.config_entity import BatchSchedulerConfig, InferenceExecutorConfig, StreamPredictorConfig, ModelWatcherConfig
+from ner.utils.memory import get_process_memory
+from ner.utils.metrics import CONTENT_TYPE_LATEST, ERRORS, MetricsMiddleware, render_metrics
 from ner.constants import *
+from ner.logger import logging
 
 app= FastAPI()
 
+# long lived predictor, model artifacts are loaded once and reused by every request
+prediction_pipeline= ModelPredictor()
+
+# model loading and forward passes run in a worker pool so they never block the event loop
+inference_executor= InferenceExecutor(model_predictor= prediction_pipeline,
+                                      inference_executor_config= InferenceExecutorConfig())
+
+# concurrent /predict requests are collected into batched forward passes, one batch in flight per inference worker
+batch_scheduler= MicroBatchScheduler(predict_fn= inference_executor.predict_batch,
+                                     batch_scheduler_config= BatchSchedulerConfig(
+                                         max_concurrent_batches= inference_executor.inference_executor_config.max_workers))
+
+# NDJSON uploads are tagged batch by batch and streamed back line by line
+stream_predictor= NdjsonStreamPredictor(predict_fn= inference_executor.predict_batch,
+                                        stream_predictor_config= StreamPredictorConfig())
+
+# new model versions pushed to the bucket are swapped in without a restart
+model_watcher= ModelWatcher(inference_executor= inference_executor,
+                            model_watcher_config= ModelWatcherConfig())
+
 origins=["*"]
 
 app.add_middleware(
@@ -22,11 +52,39 @@ app.add_middleware(
     
 )
 
+# request counts and latencies per route for /metrics
+app.add_middleware(MetricsMiddleware)
+
+
+@app.on_event("startup")
+async def load_model():
+    try:
+        await inference_executor.start()
+        logging.info("Model artifacts loaded at app startup")
+        
+    except Exception as e:
+        # serving still comes up, artifacts are loaded again on the first /predict call
+        logging.info(f"Could not load model artifacts at app startup: {e}")
+        
+    await batch_scheduler.start()
+    await model_watcher.start()
+
+
+@app.on_event("shutdown")
+async def stop_batch_scheduler():
+    await model_watcher.stop()
+    await batch_scheduler.stop()
+    await inference_executor.shutdown()
+
 
 @app.get("/train")
 async def training():
     try:
-        start_training()
+        # the training pipeline (pandas, every component) is only imported when training is requested,
+        # serving workers start without it
+        from train import training as start_training
+
+        await run_in_threadpool(start_training)
         
         return Response("Training successful !!")
     
@@ -37,13 +95,101 @@ async def training():
 @app.post("/predict")
 async def predict_route(text: str):
     try:
-       prediction_pipeline= ModelPredictor() 
-       sentence, prediction_label= prediction_pipeline.initiate_model_predictor(sentence= text)
+       sentence, prediction_label= await batch_scheduler.submit(text)
        
        return sentence, prediction_label        
     
     except Exception as e:
-        raise Response(f"Error Occurred! {e}")
+        ERRORS.labels(route="/predict").inc()
+        return Response(f"Error Occurred! {e}")
+    
+    
+@app.post("/predict/batch")
+async def predict_batch_route(sentences: List[str] = Body(...)):
+    try:
+        predictions= await inference_executor.predict_batch(sentences= sentences)
+        
+        return predictions
+    
+    except Exception as e:
+        ERRORS.labels(route="/predict/batch").inc()
+        return Response(f"Error Occurred! {e}")
+    
+    
+@app.post("/predict/stream")
+async def predict_stream_route(request: Request):
+    # one JSON string or {"text": ...} per request line, one {"line", "text", "labels"} per response line
+    return NdjsonStreamingResponse(stream_predictor.predict_stream(request.stream()))
+    
+    
+@app.post("/predict/document")
+async def predict_document_route(text: str = Body(..., embed=True)):
+    try:
+        sentence, prediction_label= await inference_executor.predict_document(sentence= text)
+        
+        return sentence, prediction_label
+    
+    except Exception as e:
+        ERRORS.labels(route="/predict/document").inc()
+        return Response(f"Error Occurred! {e}")
+    
+    
+@app.get("/predict/stats")
+async def predict_stats_route():
+    stats= batch_scheduler.get_stats()
+    stats["prediction_cache"]= inference_executor.get_cache_stats()
+    # rss/pss of the worker that answered, pss is its real share when the model pages are shared
+    stats["memory"]= dict(pid= os.getpid(), **get_process_memory())
+    
+    return stats
+
+
+@app.get("/metrics")
+async def metrics_route():
+    # every process records its metrics as they happen, a scrape only reads them and never waits for the workers
+    return Response(render_metrics(), media_type= CONTENT_TYPE_LATEST)
+
+
+@app.get("/model/status")
+async def model_status_route():
+    status= await inference_executor.get_model_status()
+    status["watcher"]= model_watcher.get_status()
+    
+    return status
+
+
+@app.post("/model/update")
+async def model_update_route():
+    try:
+        updated= await model_watcher.check()
+        
+        return Response("New model swapped in !!" if updated else "Model is up to date")
+    
+    except Exception as e:
+        ERRORS.labels(route="/model/update").inc()
+        return Response(f"Error Occurred! {e}")
+    
+    
+@app.post("/model/rollback")
+async def model_rollback_route():
+    try:
+        return await inference_executor.rollback()
+    
+    except Exception as e:
+        ERRORS.labels(route="/model/rollback").inc()
+        return Response(f"Error Occurred! {e}")
+
+
+@app.post("/reload")
+async def reload_route():
+    try:
+        await inference_executor.reload()
+        
+        return Response("Model reloaded successfully !!")
+    
+    except Exception as e:
+        ERRORS.labels(route="/reload").inc()
+        return Response(f"Error Occurred! {e}")
     
     
 if __name__ == "__main__":
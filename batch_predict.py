@@ -0,0 +1,39 @@
+import argparse
+import sys
+from ner.constants import *
+from ner.entity.config_entity import BulkPredictorConfig
+from ner.exception import NerException
+from ner.pipeline.bulk_prediction_pipeline import BulkPredictor
+
+
+def batch_predict(args: argparse.Namespace):
+    try:
+        bulk_predictor_config= BulkPredictorConfig(input_path= args.input_path,
+                                                   output_path= args.output_path,
+                                                   text_column= args.text_column,
+                                                   shard_size= args.shard_size,
+                                                   num_workers= args.num_workers,
+                                                   num_threads= args.num_threads)
+        bulk_predictor= BulkPredictor(bulk_predictor_config= bulk_predictor_config)
+
+        return bulk_predictor.initiate_bulk_predictor()
+
+    except Exception as e:
+            raise NerException(e, sys)
+
+
+if __name__ == "__main__":
+    parser= argparse.ArgumentParser(description= "Tag a csv or jsonl file of sentences offline")
+    parser.add_argument("input_path", help= ".csv or .jsonl file of sentences")
+    parser.add_argument("output_path", help= ".jsonl file of {\"text\", \"labels\"} records, in input order")
+    parser.add_argument("--text-column", default= BULK_PREDICTION_TEXT_COLUMN)
+    parser.add_argument("--shard-size", type= int, default= BULK_PREDICTION_SHARD_SIZE)
+    parser.add_argument("--num-workers", type= int, default= BULK_PREDICTION_NUM_WORKERS)
+    parser.add_argument("--num-threads", type= int, default= BULK_PREDICTION_NUM_THREADS)
+
+    bulk_predictor_artifacts= batch_predict(parser.parse_args())
+    print(f"Tagged {bulk_predictor_artifacts.num_sentences} sentences "
+          f"({bulk_predictor_artifacts.sentences_per_second:.1f} sentences/sec), "
+          f"{bulk_predictor_artifacts.num_resumed_sentences} resumed, "
+          f"model version {bulk_predictor_artifacts.model_version}, "
+          f"written to {bulk_predictor_artifacts.output_path}")
@@ -0,0 +1,114 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules the serving process must not import at startup, training is imported lazily on /train
+SERVING_FORBIDDEN_MODULES = [
+    "train",
+    "ner.pipeline.train_pipeline",
+    "ner.components.data_ingestion",
+    "ner.components.data_transformation",
+    "ner.components.model_trainer",
+    "ner.components.model_evaluation",
+    "ner.components.model_pusher",
+    "pandas",
+    "transformers",
+    "yaml",
+]
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+
+def parse_importtime(stderr: str, top: int) -> list:
+    # lines look like "import time:   self [us] | cumulative | imported package"
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.strip()))
+    rows.sort(reverse=True)
+    return [{"module": name, "cumulative_ms": cumulative / 1000} for cumulative, name in rows[:top]]
+
+
+def measure_import(module: str) -> dict:
+    # a fresh interpreter in an empty working directory, so import side effects on disk show up
+    with tempfile.TemporaryDirectory() as work_dir:
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_DIR, os.environ.get("PYTHONPATH")])))
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", IMPORT_SCRIPT.format(module=module)],
+            cwd=work_dir, env=env, capture_output=True, text=True, check=True,
+        )
+        process_seconds = time.perf_counter() - start
+        created_files = sorted(os.listdir(work_dir))
+
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["process_seconds"] = process_seconds
+    result["created_files"] = created_files
+    result["importtime"] = completed.stderr
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure the import time of the serving entry point")
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest modules (cumulative) to report")
+    parser.add_argument("--max-seconds", type=float, default=None, help="fail when the median import is slower")
+    parser.add_argument("--output", default=None, help="write the report as json")
+    args = parser.parse_args()
+
+    runs = [measure_import(args.module) for _ in range(args.repeat)]
+    import_seconds = [run["seconds"] for run in runs]
+    forbidden = [module for module in SERVING_FORBIDDEN_MODULES if module in runs[-1]["modules"]]
+
+    report = {
+        "module": args.module,
+        "repeat": args.repeat,
+        "median_import_seconds": statistics.median(import_seconds),
+        "min_import_seconds": min(import_seconds),
+        "median_process_seconds": statistics.median(run["process_seconds"] for run in runs),
+        "num_modules": len(runs[-1]["modules"]),
+        "forbidden_modules": forbidden,
+        "created_files": runs[-1]["created_files"],
+        "slowest_modules": parse_importtime(runs[-1]["importtime"], args.top),
+    }
+
+    print(f"import {args.module}: median {report['median_import_seconds']:.3f}s, min {report['min_import_seconds']:.3f}s "
+          f"over {args.repeat} runs, {report['num_modules']} modules")
+    for row in report["slowest_modules"]:
+        print(f"  {row['cumulative_ms']:10.1f} ms  {row['module']}")
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+    failures = []
+    if forbidden and args.module == "app":
+        failures.append(f"serving imports training only modules: {', '.join(forbidden)}")
+    if report["created_files"]:
+        failures.append(f"import created files in the working directory: {', '.join(report['created_files'])}")
+    if args.max_seconds is not None and report["median_import_seconds"] > args.max_seconds:
+        failures.append(f"median import {report['median_import_seconds']:.3f}s is above {args.max_seconds}s")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
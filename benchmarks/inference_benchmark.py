@@ -0,0 +1,417 @@
+import argparse
+import itertools
+import json
+import os
+import pickle
+import platform
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import torch
+from ner.constants import *
+
+BACKENDS = ["torch", "quantized", "onnx", "torchscript"]
+
+LABELS = ["O", "B-geo", "I-geo", "B-gpe", "I-gpe", "B-org", "I-org", "B-per", "I-per", "B-tim", "I-tim"]
+
+# words of the synthetic sentences, unknown and multi piece words exercise the sub-token alignment
+WORDS = [
+    "the", "a", "of", "in", "to", "and", "on", "said", "minister", "government", "police", "meeting",
+    "john", "smith", "maria", "london", "paris", "new", "york", "united", "nations", "monday", "march",
+    "company", "reported", "visited", "unbelievable", "reconstruction", "qwzx", "2024", ",", ".",
+]
+
+# keys identifying one benchmark case, results of two runs are compared on these
+CASE_KEYS = ("mode", "backend", "threads", "batch_size", "num_words", "concurrency")
+
+
+def make_tokenizer(work_dir: str):
+    # imported here, transformers is only needed once the fixture is built
+    from transformers import BertTokenizerFast
+
+    # every letter as a word piece, any word of the generator tokenizes without [UNK]
+    letters = "abcdefghijklmnopqrstuvwxyz0123456789"
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", ",", "."] + [word for word in WORDS if word.isalnum()]
+    vocab += list(letters) + [f"##{letter}" for letter in letters] + ["##ing", "##tion", "##able", "##s"]
+    vocab_path = os.path.join(work_dir, "vocab.txt")
+    with open(vocab_path, "w") as vocab_file:
+        vocab_file.write("\n".join(dict.fromkeys(vocab)))
+    return BertTokenizerFast(vocab_file=vocab_path, do_lower_case=True)
+
+
+def make_model(tokenizer, args: argparse.Namespace):
+    from transformers import BertConfig, BertForTokenClassification
+    from model.bert import BertModel
+
+    torch.manual_seed(args.seed)
+    config = BertConfig(
+        vocab_size=tokenizer.vocab_size,
+        hidden_size=args.hidden_size,
+        num_hidden_layers=args.num_layers,
+        num_attention_heads=args.num_heads,
+        intermediate_size=args.hidden_size * 4,
+        max_position_embeddings=PREDICTION_MAX_LENGTH,
+        num_labels=len(LABELS),
+    )
+    # randomly initialized instead of BertModel.__init__, which downloads bert-base-cased
+    model = BertModel.__new__(BertModel)
+    torch.nn.Module.__init__(model)
+    model.bert = BertForTokenClassification(config)
+    return model.eval()
+
+
+def generate_sentences(num_sentences: int, num_words: int, seed: int) -> list:
+    generator = random.Random(seed)
+    return [" ".join(generator.choice(WORDS) for _ in range(num_words)) for _ in range(num_sentences)]
+
+
+def build_fixture(work_dir: str, args: argparse.Namespace) -> str:
+    """
+    Writes the tokenizer, label map and model of every backend into a local bucket, the predictor loads them
+    through its usual download path. Returns the local bucket directory
+    """
+    from model.bert import quantize_model
+    from ner.components.model_exporter import ModelExporter
+    from ner.entity.config_entity import ModelExporterConfig
+
+    bucket_dir = os.path.join(work_dir, "bucket")
+    object_dir = os.path.join(bucket_dir, BUCKET_NAME)
+    os.makedirs(object_dir, exist_ok=True)
+
+    tokenizer = make_tokenizer(work_dir)
+    model = make_model(tokenizer, args)
+    with open(os.path.join(object_dir, TOKENIZER_FILE_NAME), "wb") as tokenizer_file:
+        pickle.dump(tokenizer, tokenizer_file)
+    with open(os.path.join(object_dir, IDS_TO_LABELS_FILE_NAME), "wb") as labels_file:
+        pickle.dump(dict(enumerate(LABELS)), labels_file)
+
+    torch.save(model, os.path.join(object_dir, GCP_MODEL_NAME))
+    if "quantized" in args.backends:
+        torch.save(quantize_model(model), os.path.join(object_dir, GCP_QUANTIZED_MODEL_NAME))
+
+    model_exporter_config = ModelExporterConfig()
+    model_exporter_config.onnx_model_path = os.path.join(object_dir, GCP_ONNX_MODEL_NAME)
+    model_exporter_config.torchscript_model_path = os.path.join(object_dir, GCP_TORCHSCRIPT_MODEL_NAME)
+    model_exporter = ModelExporter(model_trainer_artifact=None, model_exporter_config=model_exporter_config)
+    if "onnx" in args.backends:
+        model_exporter.export_onnx_model(model=model)
+    if "torchscript" in args.backends:
+        model_exporter.export_torchscript_model(model=model)
+
+    return bucket_dir
+
+
+def make_predictor(bucket_dir: str, backend: str, threads: int):
+    from ner.configuration.gcloud import GCloud
+    from ner.pipeline.prediction_pipeline import ModelPredictor
+    from ner.utils.prediction_cache import PredictionCache
+
+    model_predictor = ModelPredictor()
+    model_predictor.model_predictor_config.backend = backend
+    model_predictor.model_predictor_config.onnx_num_threads = threads
+    model_predictor.gcloud = GCloud(local_bucket_dir=bucket_dir, artifact_cache_max_bytes=0)
+    # every request reaches the model, repeated sentences must not be answered from the cache
+    model_predictor.prediction_cache = PredictionCache(max_entries=0, max_bytes=0, ttl_seconds=0)
+    return model_predictor
+
+
+def summarize(latencies: list, num_sentences: int, num_tokens: int, seconds: float) -> dict:
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    # inclusive method, percentiles of a handful of samples stay within the measured range
+    percentiles = statistics.quantiles(latencies_ms, n=100, method="inclusive") if len(latencies_ms) > 1 else latencies_ms * 99
+    return {
+        "iterations": len(latencies_ms),
+        "mean_ms": statistics.fmean(latencies_ms),
+        "p50_ms": percentiles[49],
+        "p95_ms": percentiles[94],
+        "p99_ms": percentiles[98],
+        "sentences_per_second": num_sentences / seconds,
+        "tokens_per_second": num_tokens / seconds,
+    }
+
+
+def count_tokens(tokenizer, sentences: list) -> int:
+    return sum(len(input_ids) for input_ids in tokenizer(sentences)["input_ids"])
+
+
+def bench_in_process(bucket_dir: str, args: argparse.Namespace) -> list:
+    """
+    Times ModelPredictor.evaluate_one_text (batch size 1) and evaluate_batch_texts on the loaded artifacts of every
+    backend, thread count, batch size and sentence length
+    """
+    results = []
+    for backend, threads in itertools.product(args.backends, args.threads):
+        torch.set_num_threads(threads)
+        model_predictor = make_predictor(bucket_dir, backend, threads)
+        artifacts = model_predictor.load_model_artifacts()
+
+        for batch_size, num_words in itertools.product(args.batch_sizes, args.num_words):
+            batches = [
+                generate_sentences(batch_size, num_words, seed=args.seed + i)
+                for i in range(args.warmup + args.iterations)
+            ]
+
+            def predict(sentences: list):
+                if batch_size == 1:
+                    return model_predictor.evaluate_one_text(artifacts.model, sentences[0], artifacts.tokenizer, artifacts.ids_to_labels)
+                return model_predictor.evaluate_batch_texts(artifacts.model, sentences, artifacts.tokenizer, artifacts.ids_to_labels)
+
+            for sentences in batches[:args.warmup]:
+                predict(sentences)
+
+            latencies = []
+            start_time = time.perf_counter()
+            for sentences in batches[args.warmup:]:
+                batch_start_time = time.perf_counter()
+                predict(sentences)
+                latencies.append(time.perf_counter() - batch_start_time)
+            seconds = time.perf_counter() - start_time
+
+            measured = batches[args.warmup:]
+            result = {
+                "mode": "in_process", "backend": backend, "threads": threads, "batch_size": batch_size,
+                "num_words": num_words, "concurrency": 1,
+                **summarize(latencies, batch_size * len(measured),
+                            sum(count_tokens(artifacts.tokenizer, sentences) for sentences in measured), seconds),
+            }
+            print_result(result)
+            results.append(result)
+
+        del model_predictor, artifacts
+    return results
+
+
+def request(url: str, data: bytes = None, headers: dict = None) -> object:
+    http_request = urllib.request.Request(url, data=data, headers=headers or {}, method="POST" if data is not None else "GET")
+    with urllib.request.urlopen(http_request, timeout=300) as response:
+        return json.loads(response.read())
+
+
+def wait_for_server(base_url: str, server: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        if server.poll() is not None:
+            raise RuntimeError(f"benchmark server exited with code {server.returncode}")
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"benchmark server did not come up within {timeout}s")
+        try:
+            request(f"{base_url}/model/status")
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.5)
+
+
+def bench_http(bucket_dir: str, work_dir: str, args: argparse.Namespace) -> list:
+    """
+    Times the app over HTTP in a uvicorn server process per backend and thread count, batch size 1 goes through
+    /predict and its micro-batching, larger batches through /predict/batch, concurrency is the number of clients
+    """
+    from transformers import BertTokenizerFast
+
+    tokenizer = BertTokenizerFast(vocab_file=os.path.join(work_dir, "vocab.txt"), do_lower_case=True)
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    results = []
+    for backend, threads in itertools.product(args.backends, args.threads):
+        server_dir = os.path.join(work_dir, f"server_{backend}_{threads}")
+        os.makedirs(server_dir, exist_ok=True)
+        server = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "serve", "--bucket-dir", bucket_dir, "--backend", backend,
+             "--threads", str(threads), "--port", str(args.port)],
+            cwd=server_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_for_server(base_url, server, args.timeout)
+
+            for batch_size, num_words, concurrency in itertools.product(args.batch_sizes, args.num_words, args.concurrency):
+                num_requests = args.warmup + args.iterations * concurrency
+                batches = [generate_sentences(batch_size, num_words, seed=args.seed + i) for i in range(num_requests)]
+
+                def post(sentences: list):
+                    if batch_size == 1:
+                        return request(f"{base_url}/predict?{urllib.parse.urlencode({'text': sentences[0]})}", data=b"")
+                    return request(f"{base_url}/predict/batch", data=json.dumps(sentences).encode(),
+                                   headers={"Content-Type": "application/json"})
+
+                def timed_post(sentences: list) -> float:
+                    start_time = time.perf_counter()
+                    post(sentences)
+                    return time.perf_counter() - start_time
+
+                for sentences in batches[:args.warmup]:
+                    post(sentences)
+
+                measured = batches[args.warmup:]
+                with ThreadPoolExecutor(max_workers=concurrency) as clients:
+                    start_time = time.perf_counter()
+                    latencies = list(clients.map(timed_post, measured))
+                    seconds = time.perf_counter() - start_time
+
+                result = {
+                    "mode": "http", "backend": backend, "threads": threads, "batch_size": batch_size,
+                    "num_words": num_words, "concurrency": concurrency,
+                    **summarize(latencies, batch_size * len(measured),
+                                sum(count_tokens(tokenizer, sentences) for sentences in measured), seconds),
+                }
+                print_result(result)
+                results.append(result)
+
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+    return results
+
+
+def serve(args: argparse.Namespace) -> int:
+    # runs in the working directory of the server, best_model/ and the pickles are downloaded there
+    import uvicorn
+    import app
+
+    app.prediction_pipeline = make_predictor(args.bucket_dir, args.backend, args.threads)
+    app.inference_executor.model_predictor = app.prediction_pipeline
+    app.inference_executor.inference_executor_config.num_threads = args.threads
+    app.model_watcher.model_watcher_config.poll_interval_seconds = 0
+    uvicorn.run(app.app, host="127.0.0.1", port=args.port, log_level="warning")
+    return 0
+
+
+def print_result(result: dict) -> None:
+    print(f"{result['mode']:10} {result['backend']:11} threads={result['threads']:<2} batch={result['batch_size']:<3} "
+          f"words={result['num_words']:<4} clients={result['concurrency']:<3} "
+          f"p50 {result['p50_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms  "
+          f"{result['sentences_per_second']:9.1f} sentences/s")
+
+
+def compare(results: list, baseline_path: str, environment: dict) -> list:
+    # ratios against a report of an earlier commit, speedup > 1 means faster now
+    with open(baseline_path) as baseline_file:
+        baseline_report = json.load(baseline_file)
+    baseline = {tuple(result[key] for key in CASE_KEYS): result for result in baseline_report["results"]}
+
+    baseline_torch = baseline_report.get("environment", {}).get("torch")
+    if baseline_torch != environment["torch"]:
+        print(f"baseline ran on torch {baseline_torch}, this run on torch {environment['torch']}, "
+              f"speedups include the torch upgrade")
+
+    comparison = []
+    for result in results:
+        previous = baseline.get(tuple(result[key] for key in CASE_KEYS))
+        if previous is None:
+            continue
+        comparison.append({
+            **{key: result[key] for key in CASE_KEYS},
+            "p50_speedup": previous["p50_ms"] / result["p50_ms"],
+            "p99_speedup": previous["p99_ms"] / result["p99_ms"],
+            "throughput_speedup": result["sentences_per_second"] / previous["sentences_per_second"],
+        })
+        print(f"{result['mode']:10} {result['backend']:11} threads={result['threads']:<2} batch={result['batch_size']:<3} "
+              f"words={result['num_words']:<4} clients={result['concurrency']:<3} "
+              f"p50 x{comparison[-1]['p50_speedup']:.2f}  p99 x{comparison[-1]['p99_speedup']:.2f}  "
+              f"throughput x{comparison[-1]['throughput_speedup']:.2f}")
+    return comparison
+
+
+def get_environment(args: argparse.Namespace) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "cpu_count": os.cpu_count(),
+        "model": {"hidden_size": args.hidden_size, "num_layers": args.num_layers, "num_heads": args.num_heads},
+    }
+
+
+def print_environment(environment: dict) -> None:
+    print(f"torch {environment['torch']}  python {environment['python']}  {environment['cpu_count']} cpus  "
+          f"commit {environment['commit']}")
+
+
+def int_list(value: str) -> list:
+    return [int(item) for item in value.split(",")]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline latency/throughput benchmark of the prediction path on a tiny random BERT")
+    subparsers = parser.add_subparsers(dest="command")
+
+    # internal, the server process of the http benchmark
+    serve_parser = subparsers.add_parser("serve")
+    serve_parser.add_argument("--bucket-dir", required=True)
+    serve_parser.add_argument("--backend", required=True, choices=BACKENDS)
+    serve_parser.add_argument("--threads", type=int, required=True)
+    serve_parser.add_argument("--port", type=int, required=True)
+
+    parser.add_argument("--modes", default="in_process,http", help="comma separated: in_process, http")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="comma separated: " + ", ".join(BACKENDS))
+    parser.add_argument("--batch-sizes", type=int_list, default=[1, 8, 32])
+    parser.add_argument("--num-words", type=int_list, default=[8, 32, 128], help="words per synthetic sentence")
+    parser.add_argument("--threads", type=int_list, default=[1, max(os.cpu_count() or 1, 1)])
+    parser.add_argument("--concurrency", type=int_list, default=[1, 8], help="concurrent http clients")
+    parser.add_argument("--iterations", type=int, default=30, help="timed calls per case (per client over http)")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--hidden-size", type=int, default=128)
+    parser.add_argument("--num-layers", type=int, default=2)
+    parser.add_argument("--num-heads", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=18112)
+    parser.add_argument("--timeout", type=float, default=300, help="seconds to wait for the server to come up")
+    parser.add_argument("--output", default=None, help="write the report as json")
+    parser.add_argument("--baseline", default=None, help="json report of an earlier run to compare against")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        return serve(args)
+
+    args.backends = args.backends.split(",")
+    modes = args.modes.split(",")
+    unknown = set(args.backends) - set(BACKENDS)
+    if unknown:
+        parser.error(f"unknown backends: {', '.join(sorted(unknown))}")
+
+    environment = get_environment(args)
+    print_environment(environment)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        # the predictor reads and writes its artifacts relative to the working directory
+        previous_dir = os.getcwd()
+        os.chdir(work_dir)
+        try:
+            bucket_dir = build_fixture(work_dir, args)
+            results = []
+            if "in_process" in modes:
+                results += bench_in_process(bucket_dir, args)
+            if "http" in modes:
+                results += bench_http(bucket_dir, work_dir, args)
+        finally:
+            os.chdir(previous_dir)
+
+    report = {"environment": environment, "results": results}
+    if args.baseline:
+        report["comparison"] = compare(results, args.baseline, environment)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
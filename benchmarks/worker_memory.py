@@ -0,0 +1,100 @@
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from ner.utils.memory import get_process_memory
+
+
+def get_children(pid: int) -> list:
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as children_file:
+            children.extend(int(child) for child in children_file.read().split())
+    return children
+
+
+def request(url: str, data: bytes = None) -> dict:
+    with urllib.request.urlopen(urllib.request.Request(url, data=data, method="POST" if data is not None else "GET"),
+                                timeout=60) as response:
+        return json.loads(response.read())
+
+
+def wait_for_workers(base_url: str, num_workers: int, timeout: float) -> None:
+    # the stats route answers from whichever worker accepts the connection, wait until every worker has answered
+    seen_pids = set()
+    deadline = time.monotonic() + timeout
+    while len(seen_pids) < num_workers:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"only {len(seen_pids)} of {num_workers} workers answered within {timeout}s")
+        try:
+            seen_pids.add(request(f"{base_url}/predict/stats")["memory"]["pid"])
+        except (urllib.error.URLError, ConnectionError, KeyError):
+            time.sleep(0.5)
+
+
+def measure(args: argparse.Namespace, preload: bool) -> dict:
+    env = dict(os.environ, PRELOAD_MODEL="1" if preload else "0", WEB_CONCURRENCY=str(args.workers),
+               PYTHONPATH=os.pathsep.join(filter(None, [REPO_DIR, os.environ.get("PYTHONPATH")])))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", os.path.join(REPO_DIR, "gunicorn.conf.py"),
+         "--bind", f"127.0.0.1:{args.port}", "app:app"],
+        cwd=args.workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_for_workers(base_url, args.workers, args.timeout)
+
+        # a few requests per worker, serving must not un-share the weights
+        for i in range(args.requests):
+            request(f"{base_url}/predict?text=John%20went%20to%20London%20{i}", data=b"")
+
+        workers = [dict(pid=pid, **get_process_memory(pid)) for pid in get_children(server.pid)]
+        master = dict(pid=server.pid, **get_process_memory(server.pid))
+        return {
+            "preload": preload,
+            "workers": len(workers),
+            "master": master,
+            "per_worker": workers,
+            "mean_worker_rss_mb": sum(worker["rss_mb"] for worker in workers) / len(workers),
+            "mean_worker_pss_mb": sum(worker["pss_mb"] for worker in workers) / len(workers),
+            "total_pss_mb": master["pss_mb"] + sum(worker["pss_mb"] for worker in workers),
+        }
+
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure per worker memory of gunicorn serving with and without model preloading")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=18111)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=300, help="seconds to wait for the workers to come up")
+    parser.add_argument("--workdir", default=os.getcwd(), help="directory the server runs in, holds best_model/")
+    parser.add_argument("--output", default=None, help="write the report as json")
+    args = parser.parse_args()
+
+    report = [measure(args, preload=False), measure(args, preload=True)]
+    for result in report:
+        print(f"preload={result['preload']!s:5} workers={result['workers']} "
+              f"mean worker rss {result['mean_worker_rss_mb']:.1f} MB, mean worker pss {result['mean_worker_pss_mb']:.1f} MB, "
+              f"total pss {result['total_pss_mb']:.1f} MB")
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
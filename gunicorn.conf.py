@@ -0,0 +1,93 @@
+# Multi worker serving with the model loaded once in the master process and shared copy-on-write by the workers:
+#   gunicorn -c gunicorn.conf.py app:app
+#
+# New model versions with a preloaded model: a worker loading the new model itself would hold a private copy of it,
+# so the workers never swap models. One worker (the one holding best_model/watcher.lock) polls the bucket and sends
+# SIGHUP to the master, so do /model/update, /model/rollback and /reload. On SIGHUP the master loads the new model
+# once (on_reload below) and gunicorn forks new workers sharing it while the old ones finish their requests, a
+# deploy can also send it by hand: kill -HUP <master pid>. With PRELOAD_MODEL=0 every worker swaps its own model.
+import gc
+import os
+import tempfile
+from ner.constants import *
+
+# every worker writes its metrics to files in this directory and /metrics adds up those of all workers, it has to be
+# set before the app imports prometheus_client, a directory given in the environment must be empty at server start
+if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix=METRICS_MULTIPROC_DIR_PREFIX)
+
+# objects allocated while the app and model are loaded must not be collected before the fork, freed slots
+# get reused by later allocations and those writes un-share the page, gc is enabled again after gc.freeze()
+gc.disable()
+
+bind = f"{APP_HOST}:{APP_PORT}"
+workers = int(os.environ.get("WEB_CONCURRENCY", SERVER_WORKERS))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = SERVER_WORKER_TIMEOUT
+# PRELOAD_MODEL=0 gives every worker its own model, for comparison
+preload_app = os.environ.get("PRELOAD_MODEL", "1") == "1"
+
+
+def when_ready(server):
+    # runs in the master after app:app is imported and before the workers are forked
+    if not preload_app:
+        gc.enable()
+        return
+
+    import app
+    from ner.logger import logging
+
+    try:
+        if app.inference_executor.preload():
+            server.log.info("Model preloaded in the master process, workers share its weights")
+    except Exception as e:
+        # workers come up anyway and load the model at their own startup
+        logging.info(f"Could not preload the model before fork: {e}")
+        server.log.warning(f"Could not preload the model before fork: {e}")
+    finally:
+        gc.enable()
+
+
+def on_reload(server):
+    # runs in the master on SIGHUP, after this file was read again (which disabled gc) and before the new workers
+    # are forked, the old workers keep serving the old model until they are stopped
+    if not preload_app:
+        gc.enable()
+        return
+
+    import app
+    import torch
+    from ner.logger import logging
+
+    try:
+        if app.inference_executor.preloaded:
+            # the master never predicts, one torch thread keeps the warm up forward pass from starting thread
+            # pools the forked workers would inherit
+            torch.set_num_threads(1)
+            # the old model was frozen at preload, it can only be freed once unfrozen
+            gc.unfreeze()
+            if app.inference_executor.model_predictor.update_model_artifacts():
+                server.log.info("New model loaded in the master process, forking workers that share it")
+            gc.freeze()
+    except Exception as e:
+        # the master keeps the model it has, the new workers share that one
+        logging.info(f"Could not load the new model in the master process: {e}")
+        server.log.warning(f"Could not load the new model in the master process: {e}")
+        gc.freeze()
+    finally:
+        gc.enable()
+
+
+def post_fork(server, worker):
+    # split the cores between the workers unless the executor sets its own thread count
+    if INFERENCE_NUM_THREADS == 0:
+        import torch
+
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+
+
+def child_exit(server, worker):
+    # the gauges of a stopped worker no longer count, its counters and histograms stay in the scraped totals
+    from ner.utils.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
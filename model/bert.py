@@ -1,7 +1,6 @@
 import sys
 import torch
 from ner.exception import NerException
-from transformers import BertForTokenClassification
 
 
 class BertModel(torch.nn.Module):
@@ -9,6 +8,9 @@ class BertModel(torch.nn.Module):
 
         super(BertModel, self).__init__()
 
+        # imported here, serving only needs transformers once a pickled model or tokenizer is loaded
+        from transformers import BertForTokenClassification
+
         self.bert = BertForTokenClassification.from_pretrained(
             "bert-base-cased", num_labels=len(unique_labels)
         )
@@ -22,4 +24,93 @@ class BertModel(torch.nn.Module):
             return output
 
         except Exception as e:
-            raise NerException(e, sys) from e
\ No newline at end of file
+            raise NerException(e, sys) from e
+
+
+def quantize_model(model: torch.nn.Module) -> torch.nn.Module:
+    """
+    Applies dynamic int8 quantization to the linear layers of a trained model for CPU inference
+    """
+    try:
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    except Exception as e:
+        raise NerException(e, sys) from e
+
+
+class BertLogits(torch.nn.Module):
+    """
+    Wraps a trained BertModel so exported graphs take (input_id, mask) and return the logits only
+    """
+    def __init__(self, model: BertModel):
+
+        super(BertLogits, self).__init__()
+
+        self.bert = model.bert
+
+    def forward(self, input_id, mask):
+        return self.bert(input_ids=input_id, attention_mask=mask, return_dict=False)[0]
+
+
+class OnnxBertModel:
+    """
+    Runs an exported BertModel graph on ONNX Runtime behind the call signature of BertModel, 
+    the custom BertModel class is not needed to load it
+    """
+    def __init__(self, onnx_model_path: str, num_threads: int = 0):
+        try:
+            import onnxruntime
+
+            session_options = onnxruntime.SessionOptions()
+            # enables the fused BERT attention / layer norm / gelu kernels of the cpu provider
+            session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if num_threads > 0:
+                session_options.intra_op_num_threads = num_threads
+
+            self.session = onnxruntime.InferenceSession(
+                onnx_model_path, sess_options=session_options, providers=["CPUExecutionProvider"]
+            )
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    def eval(self):
+        return self
+
+    def __call__(self, input_id, mask, label=None):
+        try:
+            logits = self.session.run(
+                ["logits"],
+                {"input_ids": input_id.cpu().numpy(), "attention_mask": mask.cpu().numpy()},
+            )[0]
+
+            return (torch.from_numpy(logits),)
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+
+class TorchScriptBertModel:
+    """
+    Runs a frozen TorchScript BertLogits graph behind the call signature of BertModel, 
+    the custom BertModel class is not needed to load it
+    """
+    def __init__(self, torchscript_model_path: str):
+        try:
+            module = torch.jit.load(torchscript_model_path, map_location=torch.device("cpu"))
+            module.eval()
+            # folds the frozen graph further for cpu (conv/linear fusion, mkldnn layouts where they pay off)
+            self.module = torch.jit.optimize_for_inference(module)
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    def eval(self):
+        return self
+
+    def __call__(self, input_id, mask, label=None):
+        try:
+            return (self.module(input_id, mask),)
+
+        except Exception as e:
+            raise NerException(e, sys) from e
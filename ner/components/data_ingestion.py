@@ -35,9 +35,11 @@ class DataIngestion:
         """
         logging.info("Entered get_data_from_gcp method of DataIngestion class")
         try:
-            self.gcloud.sync_folder_from_gcloud(gcp_bucket_url=bucket_name,
+            synced = self.gcloud.sync_folder_from_gcloud(gcp_bucket_url=bucket_name,
                                                     filename=file_name,
                                                     destination=path)
+            if not synced:
+                raise FileNotFoundError(f"{file_name} does not exist in the {bucket_name} bucket")
             logging.info("Exited get_data_from_gcp method of DataIngestion class")
         except Exception as e:
             raise NerException(e,sys)
@@ -1,5 +1,7 @@
 import os
 import sys
+import time
+from typing import Iterator
 import numpy as np
 import pandas as pd
 from pandas import DataFrame
@@ -32,6 +34,95 @@ class DataTransformation:
         except Exception as e:
             raise NerException(e,sys)
         
+    def iter_csv_chunks(self, csv_file_path:str)->Iterator[DataFrame]:
+        """
+        Method Name :   iter_csv_chunks
+        Description :   This method streams the used columns of the csv file chunk by chunk as strings, with the 
+                        pyarrow engine the chunks are arrow backed strings instead of one python object per cell
+        
+        Output      :   Yields DataFrame chunks
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            columns = list(self.data_transformation_config.csv_use_columns)
+
+            if self.data_transformation_config.csv_engine == "pyarrow":
+                import pyarrow as pa
+                import pyarrow.csv as pa_csv
+
+                # pandas' pyarrow engine reads the whole file at once, the streaming reader of pyarrow does not
+                reader = pa_csv.open_csv(
+                    csv_file_path,
+                    convert_options=pa_csv.ConvertOptions(
+                        include_columns=columns, column_types={column: pa.string() for column in columns}
+                    ),
+                )
+                for batch in reader:
+                    yield batch.to_pandas(types_mapper={pa.string(): pd.StringDtype("pyarrow")}.get)
+            else:
+                yield from pd.read_csv(
+                    csv_file_path,
+                    usecols=columns,
+                    dtype={column: str for column in columns},
+                    na_filter=False,
+                    chunksize=self.data_transformation_config.csv_chunk_size,
+                )
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    def load_data(self, csv_file_path:str)->DataFrame:
+        """
+        Method Name :   load_data
+        Description :   This method loads the first sample size rows of the csv file, only the used columns are 
+                        parsed and no chunk past the sample is read, a sample size of 0 loads the whole corpus
+        
+        Output      :   DataFrame
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the load_data method of Data transformation class")
+        try:
+            start_time = time.perf_counter()
+            sample_size = self.data_transformation_config.sample_size
+            chunks, num_rows = [], 0
+            for chunk in self.iter_csv_chunks(csv_file_path):
+                if sample_size > 0:
+                    chunk = chunk[: sample_size - num_rows]
+                chunks.append(chunk)
+                num_rows += len(chunk)
+                if sample_size > 0 and num_rows >= sample_size:
+                    break
+
+            columns = list(self.data_transformation_config.csv_use_columns)
+            df = pd.concat(chunks, ignore_index=True) if chunks else DataFrame(columns=columns)
+            logging.info(
+                f"Loaded {len(df)} rows of {os.path.basename(csv_file_path)} in {time.perf_counter() - start_time:.2f}s "
+                f"({self.data_transformation_config.csv_engine} engine, {df.memory_usage(deep=True).sum() / 2**20:.1f} MiB)"
+            )
+            logging.info("Exited the load_data method of Data transformation class")
+            return df
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    def get_split_ids(self, df:DataFrame)->np.ndarray:
+        """
+        Method Name :   get_split_ids
+        Description :   This method assigns every row to train (0), val (1) or test (2) by a hash of its text and 
+                        labels, the same row always lands in the same set and nothing has to be shuffled
+        
+        Output      :   np.ndarray
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            buckets = pd.util.hash_pandas_object(df[["text", "labels"]], index=False).values % SPLIT_HASH_BUCKETS
+            train_buckets = int(self.data_transformation_config.train_split_ratio * SPLIT_HASH_BUCKETS)
+            val_buckets = train_buckets + int(self.data_transformation_config.val_split_ratio * SPLIT_HASH_BUCKETS)
+            return np.where(buckets < train_buckets, 0, np.where(buckets < val_buckets, 1, 2))
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
     def splitting_data(self, df:DataFrame)->dict:
         """
         Method Name :   splitting_data
@@ -43,22 +134,20 @@ class DataTransformation:
                
         logging.info("Entered the splitting_data method of Data transformation class")
         try:
-            # Taking subset of data for training
-            df = df[0:1000]
-
             labels = [i.split() for i in df["labels"].values.tolist()] # each row would be 1 list, [['O', 'O', 'B-per', 'B-geo', 'O' etc]]
             
             unique_labels = set()
             for lb in labels:
                 [unique_labels.add(i) for i in lb if i not in unique_labels] # o/p set {'B-art','B-geo','B-per','B-org','B-tim','O'} etc
+            # set order changes with the string hash seed of every run, sorted the ids (and the tokenized dataset store
+            # keys built from them) stay the same for the same labels
+            unique_labels = sorted(unique_labels) # ['B-art','B-geo','B-org','B-per','B-tim','O']
 
-            labels_to_ids = {k: v for v, k in enumerate(unique_labels)} # {'B-art':0,'B-geo':1,'B-per':2,'B-org':3,'B-tim':4,'O':5}
+            labels_to_ids = {k: v for v, k in enumerate(unique_labels)} # {'B-art':0,'B-geo':1,'B-org':2,'B-per':3,'B-tim':4,'O':5}
             ids_to_labels = {v: k for v, k in enumerate(unique_labels)}
 
-            df_train, df_val, df_test = np.split(
-                df.sample(frac=1, random_state=42),
-                [int(0.8 * len(df)), int(0.9 * len(df))],
-            )
+            split_ids = self.get_split_ids(df)
+            df_train, df_val, df_test = df[split_ids == 0], df[split_ids == 1], df[split_ids == 2]
 
             logging.info("Exited the splitting_data method of Data transformation class")
             return (
@@ -89,8 +178,8 @@ class DataTransformation:
             os.makedirs(self.data_transformation_config.data_transformation_dir,exist_ok=True) # artifacts/data_transformation_artifacts
             logging.info(f"Created {os.path.basename(self.data_transformation_config.data_transformation_dir)} directory.") # data_transformation_artifacts
             
-            # load ner.csv data
-            df = pd.read_csv(self.data_ingestion_artifact.csv_data_file_path)
+            # load the sample of ner.csv data
+            df = self.load_data(csv_file_path=self.data_ingestion_artifact.csv_data_file_path)
             
             (
                 labels_to_ids,
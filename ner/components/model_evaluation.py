@@ -10,27 +10,31 @@ from ner.components.model_trainer import DataSequence
 from ner.configuration.gcloud import GCloud
 from ner.constants import *
 from ner.entity.config_entity import ModelEvaluationConfig
-from ner.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact, ModelEvaluationArtifacts
+from ner.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact, ModelExporterArtifact, ModelEvaluationArtifacts
 from ner.logger import logging
 from ner.exception import NerException
 from ner.utils.utils import MainUtils
+from ner.utils.tokenized_dataset import TokenizedDatasetStore
 
 
 class ModelEvaluation():
     def __init__(self, data_transformation_artifact:DataTransformationArtifact,
                  model_trainer_artifact:ModelTrainerArtifact,
-                 model_evaluation_config:ModelEvaluationConfig                 
+                 model_evaluation_config:ModelEvaluationConfig,
+                 model_exporter_artifact:ModelExporterArtifact= None
                  ) -> None:
         
         """
         :param model_evaluation_config: configuration for model evaluation (obj of ModelEvaluationConfig class)
         :param data_transformation_artifact: artifact of DataTransformation component
         :param model_trainer_artifact: artifact of ModelTrainer component
+        :param model_exporter_artifact: artifact of ModelExporter component, the quantized model is checked when given
         
         """
         try:         
             self.model_evaluation_config= model_evaluation_config
             self.model_trainer_artifact= model_trainer_artifact
+            self.model_exporter_artifact= model_exporter_artifact
             self.data_transformation_artifact= data_transformation_artifact
             self.gcloud= GCloud()
             self.utils= MainUtils()
@@ -38,7 +42,7 @@ class ModelEvaluation():
         except Exception as e:
             raise NerException(e,sys)
         
-    def evaluate(self, model:object, df_test:DataFrame) -> float:
+    def evaluate(self, model:object, df_test:DataFrame, use_cuda:bool= True) -> float:
         """
         Method Name :   evaluate
         Description :   This function loads tokenizer.pkl, labels_to_ids.pkl from model_trainer_artifacts, trained model and do predictions on test data, 
@@ -56,13 +60,22 @@ class ModelEvaluation():
             labels_to_ids= self.utils.load_pickle_file(filepath= self.data_transformation_artifact.labels_to_ids_path)
             logging.info(f"Loaded labels_to_ids.pkl file from data_transformation_artifact")
             
-            test_dataset= DataSequence(df= df_test, tokenizer=tokenizer, labels_to_ids=labels_to_ids)
+            # the store tokenizes the test set once, evaluating the quantized and the production model reuses it
+            if self.model_evaluation_config.tokenized_dataset_dir:
+                test_dataset= TokenizedDatasetStore(store_dir= self.model_evaluation_config.tokenized_dataset_dir,
+                                                    chunk_size= self.model_evaluation_config.tokenization_chunk_size,
+                                                    max_datasets= self.model_evaluation_config.tokenized_dataset_max_datasets,
+                                                    ).get_dataset(df= df_test, tokenizer= tokenizer, labels_to_ids= labels_to_ids)
+            else:
+                test_dataset= DataSequence(df= df_test, tokenizer=tokenizer, labels_to_ids=labels_to_ids,
+                                           lazy= self.model_evaluation_config.lazy_tokenization,
+                                           chunk_size= self.model_evaluation_config.tokenization_chunk_size)
             logging.info(f"Loaded test data for evaluation")
             
             test_dataloader= DataLoader(test_dataset, batch_size=1)
             
-            # GPU setup
-            use_cuda= torch.cuda.is_available()
+            # GPU setup, int8 quantized models run on cpu only
+            use_cuda= use_cuda and torch.cuda.is_available()
             device= torch.device("cuda" if use_cuda else "cpu")
             
             if use_cuda:
@@ -108,7 +121,8 @@ class ModelEvaluation():
         try: 
                                 
            # load current trained model
-           model= torch.load(self.model_trainer_artifact.bert_model_train_path)
+           # model.pt is a pickled BertModel, not a state dict, torch 2.6+ only unpickles weights by default
+           model= torch.load(self.model_trainer_artifact.bert_model_train_path, weights_only=False)
            logging.info(f"Loaded {model} from model_trainer_artifact")
            
            # load test.pkl file
@@ -118,6 +132,19 @@ class ModelEvaluation():
            trained_model_accuracy= self.evaluate(model=model, df_test=test_pkl)
            logging.info(f"Current trained model accuracy on test dataset is - {trained_model_accuracy}")
            
+           # the int8 model may only serve when it stays within tolerance of the fp32 accuracy
+           quantized_model_accuracy= None
+           is_quantized_model_accepted= False
+           if self.model_exporter_artifact is not None:
+               quantized_model= torch.load(self.model_exporter_artifact.quantized_model_path, map_location=torch.device('cpu'), weights_only=False)
+               logging.info("Loaded quantized model from model_exporter_artifact")
+               
+               quantized_model_accuracy= self.evaluate(model=quantized_model, df_test=test_pkl, use_cuda=False)
+               is_quantized_model_accepted= bool(
+                   trained_model_accuracy - quantized_model_accuracy <= self.model_evaluation_config.quantized_accuracy_tolerance
+               )
+               logging.info(f"Quantized model accuracy on test dataset is - {quantized_model_accuracy}, accepted - {is_quantized_model_accepted}")
+           
            # loading production model from google container registry (GCR)
            self.gcloud.sync_folder_from_gcloud(gcp_bucket_url= BUCKET_NAME, 
                                                       filename= GCP_MODEL_NAME, 
@@ -126,7 +153,7 @@ class ModelEvaluation():
            if os.path.exists(self.model_evaluation_config.gcp_local_path) == True:
                logging.info("GCP model file available in the root directory")
                
-               gcp_model = torch.load(self.model_evaluation_config.gcp_local_path, map_location=torch.device('cpu'))
+               gcp_model = torch.load(self.model_evaluation_config.gcp_local_path, map_location=torch.device('cpu'), weights_only=False)
                logging.info("GCP model loaded")
                
                gcp_model_accuracy = self.evaluate(model=gcp_model, df_test= test_pkl)
@@ -141,7 +168,9 @@ class ModelEvaluation():
            
            model_evaluation_artifact = ModelEvaluationArtifacts(
                 trained_model_accuracy= trained_model_accuracy,
-                is_model_accepted= trained_model_accuracy > tmp_best_model_score)
+                is_model_accepted= trained_model_accuracy > tmp_best_model_score,
+                quantized_model_accuracy= quantized_model_accuracy,
+                is_quantized_model_accepted= is_quantized_model_accepted)
            
            
            logging.info("Exited the initiate_model_evaluation method of Model evaluation class")
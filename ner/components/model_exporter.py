@@ -0,0 +1,199 @@
+import inspect
+import os
+import sys
+import numpy as np
+import torch
+from model.bert import BertLogits, OnnxBertModel, TorchScriptBertModel, quantize_model
+from ner.constants import *
+from ner.entity.artifact_entity import ModelTrainerArtifact, ModelExporterArtifact
+from ner.entity.config_entity import ModelExporterConfig
+from ner.exception import NerException
+from ner.logger import logging
+
+
+class ModelExporter:
+    def __init__(self, model_trainer_artifact: ModelTrainerArtifact,
+                 model_exporter_config: ModelExporterConfig) -> None:
+        """
+        :param model_exporter_config: configuration for model exporter (obj of ModelExporterConfig class)
+        :param model_trainer_artifact: artifact of ModelTrainer component
+        """
+        try:
+            self.model_trainer_artifact = model_trainer_artifact
+            self.model_exporter_config = model_exporter_config
+
+        except Exception as e:
+            raise NerException(e, sys)
+
+    def export_quantized_model(self, model: object) -> str:
+        """
+        Method Name :   export_quantized_model
+        Description :   This method applies dynamic int8 quantization to the linear layers of the trained model
+                        and saves it as its own artifact for CPU serving
+
+        Output      :   Returns path of model_quantized.pt
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the export_quantized_model method of Model exporter class")
+        try:
+            quantized_model = quantize_model(model)
+            torch.save(quantized_model, self.model_exporter_config.quantized_model_path) # model_quantized.pt
+
+            logging.info(
+                f"Quantized model saved to artifacts directory. File name - {os.path.basename(self.model_exporter_config.quantized_model_path)} "
+                f"({os.path.getsize(self.model_exporter_config.quantized_model_path) / 1e6:.1f} MB, "
+                f"fp32 {os.path.getsize(self.model_trainer_artifact.bert_model_train_path) / 1e6:.1f} MB)"
+            )
+            logging.info("Exited the export_quantized_model method of Model exporter class")
+            return self.model_exporter_config.quantized_model_path
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    def export_onnx_model(self, model: object) -> str:
+        """
+        Method Name :   export_onnx_model
+        Description :   This method exports the trained model to ONNX with dynamic batch and sequence axes
+
+        Output      :   Returns path of model.onnx
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the export_onnx_model method of Model exporter class")
+        try:
+            # shape of the example input does not matter, both axes are exported as dynamic,
+            # the padded row keeps the attention mask in the graph (an all ones mask can be traced away)
+            input_id = torch.ones((2, 16), dtype=torch.long)
+            mask = torch.ones((2, 16), dtype=torch.long)
+            mask[1, 8:] = 0
+
+            # newer torch defaults to the dynamo exporter, keep the single file graph of the classic exporter
+            export_options = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+
+            # the export restores the wrapper's train/eval mode onto the shared bert module afterwards
+            logits_model = BertLogits(model).eval()
+
+            torch.onnx.export(
+                logits_model,
+                (input_id, mask),
+                self.model_exporter_config.onnx_model_path,
+                input_names=["input_ids", "attention_mask"],
+                output_names=["logits"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "logits": {0: "batch", 1: "sequence"},
+                },
+                opset_version=self.model_exporter_config.onnx_opset_version,
+                do_constant_folding=True,
+                **export_options,
+            )
+            logging.info(f"ONNX model saved to artifacts directory. File name - {os.path.basename(self.model_exporter_config.onnx_model_path)}")
+
+            logging.info("Exited the export_onnx_model method of Model exporter class")
+            return self.model_exporter_config.onnx_model_path
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    def export_torchscript_model(self, model: object) -> str:
+        """
+        Method Name :   export_torchscript_model
+        Description :   This method traces the trained model to TorchScript and freezes the graph, loading it needs
+                        neither the model.bert import path nor the transformers stack
+
+        Output      :   Returns path of model_scripted.pt
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the export_torchscript_model method of Model exporter class")
+        try:
+            # same example input as the onnx export, the padded row keeps the attention mask in the graph
+            input_id = torch.ones((2, 16), dtype=torch.long)
+            mask = torch.ones((2, 16), dtype=torch.long)
+            mask[1, 8:] = 0
+
+            with torch.no_grad():
+                traced_model = torch.jit.trace(BertLogits(model).eval(), (input_id, mask))
+            frozen_model = torch.jit.freeze(traced_model)
+            torch.jit.save(frozen_model, self.model_exporter_config.torchscript_model_path)
+            logging.info(f"TorchScript model saved to artifacts directory. File name - {os.path.basename(self.model_exporter_config.torchscript_model_path)}")
+
+            logging.info("Exited the export_torchscript_model method of Model exporter class")
+            return self.model_exporter_config.torchscript_model_path
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    def verify_exported_model(self, model: object, exported_model: object) -> float:
+        """
+        Method Name :   verify_exported_model
+        Description :   This method checks the logits of an exported model against the eager model on inputs of a batch
+                        size and sequence length other than the export example, padding included
+
+        Output      :   Returns max abs logits difference
+        On Failure  :   Raises an exception when the difference is above export_parity_atol
+        """
+        logging.info("Entered the verify_exported_model method of Model exporter class")
+        try:
+            generator = torch.Generator().manual_seed(42)
+            vocab_size = model.bert.config.vocab_size
+            input_id = torch.randint(1, vocab_size, (3, 40), generator=generator)
+            mask = torch.ones_like(input_id)
+            mask[1, 25:] = 0
+            mask[2, 10:] = 0
+
+            with torch.no_grad():
+                eager_logits = model(input_id, mask, None)[0].numpy()
+                exported_logits = exported_model(input_id, mask, None)[0].numpy()
+
+            max_abs_diff = float(np.abs(eager_logits - exported_logits).max())
+            logging.info(f"Max abs difference between eager and {type(exported_model).__name__} logits - {max_abs_diff}")
+
+            if max_abs_diff > self.model_exporter_config.export_parity_atol:
+                raise ValueError(
+                    f"{type(exported_model).__name__} logits differ from the eager model by {max_abs_diff}, "
+                    f"more than {self.model_exporter_config.export_parity_atol}"
+                )
+
+            logging.info("Exited the verify_exported_model method of Model exporter class")
+            return max_abs_diff
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    def initiate_model_exporter(self) -> ModelExporterArtifact:
+        """
+        Method Name :   initiate_model_exporter
+        Description :   This method initiates the model exporter steps, the trained model is converted into the
+                        optimized formats used for CPU serving
+
+        Output      :   Returns model exporter artifact
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the initiate_model_exporter method of Model exporter class")
+        try:
+            os.makedirs(self.model_exporter_config.model_exporter_dir, exist_ok=True)
+            logging.info(f"Created {os.path.basename(self.model_exporter_config.model_exporter_dir)} directory.")
+
+            # export on cpu, the serving target
+            model = torch.load(self.model_trainer_artifact.bert_model_train_path, map_location=torch.device("cpu"), weights_only=False)
+            model.eval()
+            logging.info(f"Loaded {os.path.basename(self.model_trainer_artifact.bert_model_train_path)} from model_trainer_artifact")
+
+            quantized_model_path = self.export_quantized_model(model=model)
+
+            onnx_model_path = self.export_onnx_model(model=model)
+            self.verify_exported_model(model=model, exported_model=OnnxBertModel(onnx_model_path=onnx_model_path))
+
+            torchscript_model_path = self.export_torchscript_model(model=model)
+            self.verify_exported_model(model=model, exported_model=TorchScriptBertModel(torchscript_model_path=torchscript_model_path))
+
+            model_exporter_artifact = ModelExporterArtifact(
+                quantized_model_path=quantized_model_path,
+                onnx_model_path=onnx_model_path,
+                torchscript_model_path=torchscript_model_path,
+            )
+            logging.info("Exited the initiate_model_exporter method of Model exporter class")
+            return model_exporter_artifact
+
+        except Exception as e:
+            raise NerException(e, sys) from e
@@ -27,6 +27,13 @@ class ModelPusher:
             logging.info("Entered the initiate_model_pusher method of Model pusher class")
             
             if self.model_evaluation_artifact.is_model_accepted == True:
+                # an int8 model of an earlier release must not be served next to the new model, it is removed
+                # before model.pt changes and pushed again below only when the new one passed the accuracy check
+                self.gcloud.delete_object_from_gcloud(
+                        gcp_bucket_url=self.model_pusher_config.bucket_name,
+                        filename=GCP_QUANTIZED_MODEL_NAME,
+                )
+
                 # Uploading the model to google container registry
                 self.gcloud.sync_folder_to_gcloud(
                         gcp_bucket_url=self.model_pusher_config.bucket_name,
@@ -35,6 +42,34 @@ class ModelPusher:
                 )
 
                 logging.info("Model pushed to google container registry")
+                
+                self.gcloud.sync_folder_to_gcloud(
+                        gcp_bucket_url=self.model_pusher_config.bucket_name,
+                        filepath=self.model_pusher_config.upload_exported_model_path,
+                        filename=GCP_ONNX_MODEL_NAME,
+                )
+
+                logging.info("ONNX model pushed to google container registry")
+                
+                self.gcloud.sync_folder_to_gcloud(
+                        gcp_bucket_url=self.model_pusher_config.bucket_name,
+                        filepath=self.model_pusher_config.upload_exported_model_path,
+                        filename=GCP_TORCHSCRIPT_MODEL_NAME,
+                )
+
+                logging.info("TorchScript model pushed to google container registry")
+                
+                # the int8 model is only pushed together with the fp32 model it was checked against
+                if self.model_evaluation_artifact.is_quantized_model_accepted == True:
+                    self.gcloud.sync_folder_to_gcloud(
+                            gcp_bucket_url=self.model_pusher_config.bucket_name,
+                            filepath=self.model_pusher_config.upload_exported_model_path,
+                            filename=GCP_QUANTIZED_MODEL_NAME,
+                    )
+
+                    logging.info("Quantized model pushed to google container registry")
+                else:
+                    logging.info("Quantized model not accepted, the quantized backend serves the fp32 model")
 
             model_pusher_artifacts = ModelPusherArtifacts(
                 bucket_name= self.model_pusher_config.bucket_name,
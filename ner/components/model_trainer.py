@@ -1,5 +1,6 @@
 import os
 import sys
+import numpy as np
 import torch
 from torch.optim import SGD
 from torch.utils.data import DataLoader
@@ -16,82 +17,112 @@ from ner.entity.config_entity import ModelTrainerConfig
 from ner.exception import NerException
 from ner.logger import logging
 from ner.utils.utils import MainUtils
+from ner.utils.alignment import TokenAligner
+from ner.utils.batching import DynamicPaddingCollator, LengthGroupedBatchSampler
+from ner.utils.tokenized_dataset import TokenizedDatasetStore
 
 
 class DataSequence(torch.utils.data.Dataset):
     """
-    PyTorch Dataset class to organize and load data for training and inference tasks
+    PyTorch Dataset class to organize and load data for training and inference tasks, 
+    lazy=True keeps only the raw text and labels and tokenizes rows when they are loaded, 
+    dynamic_padding=True pads the rows loaded together only to the longest of them (lazy mode), 
+    the eager mode tokenizes chunk_size rows per call of the fast tokenizer
     """
-    def __init__(self, df, tokenizer, labels_to_ids):
+    def __init__(self, df, tokenizer, labels_to_ids, lazy: bool = False, dynamic_padding: bool = False,
+                 chunk_size: int = TOKENIZATION_CHUNK_SIZE):
 
-        lb = [i.split() for i in df["labels"].values.tolist()] 
         txt = df["text"].values.tolist() # list of strings ['sentence 1', 'sentense 2']
-        self.texts = [
-            tokenizer(
-                str(i),
-                padding="max_length",
-                max_length=512,
-                truncation=True,
-                return_tensors="pt",
-            )
-            for i in txt
-        ]
-        self.labels = [
-            self.align_label(i, j, tokenizer, labels_to_ids) for i, j in zip(txt, lb)
-        ]
+        self.aligner = TokenAligner(tokenizer=tokenizer)
+        self.labels_to_ids = labels_to_ids
+        self.lazy = lazy
+        self.dynamic_padding = dynamic_padding
+
+        if lazy:
+            # a few hundred bytes per row instead of three 512 long int64 rows, DataLoader workers tokenize in parallel
+            self.sentences = txt
+            self.sentence_labels = df["labels"].values.tolist() # list of strings ['O O B-per', 'B-geo O']
+            return
+
+        # tokenize all rows once in chunks, label alignment reuses the word_ids of the same encoding,
+        # every chunk is copied into the preallocated arrays of all rows
+        max_length = self.aligner.max_length
+        texts = {}
+        self.labels = np.empty((len(txt), max_length), dtype=np.int64)
+        row = 0
+        for encodings, label_ids in self.aligner.iter_aligned_chunks(
+            texts=txt, labels=df["labels"].values.tolist(), labels_to_ids=labels_to_ids,
+            chunk_size=chunk_size, return_tensors="np",
+        ):
+            for key, value in encodings.items():
+                if key not in texts:
+                    texts[key] = np.empty((len(txt), max_length), dtype=np.int64)
+                texts[key][row : row + len(value)] = value
+            self.labels[row : row + len(label_ids)] = label_ids
+            row += len(label_ids)
+        self.texts = {key: torch.from_numpy(value) for key, value in texts.items()}
 
     def __len__(self) -> int:
 
-        return len(self.labels)
+        return len(self.sentences) if self.lazy else len(self.labels)
+
+    def get_lengths(self) -> np.ndarray:
+        """
+        Returns the token length of every row, the word count stands in for it in lazy mode
+        """
+        if self.lazy:
+            return np.array([len(str(sentence).split()) for sentence in self.sentences], dtype=np.int64)
+        return self.texts["attention_mask"].sum(dim=1).numpy()
 
     def get_batch_data(self, idx):
 
-        return self.texts[idx]
+        return {key: value[idx : idx + 1] for key, value in self.texts.items()}
 
     def get_batch_labels(self, idx):
 
-        return torch.LongTensor(self.labels[idx])
+        return torch.from_numpy(self.labels[idx])
 
     def __getitem__(self, idx):
 
+        if self.lazy:
+            return self.__getitems__([idx])[0]
+
         batch_data = self.get_batch_data(idx)
         batch_labels = self.get_batch_labels(idx)
 
         return batch_data, batch_labels
 
+    def __getitems__(self, indices: list) -> list:
+        """
+        Tokenizes the rows of a whole DataLoader batch in one call of the fast tokenizer, items have the same 
+        shape in both modes
+        """
+        if not self.lazy:
+            return [self[idx] for idx in indices]
+
+        texts = self.aligner.tokenize(
+            [self.sentences[idx] for idx in indices],
+            padding="longest" if self.dynamic_padding else "max_length",
+            return_tensors="pt",
+        )
+        labels = self.aligner.align_labels(
+            word_ids=self.aligner.get_word_ids(texts),
+            labels=[self.sentence_labels[idx].split() for idx in indices],
+            labels_to_ids=self.labels_to_ids,
+        )
+        return [
+            ({key: value[i : i + 1] for key, value in texts.items()}, torch.from_numpy(labels[i]))
+            for i in range(len(indices))
+        ]
+
     def align_label(self, texts: str, labels: str, tokenizer: dict, labels_to_ids: dict) -> list:
         try:
             logging.info("Entered the align_label method of DataSequence class")
-            label_all_tokens = False
-            tokenized_inputs = tokenizer(
-                texts, padding="max_length", max_length=512, truncation=True
-            )
-
-            word_ids = tokenized_inputs.word_ids()
-
-            previous_word_idx = None
-            label_ids = []
-
-            for word_idx in word_ids:
-
-                if word_idx is None:
-                    label_ids.append(-100)
-
-                elif word_idx != previous_word_idx:
-                    try:
-                        label_ids.append(labels_to_ids[labels[word_idx]])
-                    except:
-                        label_ids.append(-100)
-                else:
-                    try:
-                        label_ids.append(
-                            labels_to_ids[labels[word_idx]]
-                            if label_all_tokens
-                            else -100
-                        )
-                    except:
-                        label_ids.append(-100)
-                previous_word_idx = word_idx
+            aligner = TokenAligner(tokenizer=tokenizer)
+            tokenized_inputs = aligner.tokenize([texts], padding="max_length")
+            label_ids = aligner.align_labels(
+                word_ids=aligner.get_word_ids(tokenized_inputs), labels=[labels], labels_to_ids=labels_to_ids
+            )[0].tolist()
 
             logging.info("Exited the align_label method of DataSequence class")
             return label_ids
@@ -119,6 +150,37 @@ class ModelTraining:
         except Exception as e:
             raise NerException(e,sys)
 
+    def get_dataset(self, df, tokenizer, labels_to_ids: dict) -> torch.utils.data.Dataset:
+        """
+        Method Name :   get_dataset
+        Description :   This function returns the tokenized dataset of the rows from the tokenized dataset store, 
+                        building it on first use, or a DataSequence when the store is disabled
+        
+        Output      :   Returns torch Dataset
+        On Failure  :   Write an exception log and then raise an exception
+        
+        """
+        try:
+            if self.model_trainer_config.tokenized_dataset_dir:
+                return TokenizedDatasetStore(
+                    store_dir=self.model_trainer_config.tokenized_dataset_dir,
+                    chunk_size=self.model_trainer_config.tokenization_chunk_size,
+                    max_datasets=self.model_trainer_config.tokenized_dataset_max_datasets,
+                ).get_dataset(
+                    df=df, tokenizer=tokenizer, labels_to_ids=labels_to_ids,
+                    dynamic_padding=self.model_trainer_config.dynamic_padding,
+                )
+
+            return DataSequence(
+                df=df, tokenizer=tokenizer, labels_to_ids=labels_to_ids,
+                lazy=self.model_trainer_config.lazy_tokenization,
+                dynamic_padding=self.model_trainer_config.dynamic_padding,
+                chunk_size=self.model_trainer_config.tokenization_chunk_size,
+            )
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
     def initiate_model_training(self) -> ModelTrainerArtifact:
         """
         Method Name :   initiate_model_trainer
@@ -174,19 +236,42 @@ class ModelTraining:
             model = BertModel(unique_labels= unique_labels)
             logging.info("created model class for bert")
 
-            train_dataset = DataSequence(
-                df=df_train, tokenizer=tokenizer, labels_to_ids=labels_to_ids
-            )
+            train_dataset = self.get_dataset(df=df_train, tokenizer=tokenizer, labels_to_ids=labels_to_ids)
             logging.info("Created train dataset")
-            val_dataset = DataSequence(
-                df=df_val, tokenizer=tokenizer, labels_to_ids=labels_to_ids
-            )
+            val_dataset = self.get_dataset(df=df_val, tokenizer=tokenizer, labels_to_ids=labels_to_ids)
             logging.info("created val dataset")
 
-            train_dataloader = DataLoader(
-                train_dataset, batch_size=batch_size, shuffle=True
+            # with lazy tokenization the loader workers tokenize the next batches while the model trains,
+            # stored datasets are read straight from the memory-mapped arrays
+            num_workers = (
+                self.model_trainer_config.dataloader_num_workers
+                if isinstance(train_dataset, DataSequence) and train_dataset.lazy else 0
             )
-            val_dataloader = DataLoader(val_dataset, batch_size=batch_size)
+            if self.model_trainer_config.dynamic_padding:
+                # batches of similar lengths padded to their longest row, padded labels stay -100 so
+                # loss and accuracy are the same as with 512 token padding
+                collate_fn = DynamicPaddingCollator(pad_token_id=tokenizer.pad_token_id)
+                train_dataloader = DataLoader(
+                    train_dataset,
+                    batch_sampler=LengthGroupedBatchSampler(
+                        lengths=train_dataset.get_lengths(), batch_size=batch_size,
+                        group_size=self.model_trainer_config.length_group_size, shuffle=True,
+                    ),
+                    collate_fn=collate_fn, num_workers=num_workers,
+                )
+                val_dataloader = DataLoader(
+                    val_dataset,
+                    batch_sampler=LengthGroupedBatchSampler(
+                        lengths=val_dataset.get_lengths(), batch_size=batch_size,
+                        group_size=self.model_trainer_config.length_group_size, shuffle=False,
+                    ),
+                    collate_fn=collate_fn, num_workers=num_workers,
+                )
+            else:
+                train_dataloader = DataLoader(
+                    train_dataset, batch_size=batch_size, shuffle=True, num_workers=num_workers
+                )
+                val_dataloader = DataLoader(val_dataset, batch_size=batch_size, num_workers=num_workers)
             logging.info("created train and val dataloader")
 
             use_cuda = torch.cuda.is_available()
@@ -0,0 +1,155 @@
+import hashlib
+import os
+import shutil
+import sys
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+from ner.exception import NerException
+from ner.logger import logging
+
+
+class ArtifactCache:
+    '''Size bounded LRU cache of downloaded bucket objects, content addressed by object name and remote generation/checksum'''
+    def __init__(self, cache_dir: str, max_bytes: int) -> None:
+        """
+        :param cache_dir: local directory holding one file per cached object version
+        :param max_bytes: max total size of the cached files, 0 disables the cache
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def get_key(object_name: str, object_metadata: dict) -> Optional[str]:
+        # without a generation or checksum there is nothing to tell a changed object from an unchanged one
+        if not object_metadata or not (object_metadata.get("generation") or object_metadata.get("checksum")):
+            return None
+        key = f"{object_name}\0{object_metadata.get('generation')}\0{object_metadata.get('checksum')}"
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def get_entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def fetch(self, object_name: str, object_metadata: dict, download_fn: Callable[[str], None], destination: str) -> bool:
+        """
+        Method: fetch
+        Purpose: places the object at destination from the cache, downloading it first when this generation of it
+                 is not cached yet
+        Args:
+            object_name (str): name of the object in the bucket
+            object_metadata (dict): generation, checksum and size of the remote object
+            download_fn (Callable): downloads the object to the path it is called with
+            destination (str): local file path
+        Output: True on a cache hit
+        Exception: Raises error
+        """
+        try:
+            key = self.get_key(object_name, object_metadata)
+            size = (object_metadata or {}).get("size") or 0
+            if self.max_bytes <= 0 or key is None or size > self.max_bytes:
+                download_fn(destination)
+                return False
+
+            entry_path = self.get_entry_path(key)
+            hit = os.path.exists(entry_path)
+            if hit:
+                # marks the entry as most recently used, the lru order is kept in atime so that the mtime
+                # still identifies the copy placed at destination
+                os.utime(entry_path, ns=(time.time_ns(), os.stat(entry_path).st_mtime_ns))
+            else:
+                self.download_entry(download_fn, entry_path)
+
+            try:
+                self.place(entry_path, destination)
+            except FileNotFoundError:
+                # evicted by another process between the check and the copy, fetch it again
+                hit = False
+                self.download_entry(download_fn, entry_path)
+                self.place(entry_path, destination)
+
+            with self._lock:
+                if hit:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            logging.info(f"Artifact cache {'hit' if hit else 'miss'} for {object_name} generation {object_metadata.get('generation')}")
+
+            if not hit:
+                self.evict(keep_path=entry_path)
+            return hit
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    def download_entry(self, download_fn: Callable[[str], None], entry_path: str) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        # other processes only ever see complete entries
+        tmp_path = os.path.join(self.cache_dir, f".{uuid.uuid4().hex}.tmp")
+        try:
+            download_fn(tmp_path)
+            if not os.path.exists(tmp_path):
+                raise FileNotFoundError(f"Download did not produce {tmp_path}")
+            os.replace(tmp_path, entry_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def place(entry_path: str, destination: str) -> None:
+        # copy2 keeps the entry mtime, an unchanged destination is not copied again
+        entry_stat = os.stat(entry_path)
+        if os.path.exists(destination):
+            destination_stat = os.stat(destination)
+            if (destination_stat.st_size, destination_stat.st_mtime_ns) == (entry_stat.st_size, entry_stat.st_mtime_ns):
+                return
+
+        destination_dir = os.path.dirname(destination)
+        if destination_dir:
+            os.makedirs(destination_dir, exist_ok=True)
+
+        # a copy, not a hard link, code writing to the destination later must not change the cached entry
+        tmp_destination = f"{destination}.{uuid.uuid4().hex}.tmp"
+        shutil.copy2(entry_path, tmp_destination)
+        os.replace(tmp_destination, destination)
+
+    def evict(self, keep_path: str = None) -> None:
+        """
+        Method: evict
+        Purpose: removes least recently used entries until the cache fits in max_bytes
+        Output: None
+        Exception: Raises error
+        """
+        try:
+            entries = []
+            for entry in os.scandir(self.cache_dir):
+                if entry.is_file() and not entry.name.startswith("."):
+                    stat = entry.stat()
+                    entries.append((stat.st_atime, stat.st_size, entry.path))
+
+            total_bytes = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total_bytes <= self.max_bytes:
+                    break
+                if path == keep_path:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total_bytes -= size
+                with self._lock:
+                    self.evictions += 1
+                logging.info(f"Evicted {os.path.basename(path)} from artifact cache")
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
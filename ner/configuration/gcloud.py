@@ -1,13 +1,29 @@
 import os
 import sys
-from zipfile import Path
 import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from zipfile import Path
+from ner.configuration.artifact_cache import ArtifactCache
+from ner.configuration.storage import StorageBackend, get_storage_backend, log_transfer
+from ner.constants import *
 from ner.logger import logging
 from ner.exception import NerException
 
 
 class GCloud:
     '''Load and Access data from google cloud'''
+    def __init__(self, local_bucket_dir: str = LOCAL_BUCKET_DIR, artifact_cache_dir: str = ARTIFACT_CACHE_DIR,
+                 artifact_cache_max_bytes: int = ARTIFACT_CACHE_MAX_BYTES, storage_backend: StorageBackend = None):
+        """
+        :param local_bucket_dir: when set, buckets are local directories <local_bucket_dir>/<bucket name> instead of GCS
+        :param artifact_cache_dir: local cache of downloaded objects
+        :param artifact_cache_max_bytes: max size of the artifact cache, 0 disables it
+        :param storage_backend: overrides the backend picked from local_bucket_dir
+        """
+        self.storage_backend = storage_backend or get_storage_backend(local_bucket_dir=local_bucket_dir)
+        self.artifact_cache = ArtifactCache(cache_dir=artifact_cache_dir, max_bytes=artifact_cache_max_bytes)
+
     def sync_folder_to_gcloud(self, gcp_bucket_url:str, filepath:Path, filename:str):
         """
         Method: sync_folder_to_gcloud
@@ -16,33 +32,106 @@ class GCloud:
             gcp_bucket_url (_type_): str
             filepath (_type_): Path
             filename (_type_): str
-        Output: None
+        Output: transfer stats (bytes, seconds, mb_per_second)
         Exception: Raises error
         """
         try:
-            command= f"gsutil cp {filepath}/{filename} gs://{gcp_bucket_url}"
-            os.system(command)
+            start_time = time.perf_counter()
+            num_bytes = self.storage_backend.upload(
+                source=os.path.join(filepath, filename), bucket_name=gcp_bucket_url, object_name=filename
+            )
+            transfer = log_transfer("uploaded", f"{gcp_bucket_url}/{filename}", num_bytes, time.perf_counter() - start_time)
             logging.info("data loaded into gcloud successfully!")
+            return transfer
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    def delete_object_from_gcloud(self, gcp_bucket_url:str, filename:str) -> bool:
+        """
+        Method: delete_object_from_gcloud
+        Purpose: remove an object from gcloud
+        Args:
+            gcp_bucket_url (str): str
+            filename (str): str
+        Output: True when the object existed
+        Exception: Raises error
+        """
+        try:
+            deleted = self.storage_backend.delete(bucket_name=gcp_bucket_url, object_name=filename)
+            logging.info(f"gs://{gcp_bucket_url}/{filename} {'deleted' if deleted else 'does not exist, nothing deleted'}")
+            return deleted
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    def get_object_metadata(self, gcp_bucket_url:str, filename:str) -> Optional[dict]:
+        """
+        Method: get_object_metadata
+        Purpose: cheap metadata lookup of a bucket object, no content is transferred
+        Args:
+            gcp_bucket_url (str): str
+            filename (str): str
+        Output: dict of generation, checksum and size, None when the object does not exist
+        Exception: Raises error
+        """
+        try:
+            return self.storage_backend.get_object_metadata(bucket_name=gcp_bucket_url, object_name=filename)
         except Exception as e:
             raise NerException(e, sys) from e
-        
-    def sync_folder_from_gcloud(self, gcp_bucket_url:str, filename:str, destination:Path):
+
+    def download_object(self, gcp_bucket_url:str, filename:str, destination:str) -> dict:
+        start_time = time.perf_counter()
+        num_bytes = self.storage_backend.download(bucket_name=gcp_bucket_url, object_name=filename, destination=destination)
+        return log_transfer("downloaded", f"{gcp_bucket_url}/{filename}", num_bytes, time.perf_counter() - start_time)
+
+    def sync_folder_from_gcloud(self, gcp_bucket_url:str, filename:str, destination:Path) -> bool:
         """
         Method: sync_folder_from_gcloud
-        Purpose: access data from gcloud
+        Purpose: access data from gcloud, the object is served from the local artifact cache when its
+                 generation/checksum did not change since it was last downloaded
         Args:
             gcp_bucket_url (str): str
             filename (str): str
             destination (Path): Path
-        Output: None
+        Output: True when the object exists, a missing object leaves destination untouched
         Exception: Raises error
         """
         try:
-            command= f"gsutil cp gs://{gcp_bucket_url}/{filename} {destination}"
-            os.system(command)
+            # same as gsutil cp, a directory destination receives the object under its own name
+            destination_path = os.path.join(destination, filename) if os.path.isdir(destination) else destination
+
+            object_metadata = self.get_object_metadata(gcp_bucket_url, filename)
+            if object_metadata is None:
+                logging.info(f"gs://{gcp_bucket_url}/{filename} does not exist, {destination} left untouched")
+                return False
+
+            self.artifact_cache.fetch(
+                object_name=f"{gcp_bucket_url}/{filename}",
+                object_metadata=object_metadata,
+                download_fn=lambda path: self.download_object(gcp_bucket_url, filename, path),
+                destination=destination_path,
+            )
             logging.info(f"data accessed from gcloud into: {destination}")
+            return True
         except Exception as e:
-            raise NerException(e, sys) from e    
-        
-        
-            
\ No newline at end of file
+            raise NerException(e, sys) from e
+
+    def sync_objects_from_gcloud(self, gcp_bucket_url:str, objects:list) -> dict:
+        """
+        Method: sync_objects_from_gcloud
+        Purpose: access several objects from gcloud concurrently
+        Args:
+            gcp_bucket_url (str): str
+            objects (list): (filename, destination) pairs
+        Output: dict of filename to True when the object exists
+        Exception: Raises the first error
+        """
+        try:
+            with ThreadPoolExecutor(max_workers=min(STORAGE_MAX_CONCURRENT_FETCHES, max(len(objects), 1)),
+                                    thread_name_prefix="gcloud-fetch") as executor:
+                futures = {
+                    filename: executor.submit(self.sync_folder_from_gcloud, gcp_bucket_url, filename, destination)
+                    for filename, destination in objects
+                }
+                return {filename: future.result() for filename, future in futures.items()}
+        except Exception as e:
+            raise NerException(e, sys) from e
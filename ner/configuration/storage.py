@@ -0,0 +1,188 @@
+import os
+import shutil
+from abc import ABC, abstractmethod
+import sys
+import threading
+from typing import Optional
+from ner.constants import *
+from ner.exception import NerException
+from ner.logger import logging
+
+
+def log_transfer(direction: str, object_name: str, num_bytes: int, seconds: float) -> dict:
+    transfer = {
+        "direction": direction,
+        "object_name": object_name,
+        "bytes": num_bytes,
+        "seconds": seconds,
+        "mb_per_second": num_bytes / 1e6 / seconds if seconds > 0 else 0.0,
+    }
+    logging.info(
+        f"{direction} {object_name}: {num_bytes / 1e6:.1f} MB in {seconds:.2f}s ({transfer['mb_per_second']:.1f} MB/s)"
+    )
+    return transfer
+
+
+class StorageBackend(ABC):
+    '''Object storage the GCloud helper transfers artifacts with'''
+    @abstractmethod
+    def get_object_metadata(self, bucket_name: str, object_name: str) -> Optional[dict]:
+        """
+        Returns generation, checksum and size of an object without transferring it, None when it does not exist
+        """
+        ...
+
+    @abstractmethod
+    def download(self, bucket_name: str, object_name: str, destination: str) -> int:
+        """
+        Downloads an object to a local file path, returns the number of bytes transferred
+        """
+        ...
+
+    @abstractmethod
+    def upload(self, source: str, bucket_name: str, object_name: str) -> int:
+        """
+        Uploads a local file to an object, returns the number of bytes transferred
+        """
+        ...
+
+    @abstractmethod
+    def delete(self, bucket_name: str, object_name: str) -> bool:
+        """
+        Deletes an object, returns False when it did not exist
+        """
+        ...
+
+
+class LocalStorageBackend(StorageBackend):
+    '''Local directory standing in for GCS, every bucket is a sub directory of root_dir'''
+    def __init__(self, root_dir: str) -> None:
+        self.root_dir = root_dir
+
+    def get_object_path(self, bucket_name: str, object_name: str) -> str:
+        return os.path.join(self.root_dir, bucket_name, object_name)
+
+    def get_object_metadata(self, bucket_name: str, object_name: str) -> Optional[dict]:
+        object_path = self.get_object_path(bucket_name, object_name)
+        if not os.path.isfile(object_path):
+            return None
+        # a rewritten file gets a new mtime, the local analogue of a new gcs generation
+        stat = os.stat(object_path)
+        return {"generation": str(stat.st_mtime_ns), "checksum": None, "size": stat.st_size}
+
+    def download(self, bucket_name: str, object_name: str, destination: str) -> int:
+        shutil.copyfile(self.get_object_path(bucket_name, object_name), destination)
+        return os.path.getsize(destination)
+
+    def upload(self, source: str, bucket_name: str, object_name: str) -> int:
+        object_path = self.get_object_path(bucket_name, object_name)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+
+        # readers of the stand-in bucket never see a partly written object
+        tmp_object_path = f"{object_path}.{os.getpid()}.tmp"
+        shutil.copyfile(source, tmp_object_path)
+        os.replace(tmp_object_path, object_path)
+        return os.path.getsize(object_path)
+
+    def delete(self, bucket_name: str, object_name: str) -> bool:
+        object_path = self.get_object_path(bucket_name, object_name)
+        if not os.path.isfile(object_path):
+            return False
+        os.remove(object_path)
+        return True
+
+
+# one client (and connection pool) per process, a forked worker must not reuse the sockets of its parent
+_gcs_clients: dict = {}
+_gcs_clients_lock = threading.Lock()
+
+
+class GcsStorageBackend(StorageBackend):
+    '''Google Cloud Storage through the in-process client, large objects are transferred in parallel chunks'''
+    def __init__(self, max_workers: int = STORAGE_MAX_WORKERS, chunk_size: int = STORAGE_CHUNK_SIZE,
+                 parallel_threshold: int = STORAGE_PARALLEL_THRESHOLD) -> None:
+        """
+        :param max_workers: concurrent chunk transfers per object
+        :param chunk_size: bytes per chunk of a parallel transfer
+        :param parallel_threshold: objects from this size on are transferred in parallel chunks
+        """
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.parallel_threshold = parallel_threshold
+
+    def get_client(self):
+        with _gcs_clients_lock:
+            client = _gcs_clients.get(os.getpid())
+            if client is None:
+                # imported here, google-cloud-storage is only needed when the gcs backend is used
+                import google.auth
+                import requests
+                from google.auth.transport.requests import AuthorizedSession
+                from google.cloud import storage
+
+                credentials, project = google.auth.default()
+                # the default pool of 10 connections would serialize chunk transfers and concurrent fetches
+                pool_size = self.max_workers * STORAGE_MAX_CONCURRENT_FETCHES
+                session = AuthorizedSession(credentials)
+                session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+
+                client = storage.Client(project=project, credentials=credentials, _http=session)
+                _gcs_clients[os.getpid()] = client
+            return client
+
+    def get_object_metadata(self, bucket_name: str, object_name: str) -> Optional[dict]:
+        blob = self.get_client().bucket(bucket_name).get_blob(object_name)
+        if blob is None:
+            return None
+        return {"generation": str(blob.generation), "checksum": blob.md5_hash or blob.crc32c, "size": blob.size}
+
+    def download(self, bucket_name: str, object_name: str, destination: str) -> int:
+        from google.cloud.storage import transfer_manager
+
+        blob = self.get_client().bucket(bucket_name).get_blob(object_name)
+        if blob is None:
+            raise FileNotFoundError(f"gs://{bucket_name}/{object_name} does not exist")
+
+        if blob.size >= self.parallel_threshold:
+            transfer_manager.download_chunks_concurrently(
+                blob, destination, chunk_size=self.chunk_size,
+                worker_type=transfer_manager.THREAD, max_workers=self.max_workers,
+            )
+        else:
+            blob.download_to_filename(destination)
+        return blob.size
+
+    def upload(self, source: str, bucket_name: str, object_name: str) -> int:
+        from google.cloud.storage import transfer_manager
+
+        blob = self.get_client().bucket(bucket_name).blob(object_name)
+        size = os.path.getsize(source)
+
+        if size >= self.parallel_threshold:
+            transfer_manager.upload_chunks_concurrently(
+                source, blob, chunk_size=self.chunk_size,
+                worker_type=transfer_manager.THREAD, max_workers=self.max_workers,
+            )
+        else:
+            blob.upload_from_filename(source)
+        return size
+
+    def delete(self, bucket_name: str, object_name: str) -> bool:
+        blob = self.get_client().bucket(bucket_name).get_blob(object_name)
+        if blob is None:
+            return False
+        blob.delete()
+        return True
+
+
+def get_storage_backend(local_bucket_dir: str = LOCAL_BUCKET_DIR) -> StorageBackend:
+    """
+    Returns the local directory stand-in when local_bucket_dir is set, GCS otherwise
+    """
+    try:
+        if local_bucket_dir is not None:
+            return LocalStorageBackend(root_dir=local_bucket_dir)
+        return GcsStorageBackend()
+
+    except Exception as e:
+        raise NerException(e, sys) from e
@@ -13,6 +13,16 @@ GCP_MODEL_NAME = "model.pt"
 MODELS_DIR = "models"
 BEST_MODEL_DIR = "best_model"
 
+# artifact_cache constants
+LOCAL_BUCKET_DIR = None # a directory with one sub directory per bucket stands in for GCS when set
+ARTIFACT_CACHE_DIR = "artifact_cache"
+ARTIFACT_CACHE_MAX_BYTES = 4 * 1024 * 1024 * 1024 # 0 disables the cache
+
+# storage constants
+STORAGE_MAX_WORKERS = 8 # parallel chunk transfers per object, also the gcs connection pool size
+STORAGE_CHUNK_SIZE = 32 * 1024 * 1024
+STORAGE_PARALLEL_THRESHOLD = 64 * 1024 * 1024 # objects from this size on (model.pt, archive.zip) are transferred in chunks
+STORAGE_MAX_CONCURRENT_FETCHES = 4 # objects fetched at once by sync_objects_from_gcloud
 
 
 # data_ingestion
@@ -28,6 +38,13 @@ DF_TRAIN_FILE_NAME = "df_train.pkl"
 DF_VAL_FILE_NAME = "df_val.pkl"
 DF_TEST_FILE_NAME = "df_test.pkl"
 UNIQUE_LABELS_FILE_NAME = "unique_labels.pkl"
+DATA_SAMPLE_SIZE = 1000 # rows of ner.csv used for training, 0 uses the whole corpus
+CSV_USE_COLUMNS = ("text", "labels") # only columns of ner.csv that are loaded
+CSV_CHUNK_SIZE = 50000 # rows of ner.csv parsed at a time, loading stops once the sample size is reached
+CSV_ENGINE = "c" # "pyarrow" streams ner.csv with pyarrow.csv into arrow backed strings, needs pyarrow installed
+TRAIN_SPLIT_RATIO = 0.8 # share of rows in df_train, picked by a hash of every row
+VAL_SPLIT_RATIO = 0.1 # share of rows in df_val, the rest goes to df_test
+SPLIT_HASH_BUCKETS = 10000 # resolution of the split ratios
 
 # model_training constants
 MODEL_TRAINING_ARTIFACTS_DIR= "ModelTrainer"
@@ -36,10 +53,75 @@ EPOCHS= 1
 BATCH_SIZE= 2
 BERT_MODEL_INSTANCE_NAME= "bert_model_instance.pt"
 TOKENIZER_FILE_NAME="tokenizer.pkl"
+LAZY_TOKENIZATION= True # datasets keep raw text and labels and tokenize rows when loaded
+DATALOADER_NUM_WORKERS= 2 # worker processes tokenizing batches with lazy tokenization, 0 tokenizes in the training process
+TOKENIZED_DATASET_DIR= "tokenized_datasets" # tokenized datasets shared by every run, None tokenizes in DataSequence instead
+TOKENIZED_DATASET_MAX_DATASETS= 6 # least recently used datasets beyond this many are deleted, train, val and test of two data versions
+TOKENIZATION_CHUNK_SIZE= 10000 # rows per fast tokenizer call when datasets are built
+DYNAMIC_PADDING= True # training batches are padded to their longest row instead of 512 tokens
+LENGTH_GROUP_SIZE= 50 # batches per length group of the length grouped batch sampler
+
+# model_exporter constants
+MODEL_EXPORTER_ARTIFACTS_DIR = "ModelExporter"
+GCP_QUANTIZED_MODEL_NAME = "model_quantized.pt"
+GCP_ONNX_MODEL_NAME = "model.onnx"
+ONNX_OPSET_VERSION = 14
+GCP_TORCHSCRIPT_MODEL_NAME = "model_scripted.pt"
+EXPORT_PARITY_ATOL = 1e-4 # max abs difference between exported (onnx, torchscript) and eager pytorch logits
 
 # model_evaluation constants
 MODEL_EVALUATION_ARTIFACTS_DIR = "ModelEvaluation"
+QUANTIZED_ACCURACY_TOLERANCE = 0.01 # max test accuracy the int8 model may lose against fp32
+
+# model_predictor constants
+PREDICTION_BACKEND = "torch" # "torch" serves model.pt, "quantized" the int8 model_quantized.pt (model.pt when none passed the accuracy check), "onnx" model.onnx on onnx runtime, "torchscript" model_scripted.pt
+LONG_DOCUMENT_STRIDE = 128 # tokens shared by neighbouring windows of a long document
+ONNX_NUM_THREADS = 0 # onnx runtime intra-op threads, 0 keeps the onnx runtime default
+PREVIOUS_MODEL_DIR = "previous" # best_model/previous, snapshot of the replaced model for rollback
+MODEL_STATE_FILE_NAME = "model_state.json" # best_model/model_state.json, version of the files in best_model and rejected versions, shared by every serving process
+MODEL_LOCK_FILE_NAME = "model.lock" # best_model/model.lock, serializes artifact downloads, swaps and rollbacks across processes
+MODEL_WARM_UP_SENTENCES = ("John Smith lives in London .", "The United Nations met in New York on Monday .")
+
+# prediction_cache constants
+PREDICTION_CACHE_MAX_ENTRIES = 10000 # 0 disables the cache
+PREDICTION_CACHE_MAX_BYTES = 64 * 1024 * 1024
+PREDICTION_CACHE_TTL_SECONDS = 0 # 0 keeps predictions until evicted or the model is reloaded
+
+# prediction_bucketing constants
+PREDICTION_MAX_LENGTH = 512
+PREDICTION_LENGTH_BUCKETS = (32, 64, 128, 256, 512) # pad to the smallest bucket that fits, () pads to the longest sequence
+PREDICTION_BATCH_SIZE = 32 # sentences per forward pass for bulk prediction
+
+# batch_scheduler constants
+MAX_BATCH_SIZE = 16
+MAX_BATCH_WAIT_MS = 10
+
+# model_watcher constants
+MODEL_WATCHER_POLL_SECONDS = 60 # how often the bucket is checked for a new model version, 0 disables the watcher
+MODEL_WATCHER_LOCK_FILE_NAME = "watcher.lock" # best_model/watcher.lock, held by the one worker polling when the model is preloaded
+
+# stream_predictor constants
+STREAM_BATCH_SIZE = 32 # NDJSON lines per forward pass of /predict/stream
+
+# inference_executor constants
+INFERENCE_EXECUTOR_TYPE = "thread" # "thread" shares one model, "process" loads one model replica per worker process
+INFERENCE_MAX_WORKERS = 1
+INFERENCE_NUM_THREADS = 0 # torch intra-op threads per worker, 0 keeps the torch default
+
+# bulk_predictor constants
+BULK_PREDICTION_TEXT_COLUMN = "text" # csv column or jsonl field holding the sentence
+BULK_PREDICTION_SHARD_SIZE = 10000 # sentences per output shard, also the input chunk size
+BULK_PREDICTION_NUM_WORKERS = 2 # worker processes, each loads its own model
+BULK_PREDICTION_NUM_THREADS = 1 # torch intra-op threads per worker process
+BULK_PREDICTION_MODEL_DIR = "model" # <output_path>.shards/model, the model version pinned for the whole job
+
+# metrics constants
+METRICS_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0) # seconds
+METRICS_MULTIPROC_DIR_PREFIX = "ner_metrics_" # temporary PROMETHEUS_MULTIPROC_DIR when none is set
 
+# server constants (gunicorn.conf.py)
+SERVER_WORKERS = 4 # WEB_CONCURRENCY overrides
+SERVER_WORKER_TIMEOUT = 120 # seconds, covers model loading when it is not preloaded
 
 APP_HOST = "0.0.0.0"
 APP_PORT = 1111
\ No newline at end of file
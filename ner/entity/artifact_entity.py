@@ -26,13 +26,41 @@ class ModelTrainerArtifact:
     bert_model_train_path:str
     tokenizer_file_path:str
     
+# Model Exporter Artifacts
+@dataclass
+class ModelExporterArtifact:
+    quantized_model_path:str
+    onnx_model_path:str
+    torchscript_model_path:str
+    
 # Model Evaluation Artifacts
 @dataclass
 class ModelEvaluationArtifacts:
     trained_model_accuracy: float
     is_model_accepted: bool
+    quantized_model_accuracy: float = None
+    is_quantized_model_accepted: bool = False
     
 @dataclass
 class ModelPusherArtifacts:
     bucket_name: str
-    trained_model_path: str
\ No newline at end of file
+    trained_model_path: str
+    
+# Model Predictor Artifacts
+@dataclass
+class ModelPredictorArtifacts:
+    tokenizer: object
+    ids_to_labels: dict
+    model: object
+    model_version: str = None
+    source_version: str = None # generation/checksum of the bucket objects the artifacts were downloaded from
+    
+# Bulk Predictor Artifacts
+@dataclass
+class BulkPredictorArtifacts:
+    output_path: str
+    num_shards: int
+    num_sentences: int
+    num_resumed_sentences: int
+    sentences_per_second: float
+    model_version: str # every shard is predicted by this model version
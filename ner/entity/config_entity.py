@@ -21,6 +21,12 @@ class DataTransformationConfig:
     df_val_path:str= os.path.join(data_transformation_dir,DF_VAL_FILE_NAME) # "df_val.pkl"
     df_test_path:str= os.path.join(data_transformation_dir, DF_TEST_FILE_NAME) # "df_test.pkl"
     unique_labels_path:str= os.path.join(data_transformation_dir, UNIQUE_LABELS_FILE_NAME) # "unique_labels.pkl"
+    sample_size:int= DATA_SAMPLE_SIZE # 1000, 0 uses the whole corpus
+    csv_use_columns:tuple= CSV_USE_COLUMNS # ("text", "labels")
+    csv_chunk_size:int= CSV_CHUNK_SIZE # 50000
+    csv_engine:str= CSV_ENGINE # "c" or "pyarrow"
+    train_split_ratio:float= TRAIN_SPLIT_RATIO # 0.8
+    val_split_ratio:float= VAL_SPLIT_RATIO # 0.1
     
 @dataclass
 class ModelTrainerConfig:
@@ -28,18 +34,40 @@ class ModelTrainerConfig:
     bert_model_instance_path= os.path.join(model_training_dir, GCP_MODEL_NAME) # "model.pt"
     tokenizer_file_path= os.path.join(model_training_dir, TOKENIZER_FILE_NAME) #tokenizer.pkl"
     tokenizer_file_gcp_path= os.path.join(model_training_dir) # ModelTrainer
+    lazy_tokenization:bool= LAZY_TOKENIZATION # True
+    dataloader_num_workers:int= DATALOADER_NUM_WORKERS # 2
+    tokenized_dataset_dir:str= TOKENIZED_DATASET_DIR # "tokenized_datasets"
+    tokenized_dataset_max_datasets:int= TOKENIZED_DATASET_MAX_DATASETS # 6
+    tokenization_chunk_size:int= TOKENIZATION_CHUNK_SIZE # 10000
+    dynamic_padding:bool= DYNAMIC_PADDING # True
+    length_group_size:int= LENGTH_GROUP_SIZE # 50 batches
+    
+@dataclass
+class ModelExporterConfig:
+    model_exporter_dir= os.path.join(ARTIFACTS_DIR, MODEL_EXPORTER_ARTIFACTS_DIR) # ModelExporter
+    quantized_model_path= os.path.join(model_exporter_dir, GCP_QUANTIZED_MODEL_NAME) # "model_quantized.pt"
+    onnx_model_path= os.path.join(model_exporter_dir, GCP_ONNX_MODEL_NAME) # "model.onnx"
+    onnx_opset_version= ONNX_OPSET_VERSION # 14
+    torchscript_model_path= os.path.join(model_exporter_dir, GCP_TORCHSCRIPT_MODEL_NAME) # "model_scripted.pt"
+    export_parity_atol= EXPORT_PARITY_ATOL # 1e-4
     
 @dataclass
 class ModelEvaluationConfig:
     model_evaluation_dir= os.path.join(ARTIFACTS_DIR, MODEL_EVALUATION_ARTIFACTS_DIR) #ModelEvaluation dir
     gcp_model_path:str= os.getcwd() # get model to current working directory
     gcp_local_path:str= GCP_MODEL_NAME # "model.pt"
+    quantized_accuracy_tolerance:float= QUANTIZED_ACCURACY_TOLERANCE # 0.01
+    lazy_tokenization:bool= LAZY_TOKENIZATION # True
+    tokenized_dataset_dir:str= TOKENIZED_DATASET_DIR # "tokenized_datasets"
+    tokenized_dataset_max_datasets:int= TOKENIZED_DATASET_MAX_DATASETS # 6
+    tokenization_chunk_size:int= TOKENIZATION_CHUNK_SIZE # 10000
     
 @dataclass
 class ModelPusherConfig:
     bucket_name:str= BUCKET_NAME # "ner-using-bert-1"
     model_name:str= GCP_MODEL_NAME # "model.pt"
     upload_model_path: str = os.path.join(ARTIFACTS_DIR, MODEL_TRAINING_ARTIFACTS_DIR) # artifacts/ModelTrainer
+    upload_exported_model_path: str = os.path.join(ARTIFACTS_DIR, MODEL_EXPORTER_ARTIFACTS_DIR) # artifacts/ModelExporter
     
 @dataclass
 class ModelPredictorConfig:
@@ -48,4 +76,49 @@ class ModelPredictorConfig:
     best_model_dir:str= BEST_MODEL_DIR # "best_model"
     best_model_from_gcp_path:str= os.path.join(BEST_MODEL_DIR) # /best_model
     best_model_path:str= os.path.join(BEST_MODEL_DIR, GCP_MODEL_NAME) # best_model/model.pt
-    
\ No newline at end of file
+    best_quantized_model_path:str= os.path.join(BEST_MODEL_DIR, GCP_QUANTIZED_MODEL_NAME) # best_model/model_quantized.pt
+    best_onnx_model_path:str= os.path.join(BEST_MODEL_DIR, GCP_ONNX_MODEL_NAME) # best_model/model.onnx
+    best_torchscript_model_path:str= os.path.join(BEST_MODEL_DIR, GCP_TORCHSCRIPT_MODEL_NAME) # best_model/model_scripted.pt
+    max_length:int= PREDICTION_MAX_LENGTH # 512
+    length_buckets:tuple= PREDICTION_LENGTH_BUCKETS # (32, 64, 128, 256, 512)
+    batch_size:int= PREDICTION_BATCH_SIZE # 32
+    long_document_stride:int= LONG_DOCUMENT_STRIDE # 128
+    backend:str= PREDICTION_BACKEND # "torch", "quantized", "onnx" or "torchscript"
+    onnx_num_threads:int= ONNX_NUM_THREADS # 0 keeps onnx runtime default
+    cache_max_entries:int= PREDICTION_CACHE_MAX_ENTRIES # 10000, 0 disables the cache
+    cache_max_bytes:int= PREDICTION_CACHE_MAX_BYTES # 64 MB
+    cache_ttl_seconds:float= PREDICTION_CACHE_TTL_SECONDS # 0 disables expiry
+    previous_model_dir:str= os.path.join(BEST_MODEL_DIR, PREVIOUS_MODEL_DIR) # best_model/previous
+    model_state_path:str= os.path.join(BEST_MODEL_DIR, MODEL_STATE_FILE_NAME) # best_model/model_state.json
+    model_lock_path:str= os.path.join(BEST_MODEL_DIR, MODEL_LOCK_FILE_NAME) # best_model/model.lock
+    warm_up_sentences:tuple= MODEL_WARM_UP_SENTENCES
+    
+@dataclass
+class BatchSchedulerConfig:
+    max_batch_size:int= MAX_BATCH_SIZE # 16 sentences per forward pass
+    max_wait_ms:float= MAX_BATCH_WAIT_MS # 10 ms collection window
+    max_concurrent_batches:int= INFERENCE_MAX_WORKERS # batches in flight at once, one per inference worker
+    
+@dataclass
+class ModelWatcherConfig:
+    poll_interval_seconds:float= MODEL_WATCHER_POLL_SECONDS # 60, 0 disables the watcher
+    lock_path:str= os.path.join(BEST_MODEL_DIR, MODEL_WATCHER_LOCK_FILE_NAME) # best_model/watcher.lock
+    
+@dataclass
+class StreamPredictorConfig:
+    batch_size:int= STREAM_BATCH_SIZE # 32 lines per forward pass
+    
+@dataclass
+class InferenceExecutorConfig:
+    executor_type:str= INFERENCE_EXECUTOR_TYPE # "thread" or "process"
+    max_workers:int= INFERENCE_MAX_WORKERS # 1
+    num_threads:int= INFERENCE_NUM_THREADS # 0 keeps torch default
+    
+@dataclass
+class BulkPredictorConfig:
+    input_path:str # .csv or .jsonl file of sentences
+    output_path:str # .jsonl file of {"text", "labels"} records, in input order
+    text_column:str= BULK_PREDICTION_TEXT_COLUMN # "text"
+    shard_size:int= BULK_PREDICTION_SHARD_SIZE # 10000 sentences
+    num_workers:int= BULK_PREDICTION_NUM_WORKERS # 2 processes
+    num_threads:int= BULK_PREDICTION_NUM_THREADS # 1 torch thread per process
@@ -11,6 +11,13 @@ def error_message_detail(error, error_detail):
     return error_message
 
 
+def rebuild_ner_exception(error_message):
+    exception = NerException.__new__(NerException)
+    Exception.__init__(exception, error_message)
+    exception.error_message = error_message
+    return exception
+
+
 class NerException(Exception):
     def __init__(self, error_message, error_detail):
         """
@@ -22,4 +29,8 @@ class NerException(Exception):
         )
 
     def __str__(self):
-        return self.error_message
\ No newline at end of file
+        return self.error_message
+
+    def __reduce__(self):
+        # raised in a worker process and pickled back to the parent, which has no traceback to format it from
+        return rebuild_ner_exception, (self.error_message,)
@@ -4,12 +4,21 @@ from ner.constants import *
 
 logs_path = os.path.join(os.getcwd(), "logs", TIMESTAMP)
 
-os.makedirs(logs_path, exist_ok=True)
-
 LOG_FILE_PATH = os.path.join(logs_path, LOGS_FILE_NAME)
 
+
+class LazyFileHandler(logging.FileHandler):
+    '''FileHandler that creates the log directory and file on the first record instead of at import'''
+    def __init__(self, filename: str) -> None:
+        super().__init__(filename, delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
 logging.basicConfig(
-    filename=LOG_FILE_PATH,
+    handlers=[LazyFileHandler(LOG_FILE_PATH)],
     format="[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s",
     level=logging.INFO,
-)
\ No newline at end of file
+)
@@ -0,0 +1,188 @@
+import asyncio
+import inspect
+import sys
+import time
+from typing import Callable, Optional
+from ner.entity.config_entity import BatchSchedulerConfig
+from ner.exception import NerException
+from ner.logger import logging
+from ner.utils.metrics import QUEUE_DEPTH, STAGE_SECONDS
+
+
+class BatchSchedulerStats:
+    '''Running batch size and queue wait statistics of MicroBatchScheduler'''
+    def __init__(self) -> None:
+        self.total_batches = 0
+        self.total_requests = 0
+        self.max_batch_size = 0
+        self.total_queue_wait_ms = 0.0
+        self.max_queue_wait_ms = 0.0
+
+    def record(self, batch_size: int, queue_waits_ms: list) -> None:
+        self.total_batches += 1
+        self.total_requests += batch_size
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+        self.total_queue_wait_ms += sum(queue_waits_ms)
+        self.max_queue_wait_ms = max(self.max_queue_wait_ms, max(queue_waits_ms))
+
+    def as_dict(self) -> dict:
+        return {
+            "total_batches": self.total_batches,
+            "total_requests": self.total_requests,
+            "mean_batch_size": self.total_requests / self.total_batches if self.total_batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "mean_queue_wait_ms": self.total_queue_wait_ms / self.total_requests if self.total_requests else 0.0,
+            "max_queue_wait_ms": self.max_queue_wait_ms,
+        }
+
+
+class MicroBatchScheduler:
+    '''Collects concurrent prediction requests into batched forward passes, up to max_concurrent_batches run at once'''
+    def __init__(self, predict_fn: Callable[[list], list], batch_scheduler_config: BatchSchedulerConfig) -> None:
+        """
+        :param predict_fn: takes a list of sentences and returns (or returns an awaitable of) a list of 
+                           (sentence, prediction_label) in input order
+        :param batch_scheduler_config: configuration for batch scheduler (obj of BatchSchedulerConfig class)
+        """
+        try:
+            self.predict_fn = predict_fn
+            self.batch_scheduler_config = batch_scheduler_config
+            self.stats = BatchSchedulerStats()
+            self._queue: Optional[asyncio.Queue] = None
+            self._worker: Optional[asyncio.Task] = None
+            self._batch_slots: Optional[asyncio.Semaphore] = None
+            self._batch_tasks: set = set()
+
+        except Exception as e:
+            raise NerException(e, sys)
+
+    async def start(self) -> None:
+        """
+        Method Name :   start
+        Description :   This method starts the batch collector task on the running event loop
+        """
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._batch_slots = asyncio.Semaphore(max(self.batch_scheduler_config.max_concurrent_batches, 1))
+            self._worker = asyncio.create_task(self._collect_batches())
+            logging.info("Started the micro batch scheduler")
+
+    async def stop(self) -> None:
+        """
+        Method Name :   stop
+        Description :   This method stops the batch collector task, lets the batches in flight finish and fails 
+                        requests still waiting in the queue
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+
+            requests = []
+            while not self._queue.empty():
+                requests.append(self._queue.get_nowait())
+            QUEUE_DEPTH.set(0)
+            self._fail_requests(requests)
+            logging.info("Stopped the micro batch scheduler")
+
+    def _fail_requests(self, requests: list) -> None:
+        for _, future, _ in requests:
+            if not future.done():
+                future.set_exception(RuntimeError("Micro batch scheduler stopped"))
+
+    async def submit(self, sentence: str) -> tuple:
+        """
+        Method Name :   submit
+        Description :   This method queues one sentence and waits for its result from the next batch
+
+        Output      :   Returns sentence, prediction_label
+        On Failure  :   Raises the error of the batch the sentence was part of
+        """
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((sentence, future, time.perf_counter()))
+        # kept current by this process, every server worker adds its own queue to the scraped total
+        QUEUE_DEPTH.set(self._queue.qsize())
+        return await future
+
+    def get_stats(self) -> dict:
+        stats = self.stats.as_dict()
+        stats["queue_depth"] = self._queue.qsize() if self._queue is not None else 0
+        stats["batches_in_flight"] = len(self._batch_tasks)
+        return stats
+
+    async def _next_batch(self) -> list:
+        # block for the first request, then keep collecting until the batch is full or the window closes
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_scheduler_config.max_wait_ms / 1000
+
+        try:
+            while len(batch) < self.batch_scheduler_config.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+                except asyncio.TimeoutError:
+                    break
+        except asyncio.CancelledError:
+            # stopped while the window was open, the requests taken off the queue are no longer drained by stop()
+            self._fail_requests(batch)
+            raise
+        finally:
+            QUEUE_DEPTH.set(self._queue.qsize())
+
+        return batch
+
+    async def run_batch(self, sentences: list) -> list:
+        results = self.predict_fn(sentences)
+        if inspect.isawaitable(results):
+            results = await results
+        return results
+
+    async def _collect_batches(self) -> None:
+        while True:
+            # a batch is only collected once a worker is free for it, requests arriving meanwhile fill it up
+            await self._batch_slots.acquire()
+            try:
+                batch = await self._next_batch()
+            except BaseException:
+                self._batch_slots.release()
+                raise
+
+            now = time.perf_counter()
+            queue_waits = [now - enqueued_at for _, _, enqueued_at in batch]
+            self.stats.record(
+                batch_size=len(batch),
+                queue_waits_ms=[queue_wait * 1000 for queue_wait in queue_waits],
+            )
+            for queue_wait in queue_waits:
+                STAGE_SECONDS.labels(stage="queue_wait").observe(queue_wait)
+
+            # runs on its own, collection of the next batch goes on while this one is in the worker pool
+            batch_task = asyncio.create_task(self._dispatch_batch(batch))
+            self._batch_tasks.add(batch_task)
+            batch_task.add_done_callback(self._batch_tasks.discard)
+
+    async def _dispatch_batch(self, batch: list) -> None:
+        try:
+            sentences = [sentence for sentence, _, _ in batch]
+            try:
+                results = await self.run_batch(sentences)
+            except Exception as e:
+                logging.info(f"Micro batch of {len(batch)} sentences failed: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._batch_slots.release()
@@ -0,0 +1,292 @@
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterator, Optional
+import pandas as pd
+import torch
+from ner.configuration.gcloud import GCloud
+from ner.constants import *
+from ner.entity.config_entity import BulkPredictorConfig, ModelPredictorConfig
+from ner.entity.artifact_entity import BulkPredictorArtifacts
+from ner.exception import NerException
+from ner.logger import logging
+from ner.pipeline.prediction_pipeline import ModelPredictor
+
+
+# model replica of a bulk prediction worker process, set by the pool initializer
+_worker_model_predictor: Optional[ModelPredictor] = None
+
+
+def _init_bulk_worker(num_threads: int, model_predictor_config: ModelPredictorConfig) -> None:
+    global _worker_model_predictor
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+    _worker_model_predictor = ModelPredictor(model_predictor_config=model_predictor_config)
+    try:
+        _load_pinned_model_artifacts()
+    except Exception as e:
+        # a failing initializer breaks the whole pool, the load error is raised again by the first shard instead
+        logging.info(f"Could not load model artifacts in bulk prediction worker process: {e}")
+
+
+def _load_pinned_model_artifacts() -> None:
+    # only the files the parent pinned are loaded, the bucket is never checked for a newer version mid-job
+    if _worker_model_predictor.model_predictor_artifacts is None:
+        _worker_model_predictor.swap_model_artifacts(_worker_model_predictor.load_model_artifacts(download=False))
+
+
+def _predict_shard(sentences: list, shard_path: str) -> int:
+    _load_pinned_model_artifacts()
+    predictions = _worker_model_predictor.predict_batch(sentences)
+
+    # the shard only appears under its final name once it is complete, that is what resuming relies on
+    tmp_shard_path = shard_path + ".tmp"
+    with open(tmp_shard_path, "w", encoding="utf-8") as shard_file:
+        for sentence, prediction_label in predictions:
+            shard_file.write(json.dumps({"text": sentence, "labels": prediction_label}) + "\n")
+    os.replace(tmp_shard_path, shard_path)
+    return len(predictions)
+
+
+class BulkPredictor:
+    '''Tags a csv or jsonl file of sentences offline, shard by shard, in a pool of worker processes'''
+    def __init__(self, bulk_predictor_config: BulkPredictorConfig, gcloud: GCloud = None) -> None:
+        """
+        :param bulk_predictor_config: configuration for bulk predictor (obj of BulkPredictorConfig class)
+        :param gcloud: get the model artifacts from gcloud
+        """
+        try:
+            self.bulk_predictor_config = bulk_predictor_config
+            self.shards_dir = bulk_predictor_config.output_path + ".shards"
+            # the model of the job, apart from best_model so the job and the server never move each other's model
+            self.model_dir = os.path.join(self.shards_dir, BULK_PREDICTION_MODEL_DIR)
+            self.model_predictor = ModelPredictor(
+                model_predictor_config=self.get_model_predictor_config(), gcloud=gcloud,
+            )
+
+        except Exception as e:
+            raise NerException(e, sys)
+
+    def read_chunks(self) -> Iterator[list]:
+        """
+        Method Name :   read_chunks
+        Description :   This method reads the input file in chunks of shard_size sentences, a csv file by its
+                        text column, a jsonl file by the text field of every object (or the line itself when it is a string)
+
+        Output      :   Yields lists of sentences
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            input_path = self.bulk_predictor_config.input_path
+            text_column = self.bulk_predictor_config.text_column
+            shard_size = self.bulk_predictor_config.shard_size
+
+            if input_path.endswith(".csv"):
+                for chunk in pd.read_csv(input_path, usecols=[text_column], dtype={text_column: str},
+                                         keep_default_na=False, chunksize=shard_size):
+                    yield chunk[text_column].tolist()
+                return
+
+            if not input_path.endswith((".jsonl", ".ndjson")):
+                raise ValueError(f"Unsupported bulk prediction input {input_path}, expected .csv or .jsonl")
+
+            chunk = []
+            with open(input_path, "r", encoding="utf-8") as input_file:
+                for line in input_file:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    chunk.append(record if isinstance(record, str) else record[text_column])
+                    if len(chunk) == shard_size:
+                        yield chunk
+                        chunk = []
+            if chunk:
+                yield chunk
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    def get_model_predictor_config(self) -> ModelPredictorConfig:
+        return ModelPredictorConfig(
+            tokenizer_local_path=os.path.join(self.model_dir, TOKENIZER_FILE_NAME),
+            ids_to_labels_local_path=os.path.join(self.model_dir, IDS_TO_LABELS_FILE_NAME),
+            best_model_dir=self.model_dir,
+            best_model_from_gcp_path=self.model_dir,
+            best_model_path=os.path.join(self.model_dir, GCP_MODEL_NAME),
+            best_quantized_model_path=os.path.join(self.model_dir, GCP_QUANTIZED_MODEL_NAME),
+            best_onnx_model_path=os.path.join(self.model_dir, GCP_ONNX_MODEL_NAME),
+            best_torchscript_model_path=os.path.join(self.model_dir, GCP_TORCHSCRIPT_MODEL_NAME),
+            previous_model_dir=os.path.join(self.model_dir, PREVIOUS_MODEL_DIR),
+            model_state_path=os.path.join(self.model_dir, MODEL_STATE_FILE_NAME),
+            model_lock_path=os.path.join(self.model_dir, MODEL_LOCK_FILE_NAME),
+        )
+
+    def pin_model_artifacts(self) -> str:
+        """
+        Method Name :   pin_model_artifacts
+        Description :   This method downloads the model artifacts once into the model directory of the job, every 
+                        worker process loads these files, an interrupted job keeps them for its resume
+
+        Output      :   Returns model version of the pinned files
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            if not all(os.path.exists(file_path) for file_path in self.model_predictor.get_local_artifact_paths()):
+                self.model_predictor.download_model_artifacts()
+
+            model_version = self.model_predictor.get_model_version()
+            logging.info(f"Pinned model version {model_version} in {self.model_dir} for bulk prediction")
+            return model_version
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    def get_shard_path(self, shard_index: int) -> str:
+        return os.path.join(self.shards_dir, f"shard-{shard_index:06d}.jsonl")
+
+    def prepare_shards_dir(self) -> str:
+        """
+        Method Name :   prepare_shards_dir
+        Description :   This method creates the shards directory and pins the model of the job, or checks that the 
+                        shards left by an interrupted run were cut from the same input with the same shard size and 
+                        predicted by the same model version before they are reused
+
+        Output      :   Returns model version of the job
+        On Failure  :   Raises an exception when the existing shards belong to another input or model version
+        """
+        try:
+            input_stat = os.stat(self.bulk_predictor_config.input_path)
+            manifest = {
+                "input_path": os.path.abspath(self.bulk_predictor_config.input_path),
+                "input_size": input_stat.st_size,
+                "input_mtime": input_stat.st_mtime,
+                "text_column": self.bulk_predictor_config.text_column,
+                "shard_size": self.bulk_predictor_config.shard_size,
+            }
+            manifest_path = os.path.join(self.shards_dir, "manifest.json")
+
+            if os.path.exists(manifest_path):
+                with open(manifest_path, "r") as manifest_file:
+                    resumed_manifest = json.load(manifest_file)
+                resumed_model_version = resumed_manifest.pop("model_version", None)
+                if resumed_manifest != manifest:
+                    raise ValueError(
+                        f"{self.shards_dir} holds shards of another input or shard size, remove it to start over"
+                    )
+
+                # a pinned model removed since is downloaded again, it has to be the same version
+                model_version = self.pin_model_artifacts()
+                if model_version != resumed_model_version:
+                    raise ValueError(
+                        f"{self.shards_dir} holds shards of model version {resumed_model_version}, the model is now "
+                        f"version {model_version}, remove it to start over"
+                    )
+                logging.info(f"Resuming bulk prediction from the shards in {self.shards_dir}")
+                return model_version
+
+            # files of a run interrupted before its manifest was written may be incomplete
+            if os.path.isdir(self.model_dir):
+                shutil.rmtree(self.model_dir)
+            os.makedirs(self.model_dir, exist_ok=True)
+            manifest["model_version"] = self.pin_model_artifacts()
+            with open(manifest_path, "w") as manifest_file:
+                json.dump(manifest, manifest_file)
+            return manifest["model_version"]
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    def merge_shards(self, num_shards: int) -> None:
+        """
+        Method Name :   merge_shards
+        Description :   This method concatenates the shards in input order into the output file and removes them
+
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the merge_shards method of Bulk predictor class")
+        try:
+            tmp_output_path = self.bulk_predictor_config.output_path + ".tmp"
+            with open(tmp_output_path, "wb") as output_file:
+                for shard_index in range(num_shards):
+                    with open(self.get_shard_path(shard_index), "rb") as shard_file:
+                        shutil.copyfileobj(shard_file, output_file)
+            os.replace(tmp_output_path, self.bulk_predictor_config.output_path)
+            shutil.rmtree(self.shards_dir)
+
+            logging.info(f"Merged {num_shards} shards into {self.bulk_predictor_config.output_path}")
+            logging.info("Exited the merge_shards method of Bulk predictor class")
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    def initiate_bulk_predictor(self) -> BulkPredictorArtifacts:
+        """
+        Method Name :   initiate_bulk_predictor
+        Description :   This method shards the input over the worker processes, every worker runs batched forward
+                        passes on its own replica of the pinned model and writes one output shard, shards completed 
+                        by an earlier run are skipped
+
+        Output      :   Returns bulk predictor artifacts
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the initiate_bulk_predictor method of Bulk predictor class")
+        try:
+            model_version = self.prepare_shards_dir()
+
+            num_shards = 0
+            num_sentences = 0
+            num_resumed_sentences = 0
+            start_time = time.perf_counter()
+
+            # spawn, forking a process that already started torch threads can deadlock
+            with ProcessPoolExecutor(
+                max_workers=self.bulk_predictor_config.num_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_bulk_worker,
+                initargs=(self.bulk_predictor_config.num_threads, self.model_predictor.model_predictor_config),
+            ) as executor:
+                # at most two shards per worker are held in memory at once
+                max_pending = 2 * self.bulk_predictor_config.num_workers
+                pending = set()
+
+                for shard_index, sentences in enumerate(self.read_chunks()):
+                    num_shards += 1
+                    shard_path = self.get_shard_path(shard_index)
+                    if os.path.exists(shard_path):
+                        num_resumed_sentences += len(sentences)
+                        continue
+
+                    if len(pending) >= max_pending:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        num_sentences += sum(future.result() for future in done)
+                    pending.add(executor.submit(_predict_shard, sentences, shard_path))
+
+                for future in pending:
+                    num_sentences += future.result()
+
+            elapsed = time.perf_counter() - start_time
+            sentences_per_second = num_sentences / elapsed if elapsed > 0 else 0.0
+            logging.info(
+                f"Tagged {num_sentences} sentences in {elapsed:.1f}s ({sentences_per_second:.1f} sentences/sec), "
+                f"{num_resumed_sentences} sentences resumed from earlier shards, model version {model_version}"
+            )
+
+            self.merge_shards(num_shards=num_shards)
+
+            bulk_predictor_artifacts = BulkPredictorArtifacts(
+                output_path=self.bulk_predictor_config.output_path,
+                num_shards=num_shards,
+                num_sentences=num_sentences,
+                num_resumed_sentences=num_resumed_sentences,
+                sentences_per_second=sentences_per_second,
+                model_version=model_version,
+            )
+            logging.info("Exited the initiate_bulk_predictor method of Bulk predictor class")
+            return bulk_predictor_artifacts
+
+        except Exception as e:
+            raise NerException(e, sys) from e
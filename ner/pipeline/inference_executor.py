@@ -0,0 +1,275 @@
+import asyncio
+import gc
+import multiprocessing
+import multiprocessing.util
+import os
+import signal
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+import torch
+from ner.entity.config_entity import InferenceExecutorConfig
+from ner.exception import NerException
+from ner.logger import logging
+from ner.pipeline.prediction_pipeline import ModelPredictor
+from ner.utils.metrics import mark_process_dead
+
+
+# model replica of a worker process, set by the pool initializer
+_worker_model_predictor: Optional[ModelPredictor] = None
+
+
+def _init_worker_process(num_threads: int) -> None:
+    global _worker_model_predictor
+    # the gauges of a worker that exits (pool shutdown or replaced on reload) leave the scraped values, the
+    # finalizer runs when the pool stops the worker, atexit hooks do not run in multiprocessing workers
+    multiprocessing.util.Finalize(None, mark_process_dead, args=(os.getpid(),), exitpriority=0)
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+    _worker_model_predictor = ModelPredictor()
+    try:
+        _worker_model_predictor.get_model_artifacts()
+    except Exception as e:
+        # a failing initializer breaks the whole pool, the model is loaded again on the first batch instead
+        logging.info(f"Could not load model artifacts in inference worker process: {e}")
+
+
+def _run_in_worker_process(method_name: str, *args):
+    # the worker records its metrics in PROMETHEUS_MULTIPROC_DIR, nothing travels back with the result
+    return getattr(_worker_model_predictor, method_name)(*args)
+
+
+class InferenceExecutor:
+    '''Runs ModelPredictor work off the event loop, in a thread pool or in a pool of processes with their own model'''
+    def __init__(self, model_predictor: ModelPredictor, inference_executor_config: InferenceExecutorConfig) -> None:
+        """
+        :param model_predictor: predictor shared by the worker threads, unused in process mode
+        :param inference_executor_config: configuration for inference executor (obj of InferenceExecutorConfig class)
+        """
+        try:
+            if inference_executor_config.executor_type not in ("thread", "process"):
+                raise ValueError(f"Unknown inference executor type: {inference_executor_config.executor_type}")
+
+            self.model_predictor = model_predictor
+            self.inference_executor_config = inference_executor_config
+            self.executor: Optional[Executor] = None
+            # set in the server master by preload, the forked workers inherit it
+            self.preloaded = False
+
+        except Exception as e:
+            raise NerException(e, sys)
+
+    def _create_executor(self) -> Executor:
+        if self.inference_executor_config.executor_type == "process":
+            # spawn, forking a process that already started torch threads can deadlock
+            return ProcessPoolExecutor(
+                max_workers=self.inference_executor_config.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker_process,
+                initargs=(self.inference_executor_config.num_threads,),
+            )
+
+        if self.inference_executor_config.num_threads > 0:
+            torch.set_num_threads(self.inference_executor_config.num_threads)
+        return ThreadPoolExecutor(
+            max_workers=self.inference_executor_config.max_workers,
+            thread_name_prefix="inference",
+        )
+
+    def preload(self) -> bool:
+        """
+        Method Name :   preload
+        Description :   This method loads the model in the server master process before it forks its workers, the
+                        workers then share the weights copy-on-write instead of each loading their own copy, the loaded
+                        objects are moved to the permanent gc generation so collections in the workers never write to
+                        (and un-share) their pages
+
+        Output      :   Returns True when the model was preloaded
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the preload method of Inference executor class")
+        try:
+            if self.inference_executor_config.executor_type != "thread":
+                logging.info("Model not preloaded, process executor workers load their own model replica")
+                return False
+
+            if self.model_predictor.model_predictor_config.backend == "onnx":
+                # an onnx runtime session starts its thread pools on creation and is not fork safe
+                logging.info("Model not preloaded, the onnx backend has to be loaded after the fork")
+                return False
+
+            self.model_predictor.get_model_artifacts()
+
+            # no forward pass here, torch worker threads started before a fork can deadlock in the children
+            gc.freeze()
+            gc.enable()
+            self.preloaded = True
+
+            logging.info(f"Preloaded the model before fork, {gc.get_freeze_count()} objects frozen")
+            logging.info("Exited the preload method of Inference executor class")
+            return True
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    async def start(self) -> None:
+        """
+        Method Name :   start
+        Description :   This method creates the worker pool and loads the model in it
+
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            if self.executor is None:
+                self.executor = self._create_executor()
+                logging.info(
+                    f"Started {self.inference_executor_config.executor_type} inference executor "
+                    f"with {self.inference_executor_config.max_workers} workers"
+                )
+            await self.warm_up()
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    async def warm_up(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self.inference_executor_config.executor_type == "process":
+            # every worker process loads its model replica in the pool initializer
+            await asyncio.gather(
+                *[
+                    loop.run_in_executor(self.executor, _run_in_worker_process, "predict_batch", [])
+                    for _ in range(self.inference_executor_config.max_workers)
+                ]
+            )
+        else:
+            await loop.run_in_executor(self.executor, self.model_predictor.get_model_artifacts)
+
+    async def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+            logging.info("Stopped the inference executor")
+
+    async def run(self, method_name: str, *args):
+        """
+        Method Name :   run
+        Description :   This method runs a ModelPredictor method in the worker pool and awaits its result
+
+        Output      :   Returns the result of the ModelPredictor method
+        """
+        if self.executor is None:
+            self.executor = self._create_executor()
+
+        loop = asyncio.get_running_loop()
+        if self.inference_executor_config.executor_type == "process":
+            return await loop.run_in_executor(self.executor, _run_in_worker_process, method_name, *args)
+        return await loop.run_in_executor(self.executor, getattr(self.model_predictor, method_name), *args)
+
+    async def predict_batch(self, sentences: list) -> list:
+        return await self.run("predict_batch", sentences)
+
+    async def predict_document(self, sentence: str) -> tuple:
+        return await self.run("predict_document", sentence)
+
+    def get_cache_stats(self) -> Optional[dict]:
+        if self.inference_executor_config.executor_type == "process":
+            # every worker process has its own cache, their lookups are in /metrics (ner_prediction_cache_lookups)
+            return None
+        # answered without queueing behind the forward passes of the pool
+        return self.model_predictor.get_cache_stats()
+
+    async def get_model_status(self) -> dict:
+        if self.inference_executor_config.executor_type == "process":
+            return await self.run("get_model_status")
+        # cheap and lock free, answered without queueing behind the forward passes of the pool
+        return self.model_predictor.get_model_status()
+
+    def request_master_reload(self) -> None:
+        # a worker loading a model of its own loses the copy-on-write sharing, the master loads it once and
+        # forks new workers (gunicorn.conf.py on_reload)
+        logging.info("Asking the server master process to load the model and fork new workers")
+        os.kill(os.getppid(), signal.SIGHUP)
+
+    async def reload(self) -> None:
+        """
+        Method Name :   reload
+        Description :   This method loads the latest model artifacts into the workers, with a preloaded model the 
+                        server master does and forks new workers
+
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            if self.preloaded:
+                self.request_master_reload()
+            elif self.inference_executor_config.executor_type == "process":
+                # new worker processes load the latest model, the old pool finishes its running batches
+                old_executor, self.executor = self.executor, self._create_executor()
+                await self.warm_up()
+                if old_executor is not None:
+                    await asyncio.get_running_loop().run_in_executor(None, old_executor.shutdown)
+            else:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(self.executor, self.model_predictor.reload_model_artifacts)
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    async def update(self) -> bool:
+        """
+        Method Name :   update
+        Description :   This method swaps in a new model version from the bucket without stopping serving, in thread 
+                        mode the shared predictor loads and warms it next to the serving model, in process mode a new 
+                        pool of workers does, with a preloaded model the server master does and forks new workers
+
+        Output      :   Returns True when a new model was swapped in (or, preloaded, the master was asked to)
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            if self.preloaded:
+                model_predictor_artifacts = self.model_predictor.model_predictor_artifacts
+                update_available = await asyncio.get_running_loop().run_in_executor(
+                    None, self.model_predictor.is_update_available,
+                    model_predictor_artifacts.source_version if model_predictor_artifacts is not None else None,
+                )
+                if update_available:
+                    self.request_master_reload()
+                return update_available
+
+            if self.inference_executor_config.executor_type == "process":
+                # the parent has no model loaded, compare against the version a worker serves
+                status = await self.get_model_status()
+                update_available = await asyncio.get_running_loop().run_in_executor(
+                    None, self.model_predictor.is_update_available, status["source_version"]
+                )
+                if not update_available:
+                    return False
+                await self.reload()
+                return True
+
+            # its own thread, a slow model load must not hold up the inference workers
+            return await asyncio.get_running_loop().run_in_executor(None, self.model_predictor.update_model_artifacts)
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    async def rollback(self) -> dict:
+        """
+        Method Name :   rollback
+        Description :   This method swaps the previous model back in, with a preloaded model the worker rolls back 
+                        the files and the server master loads them and forks new workers
+
+        Output      :   Returns the model status after the rollback
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            if self.inference_executor_config.executor_type == "process":
+                raise ValueError("Model rollback needs the thread inference executor")
+
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.model_predictor.rollback_model_artifacts)
+            if self.preloaded:
+                self.request_master_reload()
+            return self.model_predictor.get_model_status()
+
+        except Exception as e:
+            raise NerException(e, sys) from e
@@ -0,0 +1,122 @@
+import asyncio
+import fcntl
+import os
+import sys
+import time
+from typing import Optional
+from ner.entity.config_entity import ModelWatcherConfig
+from ner.exception import NerException
+from ner.logger import logging
+from ner.pipeline.inference_executor import InferenceExecutor
+
+
+class ModelWatcher:
+    '''Background task of the serving process that swaps in new model versions pushed to the bucket'''
+    def __init__(self, inference_executor: InferenceExecutor, model_watcher_config: ModelWatcherConfig) -> None:
+        """
+        :param inference_executor: executor whose model is kept up to date
+        :param model_watcher_config: configuration for model watcher (obj of ModelWatcherConfig class)
+        """
+        try:
+            self.inference_executor = inference_executor
+            self.model_watcher_config = model_watcher_config
+            self._worker: Optional[asyncio.Task] = None
+            # open while this process is the one polling for the preloaded workers
+            self._lock_file = None
+            self.last_check_time: Optional[float] = None
+            self.last_update_time: Optional[float] = None
+            self.last_error: Optional[str] = None
+            self.num_updates = 0
+
+        except Exception as e:
+            raise NerException(e, sys)
+
+    async def start(self) -> None:
+        """
+        Method Name :   start
+        Description :   This method starts the polling task on the running event loop, unless polling is disabled
+        """
+        if self._worker is None and self.model_watcher_config.poll_interval_seconds > 0:
+            self._worker = asyncio.create_task(self._watch())
+            logging.info(f"Started the model watcher, polling every {self.model_watcher_config.poll_interval_seconds}s")
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+            logging.info("Stopped the model watcher")
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def is_polling_worker(self) -> bool:
+        """
+        Method Name :   is_polling_worker
+        Description :   This method tells whether this process polls the bucket, every process does unless the model 
+                        is preloaded, then the workers share one model and only the worker holding the watcher lock 
+                        polls (and asks the master to reload), another worker takes over the lock when it exits
+
+        Output      :   Returns True when this process polls
+        """
+        if not self.inference_executor.preloaded or self._lock_file is not None:
+            return True
+
+        os.makedirs(os.path.dirname(self.model_watcher_config.lock_path) or ".", exist_ok=True)
+        lock_file = open(self.model_watcher_config.lock_path, "a")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+
+        self._lock_file = lock_file
+        logging.info(f"Model watcher of worker {os.getpid()} polls for all workers sharing the preloaded model")
+        return True
+
+    async def check(self) -> bool:
+        """
+        Method Name :   check
+        Description :   This method checks the bucket once and swaps in a new model version when there is one
+
+        Output      :   Returns True when a new model was swapped in
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            self.last_check_time = time.time()
+            updated = await self.inference_executor.update()
+            if updated:
+                self.num_updates += 1
+                self.last_update_time = self.last_check_time
+                logging.info("Model watcher swapped in a new model version")
+            self.last_error = None
+            return updated
+
+        except Exception as e:
+            self.last_error = str(e)
+            raise NerException(e, sys) from e
+
+    def get_status(self) -> dict:
+        return {
+            "poll_interval_seconds": self.model_watcher_config.poll_interval_seconds,
+            "running": self._worker is not None,
+            "polling": self._lock_file is not None or not self.inference_executor.preloaded,
+            "last_check_time": self.last_check_time,
+            "last_update_time": self.last_update_time,
+            "num_updates": self.num_updates,
+            "last_error": self.last_error,
+        }
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.model_watcher_config.poll_interval_seconds)
+            if not self.is_polling_worker():
+                continue
+            try:
+                await self.check()
+            except Exception as e:
+                # the serving model stays, the next poll tries again
+                logging.info(f"Model watcher check failed: {e}")
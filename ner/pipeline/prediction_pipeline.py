@@ -1,26 +1,74 @@
+import fcntl
+import gc
+import hashlib
+import json
 import os
+import shutil
 import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+import numpy as np
 import torch
+from model.bert import OnnxBertModel, TorchScriptBertModel
 from ner.configuration.gcloud import GCloud
 from ner.constants import *
 from ner.entity.config_entity import ModelPredictorConfig
+from ner.entity.artifact_entity import ModelPredictorArtifacts
 from ner.exception import NerException
 from ner.logger import logging
 from ner.utils.utils import MainUtils
+from ner.utils.alignment import IGNORE_LABEL_ID, TokenAligner
+from ner.utils.metrics import CACHE_LOOKUPS, MODEL_INFO, PADDED_TOKENS, SENTENCES, STAGE_SECONDS, TOKENS
+from ner.utils.prediction_cache import PredictionCache
 
 
 class ModelPredictor:
-    def __init__(self) -> None:
-        
+    def __init__(self, model_predictor_config: ModelPredictorConfig = None, gcloud: GCloud = None) -> None:
+        """
+        :param model_predictor_config: configuration for model predictor, the serving best_model directory by default
+        :param gcloud: get model artifacts from gcloud
+        """
         try:
-            self.model_predictor_config = ModelPredictorConfig()
-            self.gcloud= GCloud()
+            self.model_predictor_config = model_predictor_config or ModelPredictorConfig()
+            self.gcloud= gcloud or GCloud()
             self.utils= MainUtils()
+            self.model_predictor_artifacts: Optional[ModelPredictorArtifacts] = None
+            self.prediction_cache= PredictionCache(
+                max_entries=self.model_predictor_config.cache_max_entries,
+                max_bytes=self.model_predictor_config.cache_max_bytes,
+                ttl_seconds=self.model_predictor_config.cache_ttl_seconds,
+            )
+            self._load_lock= threading.Lock()
+            # serializes model updates and rollbacks, predictions never wait on it
+            self._update_lock= threading.Lock()
             
         except Exception as e:
             raise NerException(e, sys)
 
-    def align_word_ids(self, texts: str, tokenizer: dict) -> list:
+    def get_padding_length(self, sequence_length: int) -> int:
+        """
+        Method Name :   get_padding_length
+        Description :   This function picks the length a tokenized sequence is padded to, the smallest 
+                        length bucket that fits it, or the sequence length itself when no buckets are configured
+        
+        Output      :   Returns padding length  
+        On Failure  :   Write an exception log and then raise an exception
+        
+        """
+        try:
+            for bucket in sorted(self.model_predictor_config.length_buckets):
+                if sequence_length <= bucket:
+                    return min(bucket, self.model_predictor_config.max_length)
+
+            return min(sequence_length, self.model_predictor_config.max_length)
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+
+    def align_word_ids(self, texts: str, tokenizer: dict, padding_length: int = PREDICTION_MAX_LENGTH) -> list:
         """
         Method Name :   align_word_ids
         Description :   This function applies tokenizer on data i.e texts, 
@@ -31,36 +79,82 @@ class ModelPredictor:
         """
         logging.info("Entered the align_word_ids method of Model predictor class")
         try:
-            label_all_tokens = False
+            aligner = TokenAligner(tokenizer=tokenizer, max_length=padding_length)
+            tokenized_inputs = aligner.tokenize([texts], padding="max_length")
 
-            tokenized_inputs = tokenizer(
-                texts, padding="max_length", max_length=512, truncation=True
-            )
+            first_subtoken_mask = aligner.get_first_subtoken_mask(aligner.get_word_ids(tokenized_inputs))[0]
+            label_ids = np.where(first_subtoken_mask, 1, IGNORE_LABEL_ID).tolist()
 
-            word_ids = tokenized_inputs.word_ids()
+            logging.info("Exited the align_word_ids method of Model predictor class")
+            return label_ids
 
-            previous_word_idx = None
-            label_ids = []
+        except Exception as e:
+            raise NerException(e, sys) from e
 
-            for word_idx in word_ids:
 
-                if word_idx is None:
-                    label_ids.append(-100)
+    def evaluate_batch_texts(self, model: object, sentences: list, tokenizer: dict, ids_to_labels: dict) -> list:
+        """
+        Method Name :   evaluate_batch_texts
+        Description :   This function applies tokenizer on a batch of sentences, pads them to one length bucket, 
+                        do prediction with model object in a single forward pass and get ids_to_labels per sentence
+        
+        Output      :   Returns list of (sentence, prediction_label) in input order  
+        On Failure  :   Write an exception log and then raise an exception
+        
+        """
+        logging.info("Entered the evaluate_batch_texts method of Model predictor class")
+        try:
 
-                elif word_idx != previous_word_idx:
-                    try:
-                        label_ids.append(1)
-                    except:
-                        label_ids.append(-100)
-                else:
-                    try:
-                        label_ids.append(1 if label_all_tokens else -100)
-                    except:
-                        label_ids.append(-100)
-                previous_word_idx = word_idx
+            # checks if GPU available: bool, int8 quantized models run on cpu only
+            use_cuda = torch.cuda.is_available() and self.model_predictor_config.backend == "torch"
+            device = torch.device("cuda" if use_cuda else "cpu") # use GPU or CPU
 
-            logging.info("Exited the align_word_ids method of Model predictor class")
-            return label_ids
+            # if GPU available, send model to cuda 
+            if use_cuda: 
+                model = model.cuda() 
+
+            # pad only up to the length bucket of the longest sentence instead of always 512 tokens,
+            # padded positions are masked out so the predictions stay the same
+            aligner = TokenAligner(tokenizer=tokenizer, max_length=self.model_predictor_config.max_length)
+            with STAGE_SECONDS.labels(stage="tokenization").time():
+                encodings = aligner.tokenize(sentences, padding=False)
+                num_tokens = [len(input_ids) for input_ids in encodings["input_ids"]]
+                padding_length = self.get_padding_length(max(num_tokens))
+
+                text = tokenizer.pad(
+                    encodings,
+                    padding="max_length",
+                    max_length=padding_length,
+                    return_tensors="pt",
+                )
+
+            # labels are read off the first sub-token of every word, from the same encoding
+            with STAGE_SECONDS.labels(stage="alignment").time():
+                first_subtoken_mask = torch.from_numpy(
+                    aligner.get_first_subtoken_mask(aligner.get_word_ids(encodings, width=padding_length))
+                ).to(device)
+
+            mask = text["attention_mask"].to(device)
+            input_id = text["input_ids"].to(device)
+
+            with STAGE_SECONDS.labels(stage="forward").time(), torch.no_grad():
+                logits = model(input_id, mask, None)
+
+            with STAGE_SECONDS.labels(stage="decode").time():
+                results = []
+                for i, sentence in enumerate(sentences):
+                    logits_clean = logits[0][i][first_subtoken_mask[i]]
+
+                    predictions = logits_clean.argmax(dim=1).tolist()
+                    prediction_label = [ids_to_labels[j] for j in predictions]
+                    results.append((sentence, prediction_label))
+
+            SENTENCES.inc(len(sentences))
+            TOKENS.inc(sum(num_tokens))
+            PADDED_TOKENS.inc(len(sentences) * padding_length)
+
+            logging.info("Exited the evaluate_batch_texts method of Model predictor class")
+            return results
 
         except Exception as e:
             raise NerException(e, sys) from e
@@ -77,79 +171,137 @@ class ModelPredictor:
         """
         logging.info("Entered the evaluate_one_text method of Model predictor class")
         try:
+            sentence, prediction_label = self.evaluate_batch_texts(
+                model=model,
+                sentences=[sentence],
+                tokenizer=tokenizer,
+                ids_to_labels=ids_to_labels,
+            )[0]
+
+            logging.info("Exited the evaluate_one_text method of Model predictor class")
+            return sentence, prediction_label
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+
+    def get_window_starts(self, num_tokens: int, window_size: int) -> list:
+        """
+        Method Name :   get_window_starts
+        Description :   This function splits num_tokens tokens into windows of window_size tokens that overlap by 
+                        long_document_stride tokens, the last window ends at the last token
+        
+        Output      :   Returns list of window start positions  
+        On Failure  :   Write an exception log and then raise an exception
+        
+        """
+        try:
+            step = max(window_size - self.model_predictor_config.long_document_stride, 1)
+
+            window_starts = list(range(0, max(num_tokens - window_size, 0) + 1, step))
+            if window_starts[-1] + window_size < num_tokens:
+                window_starts.append(num_tokens - window_size)
+            return window_starts
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
 
-            use_cuda = torch.cuda.is_available() # checks if GPU available: bool
+    def evaluate_long_text(self, model: object, sentence: str, tokenizer: dict, ids_to_labels: dict) -> str:
+        """
+        Method Name :   evaluate_long_text
+        Description :   This function predicts a document of any length, the tokens are split into overlapping windows 
+                        of max_length that run as batched forward passes, every word takes its label from the window 
+                        where it is most central. Documents that fit in one window give the evaluate_one_text result
+        
+        Output      :   Returns sentence, prediction_label  
+        On Failure  :   Write an exception log and then raise an exception
+        
+        """
+        logging.info("Entered the evaluate_long_text method of Model predictor class")
+        try:
+
+            # checks if GPU available: bool, int8 quantized models run on cpu only
+            use_cuda = torch.cuda.is_available() and self.model_predictor_config.backend == "torch"
             device = torch.device("cuda" if use_cuda else "cpu") # use GPU or CPU
 
             # if GPU available, send model to cuda 
             if use_cuda: 
                 model = model.cuda() 
 
-            text = tokenizer(
-                sentence,
-                padding="max_length",
-                max_length=512,
-                truncation=True,
-                return_tensors="pt",
-            )
+            # tokenize the whole document once, [CLS] and [SEP] are added per window
+            aligner = TokenAligner(tokenizer=tokenizer)
+            with STAGE_SECONDS.labels(stage="tokenization").time():
+                encoding = tokenizer([str(sentence)], add_special_tokens=False)
+                token_ids = np.array(encoding["input_ids"][0], dtype=np.int64)
+            with STAGE_SECONDS.labels(stage="alignment").time():
+                first_subtoken_mask = aligner.get_first_subtoken_mask(aligner.get_word_ids(encoding))[0]
+            num_tokens = len(token_ids)
 
-            mask = text["attention_mask"].to(device)
-            input_id = text["input_ids"].to(device)
-            label_ids = (
-                torch.Tensor(self.align_word_ids(texts=sentence, tokenizer=tokenizer))
-                .unsqueeze(0)
-                .to(device)
-            )
+            window_size = self.model_predictor_config.max_length - 2
+            window_starts = self.get_window_starts(num_tokens=num_tokens, window_size=window_size)
 
-            logits = model(input_id, mask, None)
-            logits_clean = logits[0][label_ids != -100]
+            # per token: prediction of the window where it is most central so far, and that centrality
+            best_centrality = np.full(num_tokens, -1, dtype=np.int64)
+            best_predictions = np.zeros(num_tokens, dtype=np.int64)
 
-            predictions = logits_clean.argmax(dim=1).tolist()
-            prediction_label = [ids_to_labels[i] for i in predictions]
+            batch_size = self.model_predictor_config.batch_size
+            for chunk_start in range(0, len(window_starts), batch_size):
+                chunk = window_starts[chunk_start : chunk_start + batch_size]
+                windows = [
+                    {"input_ids": [tokenizer.cls_token_id] + token_ids[start : start + window_size].tolist() + [tokenizer.sep_token_id]}
+                    for start in chunk
+                ]
+                padding_length = self.get_padding_length(max(len(window["input_ids"]) for window in windows))
+                with STAGE_SECONDS.labels(stage="tokenization").time():
+                    text = tokenizer.pad(windows, padding="max_length", max_length=padding_length, return_tensors="pt")
 
-            logging.info("Exited the evaluate_one_text method of Model predictor class")
+                with STAGE_SECONDS.labels(stage="forward").time(), torch.no_grad():
+                    logits = model(text["input_ids"].to(device), text["attention_mask"].to(device), None)
+
+                with STAGE_SECONDS.labels(stage="decode").time():
+                    predictions = logits[0].argmax(dim=-1).cpu().numpy()
+
+                    for i, start in enumerate(chunk):
+                        end = min(start + window_size, num_tokens)
+                        positions = np.arange(start, end)
+                        centrality = np.minimum(positions - start, end - 1 - positions)
+
+                        is_better = centrality > best_centrality[start:end]
+                        best_centrality[start:end][is_better] = centrality[is_better]
+                        # +1 skips the [CLS] token of the window
+                        best_predictions[start:end][is_better] = predictions[i, 1 : end - start + 1][is_better]
+                PADDED_TOKENS.inc(len(chunk) * padding_length)
+
+            prediction_label = [ids_to_labels[i] for i in best_predictions[first_subtoken_mask].tolist()]
+            SENTENCES.inc()
+            TOKENS.inc(num_tokens)
+
+            logging.info(f"Exited the evaluate_long_text method of Model predictor class, {len(window_starts)} windows")
             return sentence, prediction_label
 
         except Exception as e:
             raise NerException(e, sys) from e
 
 
-    def initiate_model_predictor(self, sentence: str) -> str:
+    def load_model_artifacts(self, download: bool = True) -> ModelPredictorArtifacts:
         """
-        Method Name :   initiate_model_predictor
-        Description :   This function initiates ModelPredict class, 
+        Method Name :   load_model_artifacts
+        Description :   This function downloads tokenizer.pkl, ids_to_labels.pkl, model.pt from GCP bucket and loads them, 
+                        download=False loads the local files as they are
         
-        Output      :   Returns sentence, prediction_label  
+        Output      :   Returns ModelPredictorArtifacts  
         On Failure  :   Write an exception log and then raise an exception        
         """
-        
-        logging.info("Started Model Prediction >>>>>>>>>>>>>>>>>>>>>>>>>")
-        
+        logging.info("Entered the load_model_artifacts method of Model predictor class")
         try:
+            load_start_time = time.perf_counter()
             os.makedirs(self.model_predictor_config.best_model_dir, exist_ok=True)
             logging.info(f"Created {os.path.basename(self.model_predictor_config.best_model_dir)} directory.") # best_model
 
-            # download tokenizer.pkl, ids to label.pkl, model.pt from GCP bucket
-            self.gcloud.sync_folder_from_gcloud(
-                gcp_bucket_url=BUCKET_NAME,
-                filename=TOKENIZER_FILE_NAME,
-                destination=self.model_predictor_config.tokenizer_local_path,
-            )
-            logging.info("Tokenizer Pickle file downloaded from google storage")
-
-            self.gcloud.sync_folder_from_gcloud(
-                gcp_bucket_url=BUCKET_NAME,
-                filename=IDS_TO_LABELS_FILE_NAME,
-                destination=self.model_predictor_config.ids_to_labels_local_path,
-            )
-            logging.info("ids to label Pickle file downloaded from google storage")
-
-            self.gcloud.sync_folder_from_gcloud(
-                gcp_bucket_url=BUCKET_NAME,
-                filename=GCP_MODEL_NAME,
-                destination=self.model_predictor_config.best_model_from_gcp_path,
-            )
-            logging.info("Downloaded best model from GCP to Best_model directory.")
+            source_version = None
+            if download:
+                source_version = self.download_model_artifacts()
 
             # read/load downloaded .pkl file paths
             tokenizer = self.utils.load_pickle_file(
@@ -163,17 +315,722 @@ class ModelPredictor:
             logging.info("Loaded ids_to_lables.pkl object.")
             
             # load model
-            model = torch.load(self.model_predictor_config.best_model_path, map_location=torch.device('cpu')) # load model.pt from best_model/model.pt to cpu
-            logging.info("Best model loaded for prediction in cpu.")
+            model = self.load_model(download_model=False)
 
-            sentence, prediction_label = self.evaluate_one_text(
-                model=model,
-                sentence=sentence,
+            model_version = self.get_model_version()
+            logging.info(f"Loaded model version {model_version}")
+
+            model_predictor_artifacts = ModelPredictorArtifacts(
                 tokenizer=tokenizer,
                 ids_to_labels=ids_to_labels,
+                model=model,
+                model_version=model_version,
+                source_version=source_version,
+            )
+            STAGE_SECONDS.labels(stage="artifact_load").observe(time.perf_counter() - load_start_time)
+            logging.info("Exited the load_model_artifacts method of Model predictor class")
+            return model_predictor_artifacts
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+
+    def download_model_artifacts(self) -> Optional[str]:
+        """
+        Method Name :   download_model_artifacts
+        Description :   This function downloads tokenizer.pkl, ids_to_labels.pkl and the model file of the backend from 
+                        GCP bucket concurrently, without loading them
+        
+        Output      :   Returns source version of the bucket objects, None when an artifact is missing  
+        On Failure  :   Write an exception log and then raise an exception        
+        """
+        try:
+            os.makedirs(self.model_predictor_config.best_model_dir, exist_ok=True)
+
+            # read before the download, a version pushed in between is picked up by the next update check
+            source_version = self.get_remote_model_version()
+
+            found = self.gcloud.sync_objects_from_gcloud(
+                gcp_bucket_url=BUCKET_NAME,
+                objects=[
+                    (TOKENIZER_FILE_NAME, self.model_predictor_config.tokenizer_local_path),
+                    (IDS_TO_LABELS_FILE_NAME, self.model_predictor_config.ids_to_labels_local_path),
+                    (self.get_model_file_name(), self.model_predictor_config.best_model_from_gcp_path),
+                ],
+            )
+            # the quantized backend falls back to the fp32 model.pt when no int8 model passed the accuracy check,
+            # an int8 model of an earlier release left in best_model must not be served with the new artifacts
+            if not found[self.get_model_file_name()] and self.model_predictor_config.backend == "quantized":
+                self.remove_local_quantized_model()
+                self.gcloud.sync_folder_from_gcloud(
+                    gcp_bucket_url=BUCKET_NAME,
+                    filename=GCP_MODEL_NAME,
+                    destination=self.model_predictor_config.best_model_from_gcp_path,
+                )
+            logging.info("Tokenizer, ids to label Pickle files and model downloaded from google storage")
+            return source_version
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+
+    def get_model_version(self) -> str:
+        # identifies the local artifact files in prediction cache keys
+        return self.utils.get_file_hash(
+            file_paths=[
+                self.model_predictor_config.tokenizer_local_path,
+                self.model_predictor_config.ids_to_labels_local_path,
+                self.get_model_path(),
+            ],
+            prefix=self.model_predictor_config.backend,
+        )
+
+
+    def get_model_path(self) -> str:
+        """
+        Method Name :   get_model_path
+        Description :   This function returns the local path of the model file the configured backend serves
+        
+        Output      :   Returns model path  
+        On Failure  :   Write an exception log and then raise an exception        
+        """
+        try:
+            backend_model_paths = {
+                "torch": self.model_predictor_config.best_model_path,
+                "quantized": self.model_predictor_config.best_quantized_model_path,
+                "onnx": self.model_predictor_config.best_onnx_model_path,
+                "torchscript": self.model_predictor_config.best_torchscript_model_path,
+            }
+            model_path = backend_model_paths[self.model_predictor_config.backend]
+
+            # the quantized backend falls back to the fp32 model.pt
+            if not os.path.exists(model_path) and self.model_predictor_config.backend == "quantized":
+                model_path = self.model_predictor_config.best_model_path
+            return model_path
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+
+    def remove_local_quantized_model(self) -> None:
+        if os.path.exists(self.model_predictor_config.best_quantized_model_path):
+            os.remove(self.model_predictor_config.best_quantized_model_path)
+            logging.info("Removed the local quantized model, the bucket holds none for the current model")
+
+
+    def get_model_file_name(self) -> str:
+        """
+        Method Name :   get_model_file_name
+        Description :   This function returns the name of the model file in GCP bucket the configured backend serves
+        
+        Output      :   Returns model file name  
+        On Failure  :   Write an exception log and then raise an exception        
+        """
+        try:
+            backend_model_file_names = {
+                "torch": GCP_MODEL_NAME,
+                "quantized": GCP_QUANTIZED_MODEL_NAME,
+                "onnx": GCP_ONNX_MODEL_NAME,
+                "torchscript": GCP_TORCHSCRIPT_MODEL_NAME,
+            }
+            if self.model_predictor_config.backend not in backend_model_file_names:
+                raise ValueError(f"Unknown prediction backend: {self.model_predictor_config.backend}")
+            return backend_model_file_names[self.model_predictor_config.backend]
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+
+    def load_model(self, download_model: bool = True) -> object:
+        """
+        Method Name :   load_model
+        Description :   This function downloads the model of the configured backend from GCP bucket and loads it to cpu, 
+                        "torch" serves model.pt, "quantized" serves the int8 model_quantized.pt and the fp32 model.pt 
+                        when no int8 model passed the accuracy check, "onnx" serves model.onnx on onnx runtime, 
+                        "torchscript" serves the frozen model_scripted.pt, download_model=False loads the model file 
+                        the caller already downloaded
+        
+        Output      :   Returns model in eval mode  
+        On Failure  :   Write an exception log and then raise an exception        
+        """
+        logging.info("Entered the load_model method of Model predictor class")
+        try:
+            backend = self.model_predictor_config.backend
+
+            if backend == "quantized":
+                if download_model and not self.gcloud.sync_folder_from_gcloud(
+                    gcp_bucket_url=BUCKET_NAME,
+                    filename=GCP_QUANTIZED_MODEL_NAME,
+                    destination=self.model_predictor_config.best_model_from_gcp_path,
+                ):
+                    self.remove_local_quantized_model()
+                if os.path.exists(self.model_predictor_config.best_quantized_model_path):
+                    # a pickled int8 module, the weights only unpickler of torch 2.6+ rejects its classes
+                    model = torch.load(self.model_predictor_config.best_quantized_model_path, map_location=torch.device('cpu'), weights_only=False)
+                    model.eval()
+                    logging.info("Quantized best model loaded for prediction in cpu.")
+                    return model
+
+                # quantizing model.pt here would serve an int8 model that never went through the accuracy check
+                logging.info("Quantized model not found in GCP, serving the fp32 best model.")
+
+            elif backend == "onnx":
+                if download_model:
+                    self.gcloud.sync_folder_from_gcloud(
+                        gcp_bucket_url=BUCKET_NAME,
+                        filename=GCP_ONNX_MODEL_NAME,
+                        destination=self.model_predictor_config.best_model_from_gcp_path,
+                    )
+                model = OnnxBertModel(
+                    onnx_model_path=self.model_predictor_config.best_onnx_model_path,
+                    num_threads=self.model_predictor_config.onnx_num_threads,
+                )
+                logging.info("ONNX best model loaded for prediction on onnx runtime cpu.")
+                return model
+
+            elif backend == "torchscript":
+                if download_model:
+                    self.gcloud.sync_folder_from_gcloud(
+                        gcp_bucket_url=BUCKET_NAME,
+                        filename=GCP_TORCHSCRIPT_MODEL_NAME,
+                        destination=self.model_predictor_config.best_model_from_gcp_path,
+                    )
+                model = TorchScriptBertModel(
+                    torchscript_model_path=self.model_predictor_config.best_torchscript_model_path,
+                )
+                logging.info("TorchScript best model loaded for prediction in cpu.")
+                return model
+
+            elif backend != "torch":
+                raise ValueError(f"Unknown prediction backend: {backend}")
+
+            if download_model:
+                self.gcloud.sync_folder_from_gcloud(
+                    gcp_bucket_url=BUCKET_NAME,
+                    filename=GCP_MODEL_NAME,
+                    destination=self.model_predictor_config.best_model_from_gcp_path,
+                )
+                logging.info("Downloaded best model from GCP to Best_model directory.")
+
+            # load model.pt from best_model/model.pt to cpu, a pickled BertModel needs the full unpickler on torch 2.6+
+            model = torch.load(self.model_predictor_config.best_model_path, map_location=torch.device('cpu'), weights_only=False)
+            model.eval()
+            logging.info("Best model loaded for prediction in cpu.")
+
+            logging.info("Exited the load_model method of Model predictor class")
+            return model
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+
+    def get_model_artifacts(self) -> ModelPredictorArtifacts:
+        """
+        Method Name :   get_model_artifacts
+        Description :   This function returns the in-memory model artifacts, loading them on first use only, the 
+                        first load picks the version the other processes serving from best_model agreed on
+        
+        Output      :   Returns ModelPredictorArtifacts  
+        On Failure  :   Write an exception log and then raise an exception        
+        """
+        try:
+            if self.model_predictor_artifacts is None:
+                with self.lock_model_artifacts():
+                    # another caller may have loaded the artifacts while we waited
+                    if self.model_predictor_artifacts is None:
+                        model_predictor_artifacts = self.sync_model_artifacts(current_artifacts=None, warm_up=False)
+                        with self._load_lock:
+                            self.model_predictor_artifacts = model_predictor_artifacts
+                        self.set_model_info(None, model_predictor_artifacts)
+            return self.model_predictor_artifacts
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+
+    def reload_model_artifacts(self) -> ModelPredictorArtifacts:
+        """
+        Method Name :   reload_model_artifacts
+        Description :   This function loads the latest model version the way update_model_artifacts does, a new 
+                        bucket version is snapshotted for rollback and warmed up before it is swapped in, rejected 
+                        versions are not loaded again, requests already running keep the artifacts they started with
+        
+        Output      :   Returns the serving ModelPredictorArtifacts  
+        On Failure  :   Write an exception log and then raise an exception        
+        """
+        logging.info("Entered the reload_model_artifacts method of Model predictor class")
+        try:
+            if not self.update_model_artifacts():
+                logging.info("Serving model is already the latest version")
+            logging.info("Exited the reload_model_artifacts method of Model predictor class")
+            return self.model_predictor_artifacts
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+
+    def get_remote_model_version(self) -> Optional[str]:
+        """
+        Method Name :   get_remote_model_version
+        Description :   This function identifies the artifacts in GCP bucket by the generation/checksum of tokenizer.pkl, 
+                        ids_to_labels.pkl and the model file of the backend, only metadata is read
+        
+        Output      :   Returns remote version, None when an artifact is missing  
+        On Failure  :   Write an exception log and then raise an exception        
+        """
+        try:
+            object_names = [TOKENIZER_FILE_NAME, IDS_TO_LABELS_FILE_NAME, self.get_model_file_name()]
+            object_metadata = [self.gcloud.get_object_metadata(BUCKET_NAME, object_name) for object_name in object_names]
+
+            # the quantized backend falls back to the fp32 model.pt when no int8 model passed the accuracy check
+            if object_metadata[2] is None and self.model_predictor_config.backend == "quantized":
+                object_names[2] = GCP_MODEL_NAME
+                object_metadata[2] = self.gcloud.get_object_metadata(BUCKET_NAME, GCP_MODEL_NAME)
+
+            if any(metadata is None for metadata in object_metadata):
+                return None
+
+            version_hash = hashlib.sha256(self.model_predictor_config.backend.encode())
+            for object_name, metadata in zip(object_names, object_metadata):
+                version_hash.update(f"{object_name}:{metadata.get('generation')}:{metadata.get('checksum')};".encode())
+            return version_hash.hexdigest()[:16]
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+
+    def get_local_artifact_paths(self) -> list:
+        return [
+            self.model_predictor_config.tokenizer_local_path,
+            self.model_predictor_config.ids_to_labels_local_path,
+            self.get_model_path(),
+        ]
+
+
+    @contextmanager
+    def lock_model_artifacts(self):
+        # every process serving from best_model (gunicorn workers, process executor workers) downloads, swaps 
+        # and rolls back its files under this lock, the thread lock keeps the threads of one process in line
+        os.makedirs(self.model_predictor_config.best_model_dir, exist_ok=True)
+        with self._update_lock, open(self.model_predictor_config.model_lock_path, "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+    def read_model_state(self) -> dict:
+        # source version of the files in best_model and the bucket versions no process picks up again
+        model_state_path = self.model_predictor_config.model_state_path
+        if not os.path.exists(model_state_path):
+            return {"source_version": None, "rejected_versions": []}
+        with open(model_state_path, "r") as model_state_file:
+            return json.load(model_state_file)
+
+
+    def write_model_state(self, model_state: dict) -> None:
+        # replaced in one step, processes reading it without the lock never see half a file
+        tmp_path = f"{self.model_predictor_config.model_state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as model_state_file:
+            json.dump(model_state, model_state_file)
+        os.replace(tmp_path, self.model_predictor_config.model_state_path)
+
+
+    def warm_up_model_artifacts(self, model_predictor_artifacts: ModelPredictorArtifacts) -> None:
+        """
+        Method Name :   warm_up_model_artifacts
+        Description :   This function runs a forward pass on the model artifacts before they serve traffic, it fails 
+                        on a model that cannot predict
+        
+        On Failure  :   Write an exception log and then raise an exception        
+        """
+        try:
+            self.evaluate_batch_texts(
+                model=model_predictor_artifacts.model,
+                sentences=list(self.model_predictor_config.warm_up_sentences),
+                tokenizer=model_predictor_artifacts.tokenizer,
+                ids_to_labels=model_predictor_artifacts.ids_to_labels,
             )
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+
+    def swap_model_artifacts(self, model_predictor_artifacts: ModelPredictorArtifacts) -> Optional[ModelPredictorArtifacts]:
+        # batches already running keep the artifacts they started with, the next batch picks up the new ones
+        with self._load_lock:
+            previous_model_predictor_artifacts = self.model_predictor_artifacts
+            self.model_predictor_artifacts = model_predictor_artifacts
+            self.prediction_cache.clear()
+        self.set_model_info(previous_model_predictor_artifacts, model_predictor_artifacts)
+        return previous_model_predictor_artifacts
+
+
+    def set_model_info(self, previous_model_predictor_artifacts: Optional[ModelPredictorArtifacts], 
+                       model_predictor_artifacts: ModelPredictorArtifacts) -> None:
+        # recorded by the process serving the model, a scrape never waits for a worker to report it
+        for artifacts, value in ((previous_model_predictor_artifacts, 0), (model_predictor_artifacts, 1)):
+            if artifacts is not None:
+                MODEL_INFO.labels(backend=self.model_predictor_config.backend, model_version=artifacts.model_version,
+                                  source_version=artifacts.source_version or "").set(value)
+
+
+    def snapshot_model_artifacts(self, version_info: dict) -> None:
+        """
+        Method Name :   snapshot_model_artifacts
+        Description :   This function copies the local artifact files to the previous model directory, the files 
+                        rollback_model_artifacts loads, version_info describes them
+        
+        On Failure  :   Write an exception log and then raise an exception        
+        """
+        try:
+            previous_model_dir = self.model_predictor_config.previous_model_dir
+            # the older snapshot is kept aside until the new model is swapped in, a failed update puts it back
+            backup_model_dir = previous_model_dir + ".bak"
+            if os.path.isdir(backup_model_dir):
+                shutil.rmtree(backup_model_dir)
+            if os.path.isdir(previous_model_dir):
+                os.replace(previous_model_dir, backup_model_dir)
+            os.makedirs(previous_model_dir, exist_ok=True)
+
+            for file_path in self.get_local_artifact_paths():
+                shutil.copy2(file_path, os.path.join(previous_model_dir, os.path.basename(file_path)))
+
+            self.write_snapshot_version(version_info)
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+
+    def release_model_artifacts_snapshot(self, restore_backup: bool) -> None:
+        # drops the older snapshot kept aside by snapshot_model_artifacts, or puts it back in place of the new one
+        previous_model_dir = self.model_predictor_config.previous_model_dir
+        backup_model_dir = previous_model_dir + ".bak"
+        if restore_backup:
+            if os.path.isdir(previous_model_dir):
+                shutil.rmtree(previous_model_dir)
+            if os.path.isdir(backup_model_dir):
+                os.replace(backup_model_dir, previous_model_dir)
+        elif os.path.isdir(backup_model_dir):
+            shutil.rmtree(backup_model_dir)
+
+
+    def get_version_info(self, source_version: Optional[str]) -> dict:
+        return {
+            "source_version": source_version,
+            "file_paths": self.get_local_artifact_paths(),
+        }
+
+
+    def write_snapshot_version(self, version_info: Optional[dict]) -> None:
+        version_path = os.path.join(self.model_predictor_config.previous_model_dir, "version.json")
+        if version_info is None:
+            if os.path.exists(version_path):
+                os.remove(version_path)
+            return
+        with open(version_path, "w") as version_file:
+            json.dump(version_info, version_file)
+
+
+    def restore_model_artifacts_snapshot(self, version_info: Optional[dict]) -> dict:
+        """
+        Method Name :   restore_model_artifacts_snapshot
+        Description :   This function exchanges the local artifact files with the previous model snapshot, so a 
+                        restore can itself be undone, version_info describes the files moving into the snapshot, 
+                        None leaves nothing to roll back to
+        
+        Output      :   Returns version info of the restored snapshot  
+        On Failure  :   Write an exception log and then raise an exception        
+        """
+        try:
+            previous_model_dir = self.model_predictor_config.previous_model_dir
+            version_path = os.path.join(previous_model_dir, "version.json")
+            if not os.path.exists(version_path):
+                raise ValueError("No previous model to roll back to")
+
+            with open(version_path, "r") as version_file:
+                previous_version = json.load(version_file)
+
+            current_paths = self.get_local_artifact_paths()
+            for file_path in set(previous_version["file_paths"]) | set(current_paths):
+                snapshot_path = os.path.join(previous_model_dir, os.path.basename(file_path))
+                tmp_path = snapshot_path + ".tmp"
+                if os.path.exists(file_path):
+                    os.replace(file_path, tmp_path)
+                if os.path.exists(snapshot_path):
+                    os.replace(snapshot_path, file_path)
+                if os.path.exists(tmp_path):
+                    os.replace(tmp_path, snapshot_path)
+
+            self.write_snapshot_version(version_info)
+            return previous_version
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+
+    def sync_model_artifacts(self, current_artifacts: Optional[ModelPredictorArtifacts], warm_up: bool = True) -> Optional[ModelPredictorArtifacts]:
+        """
+        Method Name :   sync_model_artifacts
+        Description :   This function loads the model version every process serving from best_model agrees on, the 
+                        first process to see a new bucket version downloads it (snapshotting the replaced files for 
+                        rollback), the others load the files it left in best_model, a version that fails to load or 
+                        warm up is rejected for all of them. Runs under lock_model_artifacts only
+        
+        Output      :   Returns the loaded ModelPredictorArtifacts, None when current_artifacts already are that version  
+        On Failure  :   Write an exception log and then raise an exception        
+        """
+        try:
+            model_state = self.read_model_state()
+            remote_version = self.get_remote_model_version()
+            local_files_exist = all(os.path.exists(file_path) for file_path in self.get_local_artifact_paths())
+
+            if (remote_version is not None and remote_version != model_state["source_version"]
+                    and remote_version not in model_state["rejected_versions"]):
+                logging.info(f"Downloading new model version {remote_version} to {self.model_predictor_config.best_model_dir}")
+                if local_files_exist:
+                    self.snapshot_model_artifacts(self.get_version_info(model_state["source_version"]))
+
+                try:
+                    model_predictor_artifacts = self.load_model_artifacts()
+                    if warm_up:
+                        self.warm_up_model_artifacts(model_predictor_artifacts)
+                except Exception:
+                    # put back the files of the serving model, no process tries the bucket version again
+                    model_state["rejected_versions"].append(remote_version)
+                    self.write_model_state(model_state)
+                    if local_files_exist:
+                        self.restore_model_artifacts_snapshot(version_info=None)
+                        self.release_model_artifacts_snapshot(restore_backup=True)
+                    raise
+
+                if local_files_exist:
+                    self.release_model_artifacts_snapshot(restore_backup=False)
+                model_state["source_version"] = model_predictor_artifacts.source_version
+                self.write_model_state(model_state)
+                return model_predictor_artifacts
+
+            if current_artifacts is not None and current_artifacts.source_version == model_state["source_version"]:
+                return None
+
+            # another process downloaded (or rolled back to) the version in best_model, its files are loaded as they are
+            if not local_files_exist:
+                raise ValueError(f"No model artifacts in {self.model_predictor_config.best_model_dir} and no new version in the bucket")
+            model_predictor_artifacts = self.load_model_artifacts(download=False)
+            model_predictor_artifacts.source_version = model_state["source_version"]
+            if warm_up:
+                self.warm_up_model_artifacts(model_predictor_artifacts)
+            return model_predictor_artifacts
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+
+    def is_update_available(self, source_version: Optional[str]) -> bool:
+        """
+        Method Name :   is_update_available
+        Description :   This function tells whether a process serving source_version would load another model on 
+                        update, a new bucket version nobody rejected or another version left in best_model, only 
+                        metadata and the model state are read
+        
+        Output      :   Returns True when there is a model to update to  
+        On Failure  :   Write an exception log and then raise an exception        
+        """
+        try:
+            model_state = self.read_model_state()
+            remote_version = self.get_remote_model_version()
+            if (remote_version is not None and remote_version != model_state["source_version"]
+                    and remote_version not in model_state["rejected_versions"]):
+                return True
+            return model_state["source_version"] is not None and source_version != model_state["source_version"]
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+
+    def update_model_artifacts(self) -> bool:
+        """
+        Method Name :   update_model_artifacts
+        Description :   This function loads a new model version (from GCP bucket, or the one another serving process 
+                        put in best_model) next to the serving one, warms it up and swaps it in between batches, the 
+                        replaced model is freed, a version that fails to load or warm up is rejected and the serving 
+                        model stays
+        
+        Output      :   Returns True when a new model was swapped in  
+        On Failure  :   Write an exception log and then raise an exception        
+        """
+        try:
+            with self.lock_model_artifacts():
+                current_artifacts = self.model_predictor_artifacts
+                model_predictor_artifacts = self.sync_model_artifacts(current_artifacts=current_artifacts, warm_up=True)
+                if model_predictor_artifacts is None:
+                    return False
+
+                previous_model_predictor_artifacts = self.swap_model_artifacts(model_predictor_artifacts)
+                del previous_model_predictor_artifacts, current_artifacts
+                gc.collect()
+
+            logging.info(f"Updated the serving model, model version {model_predictor_artifacts.model_version}")
+            return True
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+
+    def rollback_model_artifacts(self) -> ModelPredictorArtifacts:
+        """
+        Method Name :   rollback_model_artifacts
+        Description :   This function swaps the previous model back in from its snapshot, the bucket version rolled 
+                        back from is not picked up again, the other processes serving from best_model follow on 
+                        their next update_model_artifacts
+        
+        Output      :   Returns ModelPredictorArtifacts  
+        On Failure  :   Write an exception log and then raise an exception        
+        """
+        logging.info("Entered the rollback_model_artifacts method of Model predictor class")
+        try:
+            with self.lock_model_artifacts():
+                model_state = self.read_model_state()
+                current_source_version = model_state["source_version"]
+                previous_version = self.restore_model_artifacts_snapshot(version_info=self.get_version_info(current_source_version))
+
+                try:
+                    model_predictor_artifacts = self.load_model_artifacts(download=False)
+                    model_predictor_artifacts.source_version = previous_version["source_version"]
+                    self.warm_up_model_artifacts(model_predictor_artifacts)
+                except Exception:
+                    self.restore_model_artifacts_snapshot(version_info=previous_version)
+                    raise
+
+                if current_source_version is not None and current_source_version not in model_state["rejected_versions"]:
+                    model_state["rejected_versions"].append(current_source_version)
+                if previous_version["source_version"] in model_state["rejected_versions"]:
+                    model_state["rejected_versions"].remove(previous_version["source_version"])
+                model_state["source_version"] = previous_version["source_version"]
+                self.write_model_state(model_state)
+
+                previous_model_predictor_artifacts = self.swap_model_artifacts(model_predictor_artifacts)
+                del previous_model_predictor_artifacts
+                gc.collect()
+
+            logging.info(f"Exited the rollback_model_artifacts method of Model predictor class, serving model version {model_predictor_artifacts.model_version}")
+            return model_predictor_artifacts
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+
+    def get_model_status(self) -> dict:
+        model_predictor_artifacts = self.model_predictor_artifacts
+        return {
+            "backend": self.model_predictor_config.backend,
+            "model_version": model_predictor_artifacts.model_version if model_predictor_artifacts else None,
+            "source_version": model_predictor_artifacts.source_version if model_predictor_artifacts else None,
+            "can_roll_back": os.path.exists(os.path.join(self.model_predictor_config.previous_model_dir, "version.json")),
+            "rejected_versions": sorted(self.read_model_state()["rejected_versions"]),
+        }
+
+
+    def initiate_model_predictor(self, sentence: str) -> str:
+        """
+        Method Name :   initiate_model_predictor
+        Description :   This function initiates ModelPredict class, 
+        
+        Output      :   Returns sentence, prediction_label  
+        On Failure  :   Write an exception log and then raise an exception        
+        """
+        
+        logging.info("Started Model Prediction >>>>>>>>>>>>>>>>>>>>>>>>>")
+        
+        try:
+            sentence, prediction_label = self.predict_batch(sentences=[sentence])[0]
             logging.info("Model Prediction Completed >>>>>>>>>>>>>>>>>>>>>>>>>")
             return sentence, prediction_label
 
         except Exception as e:
-            raise NerException(e, sys) from e
\ No newline at end of file
+            raise NerException(e, sys) from e
+
+
+    def predict_batch(self, sentences: list) -> list:
+        """
+        Method Name :   predict_batch
+        Description :   This function predicts labels for a list of sentences with the loaded model, sentences are 
+                        sorted by length and run in chunks of batch_size so each forward pass pads as little as possible, 
+                        sentences found in the prediction cache are not run again 
+        
+        Output      :   Returns list of (sentence, prediction_label) in input order  
+        On Failure  :   Write an exception log and then raise an exception        
+        """
+        logging.info("Entered the predict_batch method of Model predictor class")
+        try:
+            model_predictor_artifacts = self.get_model_artifacts()
+            batch_size = self.model_predictor_config.batch_size
+            results = [None] * len(sentences)
+
+            # repeated sentences skip tokenization and the forward pass, keyed by the normalized
+            # sentence (the tokenizer splits on any whitespace) and the loaded model version
+            cache_keys = [
+                (model_predictor_artifacts.model_version, " ".join(str(sentence).split()))
+                for sentence in sentences
+            ]
+            uncached = []
+            for i, cache_key in enumerate(cache_keys):
+                prediction_label = self.prediction_cache.get(cache_key)
+                if prediction_label is None:
+                    uncached.append(i)
+                else:
+                    results[i] = (sentences[i], list(prediction_label))
+            if self.prediction_cache.max_entries > 0:
+                CACHE_LOOKUPS.labels(result="hit").inc(len(sentences) - len(uncached))
+                CACHE_LOOKUPS.labels(result="miss").inc(len(uncached))
+
+            # character length is a cheap proxy for token length when grouping sentences into chunks
+            order = sorted(uncached, key=lambda i: len(sentences[i]))
+
+            for start in range(0, len(order), batch_size):
+                chunk = order[start : start + batch_size]
+                chunk_results = self.evaluate_batch_texts(
+                    model=model_predictor_artifacts.model,
+                    sentences=[sentences[i] for i in chunk],
+                    tokenizer=model_predictor_artifacts.tokenizer,
+                    ids_to_labels=model_predictor_artifacts.ids_to_labels,
+                )
+                for i, result in zip(chunk, chunk_results):
+                    results[i] = result
+                    self.prediction_cache.set(cache_keys[i], list(result[1]))
+
+            logging.info("Exited the predict_batch method of Model predictor class")
+            return results
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+
+    def predict_document(self, sentence: str) -> str:
+        """
+        Method Name :   predict_document
+        Description :   This function predicts labels for a document longer than max_length tokens with the loaded model 
+        
+        Output      :   Returns sentence, prediction_label  
+        On Failure  :   Write an exception log and then raise an exception        
+        """
+        logging.info("Entered the predict_document method of Model predictor class")
+        try:
+            model_predictor_artifacts = self.get_model_artifacts()
+
+            sentence, prediction_label = self.evaluate_long_text(
+                model=model_predictor_artifacts.model,
+                sentence=sentence,
+                tokenizer=model_predictor_artifacts.tokenizer,
+                ids_to_labels=model_predictor_artifacts.ids_to_labels,
+            )
+            logging.info("Exited the predict_document method of Model predictor class")
+            return sentence, prediction_label
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+
+    def get_cache_stats(self) -> dict:
+        return self.prediction_cache.get_stats()
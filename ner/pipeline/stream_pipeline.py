@@ -0,0 +1,126 @@
+import asyncio
+import json
+import sys
+from typing import AsyncIterator, Awaitable, Callable
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+from ner.entity.config_entity import StreamPredictorConfig
+from ner.exception import NerException
+from ner.logger import logging
+from ner.utils.metrics import ERRORS
+
+
+class NdjsonStreamingResponse(StreamingResponse):
+    '''StreamingResponse whose body iterator reads the request body while the response is sent'''
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # the default response listens for a client disconnect on receive, which would swallow the request
+        # body chunks the body iterator still has to read, a disconnect surfaces through request.stream() instead
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+class NdjsonStreamPredictor:
+    '''Tags newline delimited JSON sentences from a byte stream in batches and yields one NDJSON result line per input line'''
+    def __init__(self, predict_fn: Callable[[list], Awaitable[list]], stream_predictor_config: StreamPredictorConfig) -> None:
+        """
+        :param predict_fn: async, takes a list of sentences and returns a list of (sentence, prediction_label) in input order
+        :param stream_predictor_config: configuration for stream predictor (obj of StreamPredictorConfig class)
+        """
+        try:
+            self.predict_fn = predict_fn
+            self.stream_predictor_config = stream_predictor_config
+
+        except Exception as e:
+            raise NerException(e, sys)
+
+    @staticmethod
+    def parse_line(line: bytes) -> str:
+        """
+        Method Name :   parse_line
+        Description :   This method reads one NDJSON line, either a JSON string or an object with a "text" field
+
+        Output      :   Returns sentence
+        On Failure  :   Raises ValueError
+        """
+        record = json.loads(line)
+        if isinstance(record, str):
+            return record
+        if isinstance(record, dict) and isinstance(record.get("text"), str):
+            return record["text"]
+        raise ValueError('expected a JSON string or an object with a "text" string')
+
+    async def read_lines(self, byte_chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        # only the unfinished last line is buffered between chunks
+        buffer = b""
+        async for chunk in byte_chunks:
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield line
+        if buffer.strip():
+            yield buffer
+
+    async def read_batches(self, byte_chunks: AsyncIterator[bytes]) -> AsyncIterator[list]:
+        batch = []
+        line_number = 0
+        async for line in self.read_lines(byte_chunks):
+            try:
+                batch.append((line_number, self.parse_line(line), None))
+            except ValueError as e:
+                batch.append((line_number, None, str(e)))
+            line_number += 1
+
+            if len(batch) == self.stream_predictor_config.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def predict_batch(self, batch: list) -> list:
+        sentences = [sentence for _, sentence, error in batch if error is None]
+        predictions = iter(await self.predict_fn(sentences)) if sentences else iter(())
+
+        lines = []
+        for line_number, sentence, error in batch:
+            if error is None:
+                sentence, prediction_label = next(predictions)
+                record = {"line": line_number, "text": sentence, "labels": prediction_label}
+            else:
+                record = {"line": line_number, "error": error}
+            lines.append(json.dumps(record) + "\n")
+        return lines
+
+    async def predict_stream(self, byte_chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+        """
+        Method Name :   predict_stream
+        Description :   This method yields the results of every batch as soon as it completes, the next batch is read
+                        from the request while the current one is predicted, so memory stays at about two batches
+
+        Output      :   Yields NDJSON lines
+        On Failure  :   Yields a final {"error": ...} line
+        """
+        running = None
+        total_lines = 0
+        try:
+            async for batch in self.read_batches(byte_chunks):
+                if running is not None:
+                    for line in await running:
+                        yield line
+                running = asyncio.ensure_future(self.predict_batch(batch))
+                total_lines += len(batch)
+
+            if running is not None:
+                for line in await running:
+                    yield line
+            logging.info(f"Streamed predictions for {total_lines} lines")
+
+        except Exception as e:
+            if running is not None and not running.done():
+                running.cancel()
+            logging.info(f"Streaming prediction failed after {total_lines} lines: {e}")
+            ERRORS.labels(route="/predict/stream").inc()
+            yield json.dumps({"error": f"Error Occurred! {e}"}) + "\n"
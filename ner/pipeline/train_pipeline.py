@@ -2,13 +2,14 @@
 import sys
 from ner.configuration.gcloud import GCloud
 from ner.constants import *
-from ner.entity.config_entity import DataIngestionConfig, DataTransformationConfig, ModelTrainerConfig, ModelEvaluationConfig, ModelPusherConfig
-from ner.entity.artifact_entity import DataIngestionArtifact, DataTransformationArtifact, ModelTrainerArtifact, ModelEvaluationArtifacts, ModelPusherArtifacts
+from ner.entity.config_entity import DataIngestionConfig, DataTransformationConfig, ModelTrainerConfig, ModelExporterConfig, ModelEvaluationConfig, ModelPusherConfig
+from ner.entity.artifact_entity import DataIngestionArtifact, DataTransformationArtifact, ModelTrainerArtifact, ModelExporterArtifact, ModelEvaluationArtifacts, ModelPusherArtifacts
 from ner.logger import logging
 from ner.exception import NerException
 from ner.components.data_ingestion import DataIngestion
 from ner.components.data_transformation import DataTransformation
 from ner.components.model_trainer import ModelTraining
+from ner.components.model_exporter import ModelExporter
 from ner.components.model_evaluation import ModelEvaluation
 from ner.components.model_pusher import ModelPusher
 
@@ -19,6 +20,7 @@ class TrainingPipeline:
         self.gcloud= GCloud()
         self.data_transformation_config= DataTransformationConfig()
         self.model_trainer_config= ModelTrainerConfig()
+        self.model_exporter_config= ModelExporterConfig()
         self.model_evaluation_config= ModelEvaluationConfig()
         self.model_pusher_config= ModelPusherConfig()
         
@@ -77,8 +79,26 @@ class TrainingPipeline:
         except Exception as e:
             raise NerException(e, sys) from e 
         
+    def start_model_exporter(self, model_trainer_artifact:ModelTrainerArtifact)-> ModelExporterArtifact:
+        """
+        This method of TrainPipeline class is responsible for starting model exporter component
+        returns ModelExporterArtifact
+        """
+        logging.info("Entered the start_model_exporter method of TrainPipeline class")
+        try:
+            model_exporter= ModelExporter(model_trainer_artifact= model_trainer_artifact,
+                                          model_exporter_config= self.model_exporter_config)
+            model_exporter_artifact= model_exporter.initiate_model_exporter()
+            logging.info("Exited the start_model_exporter method of TrainPipeline class")
+            
+            return model_exporter_artifact
+        
+        except Exception as e:
+            raise NerException(e, sys) from e 
+        
     def start_model_evaluation(self, data_transformation_artifact:DataTransformationArtifact,
-                               model_trainer_artifact:ModelTrainerArtifact)-> ModelEvaluationArtifacts:
+                               model_trainer_artifact:ModelTrainerArtifact,
+                               model_exporter_artifact:ModelExporterArtifact)-> ModelEvaluationArtifacts:
         """
         This method of TrainPipeline class is responsible for starting model evaluation component
         returns ModelEvaluationArtifacts
@@ -87,6 +107,7 @@ class TrainingPipeline:
         try:
             model_evaluation_config= ModelEvaluation(data_transformation_artifact= data_transformation_artifact,
                                                      model_trainer_artifact= model_trainer_artifact,
+                                                     model_exporter_artifact= model_exporter_artifact,
                                                      model_evaluation_config= self.model_evaluation_config)
             model_evaluation_artifact= model_evaluation_config.initiate_model_evaluation()
             logging.info("Exited the start_model_evaluation method of TrainPipeline class") 
@@ -121,7 +142,8 @@ class TrainingPipeline:
             data_ingestion_artifact = self.start_data_ingestion()
             data_transformation_artifact= self.start_data_transformation(data_ingestion_artifact= data_ingestion_artifact)
             model_trainer_artifact= self.start_model_trainer(data_transformation_artifact= data_transformation_artifact)
-            model_evaluation_artifact= self.start_model_evaluation(data_transformation_artifact=data_transformation_artifact, model_trainer_artifact=model_trainer_artifact)
+            model_exporter_artifact= self.start_model_exporter(model_trainer_artifact= model_trainer_artifact)
+            model_evaluation_artifact= self.start_model_evaluation(data_transformation_artifact=data_transformation_artifact, model_trainer_artifact=model_trainer_artifact, model_exporter_artifact=model_exporter_artifact)
             model_pusher_artifact= self.start_model_pusher(model_evaluation_artifact=model_evaluation_artifact)
             
         except Exception as e:
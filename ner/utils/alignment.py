@@ -0,0 +1,145 @@
+import sys
+import time
+from typing import Iterator
+import numpy as np
+from ner.exception import NerException
+from ner.logger import logging
+
+
+# label id of special tokens, padding and non-first sub-tokens, ignored by the loss and by accuracy
+IGNORE_LABEL_ID = -100
+
+
+class TokenAligner:
+    '''Tokenizes a batch of sentences once and aligns word level labels to the first sub-token of every word'''
+    def __init__(self, tokenizer, max_length: int = 512) -> None:
+        """
+        :param tokenizer: fast tokenizer (BertTokenizerFast), word_ids() is needed for alignment
+        :param max_length: sequences are truncated to this many tokens
+        """
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+
+    def tokenize(self, texts: list, padding="max_length", max_length: int = None, return_tensors: str = None):
+        """
+        Method Name :   tokenize
+        Description :   This method tokenizes the whole batch in one call of the fast tokenizer
+
+        Output      :   Returns BatchEncoding
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            return self.tokenizer(
+                [str(text) for text in texts],
+                padding=padding,
+                max_length=max_length or self.max_length,
+                truncation=True,
+                return_tensors=return_tensors,
+            )
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    @staticmethod
+    def get_word_ids(encodings, width: int = None) -> np.ndarray:
+        """
+        Method Name :   get_word_ids
+        Description :   This method collects word_ids() of every row into one (batch, width) array,
+                        special tokens and padding are -1
+
+        Output      :   Returns np.ndarray of int64
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            rows = [encodings.word_ids(i) for i in range(len(encodings["input_ids"]))]
+            width = width or max((len(row) for row in rows), default=0)
+
+            word_ids = np.full((len(rows), width), -1, dtype=np.int64)
+            for i, row in enumerate(rows):
+                # None becomes nan with a float dtype, so the conversion stays in numpy
+                word_ids[i, : len(row)] = np.nan_to_num(np.array(row, dtype=np.float64), nan=-1)
+            return word_ids
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    @staticmethod
+    def get_first_subtoken_mask(word_ids: np.ndarray) -> np.ndarray:
+        """
+        Method Name :   get_first_subtoken_mask
+        Description :   This method marks the first sub-token of every word, the only token a word label is put on
+
+        Output      :   Returns np.ndarray of bool with the shape of word_ids
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            previous_word_ids = np.full_like(word_ids, -1)
+            previous_word_ids[:, 1:] = word_ids[:, :-1]
+            return (word_ids >= 0) & (word_ids != previous_word_ids)
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    def align_labels(self, word_ids: np.ndarray, labels: list, labels_to_ids: dict) -> np.ndarray:
+        """
+        Method Name :   align_labels
+        Description :   This method puts the label id of every word on its first sub-token, all other tokens
+                        and words with an unknown or missing label get IGNORE_LABEL_ID
+
+        Output      :   Returns np.ndarray of int64 with the shape of word_ids
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            label_lengths = np.array([len(row) for row in labels], dtype=np.int64)
+            label_offsets = np.zeros(len(labels), dtype=np.int64)
+            label_offsets[1:] = np.cumsum(label_lengths)[:-1]
+            flat_label_ids = np.array(
+                [labels_to_ids.get(label, IGNORE_LABEL_ID) for row in labels for label in row],
+                dtype=np.int64,
+            )
+
+            label_ids = np.full(word_ids.shape, IGNORE_LABEL_ID, dtype=np.int64)
+            rows, cols = np.nonzero(self.get_first_subtoken_mask(word_ids))
+            word_idx = word_ids[rows, cols]
+
+            # words past the end of the label list keep IGNORE_LABEL_ID
+            in_range = word_idx < label_lengths[rows]
+            rows, cols, word_idx = rows[in_range], cols[in_range], word_idx[in_range]
+            label_ids[rows, cols] = flat_label_ids[label_offsets[rows] + word_idx]
+            return label_ids
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    def iter_aligned_chunks(self, texts: list, labels: list, labels_to_ids: dict, chunk_size: int,
+                            padding="max_length", return_tensors: str = None) -> Iterator[tuple]:
+        """
+        Method Name :   iter_aligned_chunks
+        Description :   This method tokenizes the rows chunk by chunk, one call of the fast tokenizer per chunk so its 
+                        batch path tokenizes the rows on all cores, and aligns the word split labels of every chunk, 
+                        memory stays at one chunk of python encodings whatever the number of rows
+
+        Output      :   Yields (BatchEncoding, np.ndarray of label ids) per chunk
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            start_time = time.perf_counter()
+            for chunk_start in range(0, len(texts), chunk_size):
+                encodings = self.tokenize(
+                    texts[chunk_start : chunk_start + chunk_size], padding=padding, return_tensors=return_tensors
+                )
+                label_ids = self.align_labels(
+                    word_ids=self.get_word_ids(encodings),
+                    labels=[str(row).split() for row in labels[chunk_start : chunk_start + chunk_size]],
+                    labels_to_ids=labels_to_ids,
+                )
+                yield encodings, label_ids
+
+            seconds = time.perf_counter() - start_time
+            logging.info(
+                f"Tokenized and aligned {len(texts)} rows in {seconds:.2f}s "
+                f"({len(texts) / seconds if seconds > 0 else 0.0:.0f} rows/s, chunks of {chunk_size})"
+            )
+
+        except Exception as e:
+            raise NerException(e, sys) from e
@@ -0,0 +1,83 @@
+import random
+import sys
+from typing import Iterator
+import numpy as np
+import torch
+from ner.exception import NerException
+from ner.utils.alignment import IGNORE_LABEL_ID
+
+
+class DynamicPaddingCollator:
+    '''DataLoader collate_fn padding a batch only to its longest row instead of the max length'''
+    def __init__(self, pad_token_id: int = 0) -> None:
+        """
+        :param pad_token_id: input id of the padding token
+        """
+        self.pad_token_id = pad_token_id
+
+    def __call__(self, batch: list) -> tuple:
+        """
+        Stacks (data, labels) items of any widths into the (batch, 1, width) / (batch, width) tensors of the default
+        collate, width is the longest attention mask of the batch, padded label positions stay IGNORE_LABEL_ID so
+        loss and accuracy do not change
+        """
+        try:
+            # tokenizer padding is on the right, everything past the longest mask is padding in every row
+            width = max(int(data["attention_mask"].sum()) for data, _ in batch)
+
+            input_id = torch.full((len(batch), 1, width), self.pad_token_id, dtype=torch.long)
+            mask = torch.zeros((len(batch), 1, width), dtype=torch.long)
+            labels = torch.full((len(batch), width), IGNORE_LABEL_ID, dtype=torch.long)
+
+            for i, (data, label) in enumerate(batch):
+                length = min(data["input_ids"].shape[-1], width)
+                input_id[i, 0, :length] = data["input_ids"].reshape(-1)[:length]
+                mask[i, 0, :length] = data["attention_mask"].reshape(-1)[:length]
+                labels[i, :length] = label[:length]
+
+            return {"input_ids": input_id, "attention_mask": mask}, labels
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+
+class LengthGroupedBatchSampler(torch.utils.data.Sampler):
+    '''Batch sampler putting rows of similar length into the same batch, so dynamic padding pads little'''
+    def __init__(self, lengths: np.ndarray, batch_size: int, group_size: int, shuffle: bool = True, seed: int = 0) -> None:
+        """
+        :param lengths: token length (or a proxy of it) of every row
+        :param batch_size: rows per batch
+        :param group_size: batches per length group, rows are sorted by length within a group only
+        :param shuffle: shuffles rows before grouping and the batch order, a different order every epoch
+        :param seed: seed of the shuffling, the order of every epoch is reproducible
+        """
+        self.lengths = np.asarray(lengths)
+        self.batch_size = batch_size
+        self.group_size = group_size
+        self.shuffle = shuffle
+        self.seed = seed
+        self.epoch = 0
+
+    def __len__(self) -> int:
+
+        return (len(self.lengths) + self.batch_size - 1) // self.batch_size
+
+    def __iter__(self) -> Iterator[list]:
+        generator = random.Random(self.seed + self.epoch)
+        self.epoch += 1
+
+        indices = list(range(len(self.lengths)))
+        if self.shuffle:
+            generator.shuffle(indices)
+
+        # random groups of group_size batches, sorted by length within the group, so batches still mix
+        # different parts of the data every epoch
+        group_rows = self.batch_size * max(self.group_size, 1)
+        batches = []
+        for group_start in range(0, len(indices), group_rows):
+            group = sorted(indices[group_start : group_start + group_rows], key=lambda idx: self.lengths[idx], reverse=True)
+            batches.extend(group[batch_start : batch_start + self.batch_size] for batch_start in range(0, len(group), self.batch_size))
+
+        if self.shuffle:
+            generator.shuffle(batches)
+        return iter(batches)
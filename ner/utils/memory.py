@@ -0,0 +1,30 @@
+import os
+import sys
+from ner.exception import NerException
+
+
+# fields of /proc/<pid>/smaps_rollup, in kB
+SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def get_process_memory(pid: int = None) -> dict:
+    """
+    Returns rss, pss and the shared and private page totals of a process in MB, pss charges every shared page
+    to the processes sharing it, so it is the per worker cost when model weights are shared across workers
+    """
+    try:
+        pid = os.getpid() if pid is None else pid
+        memory = {}
+        with open(f"/proc/{pid}/smaps_rollup", "r") as smaps_file:
+            for line in smaps_file:
+                field, _, value = line.partition(":")
+                if field in SMAPS_FIELDS:
+                    memory[f"{field.lower()}_mb"] = int(value.split()[0]) / 1024
+        return memory
+
+    except FileNotFoundError:
+        # smaps_rollup is linux only
+        return {}
+
+    except Exception as e:
+        raise NerException(e, sys) from e
@@ -0,0 +1,93 @@
+import os
+import tempfile
+import time
+from ner.constants import INFERENCE_EXECUTOR_TYPE, METRICS_LATENCY_BUCKETS, METRICS_MULTIPROC_DIR_PREFIX
+
+# Every gunicorn worker and every process executor worker records its own metrics. With PROMETHEUS_MULTIPROC_DIR set
+# prometheus_client writes them to files in that directory and a scrape adds up the files of all processes, so the
+# values of idle workers are reported too. It is read when prometheus_client is imported, gunicorn.conf.py sets it
+# for the server workers, a single server process running the process executor gets a directory of its own here
+# and its spawned workers inherit it.
+if INFERENCE_EXECUTOR_TYPE == "process" and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix=METRICS_MULTIPROC_DIR_PREFIX)
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+
+def is_multiprocess_mode() -> bool:
+    return "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+
+def render_metrics() -> bytes:
+    """
+    Returns the metrics in the prometheus text format, in multiprocess mode those of every process that wrote to
+    PROMETHEUS_MULTIPROC_DIR
+    """
+    if is_multiprocess_mode():
+        scrape_registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(scrape_registry)
+        return generate_latest(scrape_registry)
+    return generate_latest(registry)
+
+
+def mark_process_dead(pid: int) -> None:
+    # gauges of a process that exited are dropped from the live* aggregations, its counters and histograms stay
+    if is_multiprocess_mode():
+        multiprocess.mark_process_dead(pid)
+
+
+class MetricsMiddleware:
+    '''ASGI middleware counting requests and timing them per route, a plain ASGI wrapper leaves streamed bodies alone'''
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start_time = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # the route template, not the raw path, keeps the label set bounded
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            REQUESTS.labels(route=route_path, method=scope["method"], status=str(status_code)).inc()
+            REQUEST_SECONDS.labels(route=route_path).observe(time.perf_counter() - start_time)
+
+
+# registry of this process, in multiprocess mode a scrape reads the files of all processes instead
+registry = CollectorRegistry()
+
+REQUESTS = Counter("ner_requests", "HTTP requests by route, method and status code", ("route", "method", "status"), registry=registry)
+REQUEST_SECONDS = Histogram("ner_request_seconds", "HTTP request latency by route", ("route",), buckets=METRICS_LATENCY_BUCKETS, registry=registry)
+ERRORS = Counter("ner_errors", "Failed predictions and model operations by route", ("route",), registry=registry)
+STAGE_SECONDS = Histogram(
+    "ner_stage_seconds",
+    "Latency of the prediction stages: artifact_load, queue_wait, tokenization, alignment, forward, decode",
+    ("stage",),
+    buckets=METRICS_LATENCY_BUCKETS,
+    registry=registry,
+)
+SENTENCES = Counter("ner_sentences", "Sentences run through the model, prediction cache hits excluded", registry=registry)
+TOKENS = Counter("ner_tokens", "Tokens run through the model, padding excluded", registry=registry)
+PADDED_TOKENS = Counter("ner_padded_tokens", "Token positions run through the model, padding included", registry=registry)
+CACHE_LOOKUPS = Counter("ner_prediction_cache_lookups", "Prediction cache lookups by result, hit or miss", ("result",), registry=registry)
+# 1 while a live process serves the version, the version a process swapped out drops to 0
+MODEL_INFO = Gauge(
+    "ner_model_info",
+    "Serving model, 1 for the loaded version",
+    ("backend", "model_version", "source_version"),
+    registry=registry,
+    multiprocess_mode="livemax",
+)
+QUEUE_DEPTH = Gauge("ner_batch_queue_depth", "Sentences waiting for the next micro batch", registry=registry, multiprocess_mode="livesum")
@@ -0,0 +1,93 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class PredictionCache:
+    '''Bounded in-process LRU cache of prediction labels with an optional time to live'''
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float = 0) -> None:
+        """
+        :param max_entries: max number of cached predictions, 0 disables the cache
+        :param max_bytes: max approximate size of the cached predictions in bytes
+        :param ttl_seconds: cached predictions expire after this many seconds, 0 keeps them until evicted
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        # key -> (labels, size in bytes, insertion time), least recently used first
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def get_size(key: Hashable, labels: list) -> int:
+        return sys.getsizeof(key) + sys.getsizeof(labels) + sum(sys.getsizeof(label) for label in labels)
+
+    def get(self, key: Hashable) -> Optional[list]:
+        if self.max_entries <= 0:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            labels, size, inserted_at = entry
+            if self.ttl_seconds > 0 and time.monotonic() - inserted_at > self.ttl_seconds:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return labels
+
+    def set(self, key: Hashable, labels: list) -> None:
+        if self.max_entries <= 0:
+            return
+
+        size = self.get_size(key, labels)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (labels, size, time.monotonic())
+            self.current_bytes += size
+
+            while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
@@ -0,0 +1,261 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+from typing import Optional
+import numpy as np
+import pandas as pd
+import torch
+from ner.exception import NerException
+from ner.logger import logging
+from ner.utils.alignment import IGNORE_LABEL_ID, TokenAligner
+
+
+# files of one stored dataset, all tokens of all rows back to back, row i is tokens[offsets[i]:offsets[i + 1]]
+INPUT_IDS_FILE_NAME = "input_ids.npy"
+LABEL_IDS_FILE_NAME = "label_ids.npy"
+OFFSETS_FILE_NAME = "offsets.npy"
+META_FILE_NAME = "meta.json"
+
+
+class TokenizedDataset(torch.utils.data.Dataset):
+    '''Pre-tokenized rows read from memory-mapped arrays, items have the shape of DataSequence items'''
+    def __init__(self, dataset_dir: str, padding_length: Optional[int] = None, dynamic_padding: bool = False) -> None:
+        """
+        :param dataset_dir: directory written by TokenizedDatasetStore
+        :param padding_length: rows are padded to this many tokens, defaults to the max length of the store
+        :param dynamic_padding: rows loaded together are padded to the longest of them only
+        """
+        try:
+            with open(os.path.join(dataset_dir, META_FILE_NAME), "r") as meta_file:
+                self.meta = json.load(meta_file)
+
+            # mmap_mode="r": the arrays stay in the page cache and are shared by every process reading them
+            self.input_ids = np.load(os.path.join(dataset_dir, INPUT_IDS_FILE_NAME), mmap_mode="r")
+            self.label_ids = np.load(os.path.join(dataset_dir, LABEL_IDS_FILE_NAME), mmap_mode="r")
+            self.offsets = np.load(os.path.join(dataset_dir, OFFSETS_FILE_NAME), mmap_mode="r")
+            self.padding_length = padding_length or self.meta["max_length"]
+            self.pad_token_id = self.meta["pad_token_id"]
+            self.dynamic_padding = dynamic_padding
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    def __len__(self) -> int:
+
+        return len(self.offsets) - 1
+
+    def get_row(self, idx: int) -> tuple:
+        """
+        Returns input ids and label ids of a row as read-only views of the memory-mapped arrays, nothing is copied
+        """
+        start, end = self.offsets[idx], self.offsets[idx + 1]
+        return self.input_ids[start:end], self.label_ids[start:end]
+
+    def get_lengths(self) -> np.ndarray:
+        """
+        Returns the token length of every row, read off the offsets index
+        """
+        return np.minimum(np.diff(self.offsets), self.padding_length)
+
+    def __getitem__(self, idx):
+
+        return self.__getitems__([idx])[0]
+
+    def __getitems__(self, indices: list) -> list:
+        width = self.padding_length
+        if self.dynamic_padding:
+            width = min(max((self.offsets[idx + 1] - self.offsets[idx] for idx in indices), default=0), width)
+
+        input_id = np.full((len(indices), width), self.pad_token_id, dtype=np.int64)
+        mask = np.zeros((len(indices), width), dtype=np.int64)
+        labels = np.full((len(indices), width), IGNORE_LABEL_ID, dtype=np.int64)
+
+        for i, idx in enumerate(indices):
+            row_input_ids, row_label_ids = self.get_row(idx)
+            length = min(len(row_input_ids), width)
+            input_id[i, :length] = row_input_ids[:length]
+            mask[i, :length] = 1
+            labels[i, :length] = row_label_ids[:length]
+
+        return [
+            ({"input_ids": torch.from_numpy(input_id[i : i + 1]), "attention_mask": torch.from_numpy(mask[i : i + 1])},
+             torch.from_numpy(labels[i]))
+            for i in range(len(indices))
+        ]
+
+
+class TokenizedDatasetStore:
+    '''Tokenized and label-aligned datasets written once per (data, tokenizer, max length, label ids) and reused by every run'''
+    def __init__(self, store_dir: str, chunk_size: int, max_datasets: int = 0) -> None:
+        """
+        :param store_dir: directory holding one sub directory per stored dataset
+        :param chunk_size: rows tokenized per call of the fast tokenizer while a dataset is built
+        :param max_datasets: least recently used datasets beyond this many are deleted, 0 keeps every dataset
+        """
+        self.store_dir = store_dir
+        self.chunk_size = chunk_size
+        self.max_datasets = max_datasets
+
+    @staticmethod
+    def get_key(df: pd.DataFrame, tokenizer, labels_to_ids: dict, max_length: int) -> str:
+        """
+        Method Name :   get_key
+        Description :   This method identifies a stored dataset by the hash of the text and labels columns, the
+                        serialized tokenizer (vocab, normalizer and special tokens), the label ids and the max length
+
+        Output      :   Returns key
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            key = hashlib.sha256()
+            key.update(pd.util.hash_pandas_object(df[["text", "labels"]], index=False).values.tobytes())
+            # truncation and padding settings of the backend change with every call of the tokenizer
+            tokenizer_state = json.loads(tokenizer.backend_tokenizer.to_str())
+            tokenizer_state.pop("truncation", None)
+            tokenizer_state.pop("padding", None)
+            key.update(json.dumps(tokenizer_state, sort_keys=True).encode())
+            key.update(json.dumps(sorted(labels_to_ids.items()), default=str).encode())
+            key.update(str(max_length).encode())
+            return key.hexdigest()[:24]
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    def get_dataset_dir(self, key: str) -> str:
+        return os.path.join(self.store_dir, key)
+
+    def evict(self, keep_key: str) -> list:
+        """
+        Method Name :   evict
+        Description :   This method deletes the least recently used datasets beyond max datasets, the last use of a
+                        dataset is the mtime of its meta file, the dataset of keep key is never deleted
+
+        Output      :   Returns the keys of the deleted datasets
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            if self.max_datasets <= 0:
+                return []
+
+            last_used = {}
+            for entry in os.scandir(self.store_dir):
+                # build directories in progress start with a dot
+                if entry.is_dir() and not entry.name.startswith(".") and entry.name != keep_key:
+                    try:
+                        last_used[entry.name] = os.stat(os.path.join(entry.path, META_FILE_NAME)).st_mtime_ns
+                    except FileNotFoundError:
+                        continue
+
+            evicted = sorted(last_used, key=last_used.get)[: max(len(last_used) + 1 - self.max_datasets, 0)]
+            for key in evicted:
+                # a process still reading the arrays keeps its memory maps of the deleted files
+                shutil.rmtree(self.get_dataset_dir(key), ignore_errors=True)
+                logging.info(f"Evicted tokenized dataset {key} from {self.store_dir}")
+            return evicted
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    def build(self, df: pd.DataFrame, tokenizer, labels_to_ids: dict, max_length: int, dataset_dir: str) -> None:
+        """
+        Method Name :   build
+        Description :   This method tokenizes and aligns the rows chunk by chunk and writes them unpadded as compact
+                        int16/int32 arrays with an offsets index, the directory appears complete or not at all
+
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the build method of Tokenized dataset store class")
+        try:
+            start_time = time.perf_counter()
+            aligner = TokenAligner(tokenizer=tokenizer, max_length=max_length)
+            input_ids_dtype = np.int16 if len(tokenizer) <= np.iinfo(np.int16).max else np.int32
+
+            input_ids_chunks, label_ids_chunks, lengths_chunks = [], [], []
+            for encodings, label_ids in aligner.iter_aligned_chunks(
+                texts=df["text"].values.tolist(),
+                labels=df["labels"].values.tolist(),
+                labels_to_ids=labels_to_ids,
+                chunk_size=self.chunk_size,
+                padding=False,
+            ):
+                lengths = np.array([len(row) for row in encodings["input_ids"]], dtype=np.int64)
+                # drop the padding of the (batch, longest row) label array
+                row_mask = np.arange(label_ids.shape[1]) < lengths[:, None]
+                input_ids_chunks.append(np.concatenate([np.asarray(row, dtype=input_ids_dtype) for row in encodings["input_ids"]]))
+                label_ids_chunks.append(label_ids[row_mask].astype(np.int16))
+                lengths_chunks.append(lengths)
+
+            lengths = np.concatenate(lengths_chunks) if lengths_chunks else np.zeros(0, dtype=np.int64)
+            offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=offsets[1:])
+
+            tmp_dir = os.path.join(self.store_dir, f".{uuid.uuid4().hex}.tmp")
+            os.makedirs(tmp_dir)
+            try:
+                np.save(os.path.join(tmp_dir, INPUT_IDS_FILE_NAME),
+                        np.concatenate(input_ids_chunks) if input_ids_chunks else np.zeros(0, dtype=input_ids_dtype))
+                np.save(os.path.join(tmp_dir, LABEL_IDS_FILE_NAME),
+                        np.concatenate(label_ids_chunks) if label_ids_chunks else np.zeros(0, dtype=np.int16))
+                np.save(os.path.join(tmp_dir, OFFSETS_FILE_NAME), offsets)
+                with open(os.path.join(tmp_dir, META_FILE_NAME), "w") as meta_file:
+                    json.dump({
+                        "num_rows": len(lengths),
+                        "num_tokens": int(offsets[-1]),
+                        "max_length": max_length,
+                        "pad_token_id": tokenizer.pad_token_id,
+                        "input_ids_dtype": np.dtype(input_ids_dtype).name,
+                    }, meta_file)
+
+                # another process may have built the same dataset meanwhile, both are the same
+                try:
+                    os.rename(tmp_dir, dataset_dir)
+                except OSError:
+                    if not os.path.exists(os.path.join(dataset_dir, META_FILE_NAME)):
+                        raise
+            finally:
+                if os.path.exists(tmp_dir):
+                    shutil.rmtree(tmp_dir)
+
+            seconds = time.perf_counter() - start_time
+            logging.info(
+                f"Built tokenized dataset {os.path.basename(dataset_dir)}: {len(lengths)} rows, {int(offsets[-1])} tokens "
+                f"in {seconds:.2f}s ({len(lengths) / seconds if seconds > 0 else 0.0:.0f} rows/s)"
+            )
+            logging.info("Exited the build method of Tokenized dataset store class")
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
+    def get_dataset(self, df: pd.DataFrame, tokenizer, labels_to_ids: dict, max_length: int = 512,
+                    dynamic_padding: bool = False) -> TokenizedDataset:
+        """
+        Method Name :   get_dataset
+        Description :   This method returns the stored dataset of the rows, it is built first when the data, the
+                        tokenizer, the label ids or the max length changed, the least recently used datasets beyond
+                        max datasets are deleted
+
+        Output      :   Returns TokenizedDataset
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            key = self.get_key(df=df, tokenizer=tokenizer, labels_to_ids=labels_to_ids, max_length=max_length)
+            dataset_dir = self.get_dataset_dir(key)
+
+            meta_path = os.path.join(dataset_dir, META_FILE_NAME)
+            if os.path.exists(meta_path):
+                # marks the dataset as used for eviction
+                os.utime(meta_path)
+                logging.info(f"Tokenized dataset {key} found in {self.store_dir}, tokenization skipped")
+            else:
+                os.makedirs(self.store_dir, exist_ok=True)
+                self.build(df=df, tokenizer=tokenizer, labels_to_ids=labels_to_ids, max_length=max_length, dataset_dir=dataset_dir)
+            self.evict(keep_key=key)
+
+            return TokenizedDataset(dataset_dir=dataset_dir, dynamic_padding=dynamic_padding)
+
+        except Exception as e:
+            raise NerException(e, sys) from e
@@ -1,9 +1,8 @@
 import sys
 from typing import Dict
-import dill
+import hashlib
 import pickle
 import numpy as np
-import yaml
 from zipfile import Path
 from ner.constants import *
 from ner.exception import NerException
@@ -16,6 +15,8 @@ class MainUtils:
     def read_yaml_file(self, filename: str) -> Dict:
         logging.info("Entered the read_yaml_file method of MainUtils class")
         try:
+            import yaml
+
             with open(filename, "rb") as yaml_file:
                 return yaml.safe_load(yaml_file)
 
@@ -41,6 +42,19 @@ class MainUtils:
         except Exception as e:
             raise NerException(e, sys) from e
 
+    @staticmethod
+    def get_file_hash(file_paths: list, prefix: str = "") -> str:
+        try:
+            file_hash = hashlib.sha256(prefix.encode())
+            for file_path in file_paths:
+                with open(file_path, "rb") as file_obj:
+                    for block in iter(lambda: file_obj.read(1024 * 1024), b""):
+                        file_hash.update(block)
+            return file_hash.hexdigest()[:16]
+
+        except Exception as e:
+            raise NerException(e, sys) from e
+
     def save_numpy_array_data(self, file_path: str, array: np.array) -> str:
         logging.info("Entered the save_numpy_array_data method of MainUtils class")
         try:
@@ -65,6 +79,8 @@ class MainUtils:
     def save_object(file_path: str, obj: object) -> None:
         logging.info("Entered the save_object method of MainUtils class")
         try:
+            import dill
+
             with open(file_path, "wb") as file_obj:
                 dill.dump(obj, file_obj)
 
@@ -79,6 +95,8 @@ class MainUtils:
     def load_object(file_path: str) -> object:
         logging.info("Entered the load_object method of MainUtils class")
         try:
+            import dill
+
             with open(file_path, "rb") as file_obj:
                 obj = dill.load(file_obj)
             logging.info("Exited the load_object method of MainUtils class")
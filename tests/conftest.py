@@ -0,0 +1,55 @@
+import pytest
+import torch
+from transformers import BertConfig, BertForTokenClassification, BertTokenizerFast
+from model.bert import BertModel
+from ner.configuration.gcloud import GCloud
+from ner.entity.artifact_entity import ModelPredictorArtifacts
+from ner.pipeline.prediction_pipeline import ModelPredictor
+
+
+WORDS = ["the", "cat", "sat", "on", "mat", "london", "paris", "john", "smith", "went", "to", "un", "##able", "##ing", "##s", "play", "new", "york", "city"]
+LABELS = ["O", "B-geo", "I-geo", "B-per", "I-per"]
+IDS_TO_LABELS = dict(enumerate(LABELS))
+LABELS_TO_IDS = {label: i for i, label in IDS_TO_LABELS.items()}
+
+
+def make_tokenizer() -> BertTokenizerFast:
+    # small word piece vocabulary, words outside it are split into characters, nothing is downloaded
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS + list("abcdefghijklmnopqrstuvwxyz.,")
+    vocab += ["##" + char for char in "abcdefghijklmnopqrstuvwxyz"]
+    return BertTokenizerFast(vocab={token: i for i, token in enumerate(dict.fromkeys(vocab))}, do_lower_case=True)
+
+
+def make_model(tokenizer: BertTokenizerFast, seed: int = 0) -> BertModel:
+    # tiny random bert behind the BertModel wrapper, no pretrained weights are downloaded
+    torch.manual_seed(seed)
+    config = BertConfig(
+        vocab_size=tokenizer.vocab_size, hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+        intermediate_size=64, max_position_embeddings=512, num_labels=len(LABELS),
+    )
+    model = BertModel.__new__(BertModel)
+    torch.nn.Module.__init__(model)
+    model.bert = BertForTokenClassification(config)
+    return model.eval()
+
+
+@pytest.fixture
+def tokenizer() -> BertTokenizerFast:
+    return make_tokenizer()
+
+
+@pytest.fixture
+def model(tokenizer) -> BertModel:
+    return make_model(tokenizer)
+
+
+@pytest.fixture
+def model_predictor(tmp_path, monkeypatch, tokenizer, model) -> ModelPredictor:
+    # best_model, the stand-in bucket and the artifact cache are created under tmp_path
+    monkeypatch.chdir(tmp_path)
+    model_predictor = ModelPredictor()
+    model_predictor.gcloud = GCloud(local_bucket_dir=str(tmp_path / "buckets"), artifact_cache_dir=str(tmp_path / "artifact_cache"))
+    model_predictor.model_predictor_artifacts = ModelPredictorArtifacts(
+        tokenizer=tokenizer, ids_to_labels=IDS_TO_LABELS, model=model, model_version="test",
+    )
+    return model_predictor
@@ -0,0 +1,72 @@
+import numpy as np
+from conftest import LABELS_TO_IDS
+from ner.utils.alignment import IGNORE_LABEL_ID, TokenAligner
+
+
+def align_label_loop(texts: str, labels: list, tokenizer, labels_to_ids: dict, max_length: int) -> list:
+    # per sentence loop DataSequence.align_label used before TokenAligner
+    tokenized_inputs = tokenizer(texts, padding="max_length", max_length=max_length, truncation=True)
+
+    previous_word_idx = None
+    label_ids = []
+    for word_idx in tokenized_inputs.word_ids():
+        if word_idx is None:
+            label_ids.append(IGNORE_LABEL_ID)
+        elif word_idx != previous_word_idx:
+            try:
+                label_ids.append(labels_to_ids[labels[word_idx]])
+            except (KeyError, IndexError):
+                label_ids.append(IGNORE_LABEL_ID)
+        else:
+            label_ids.append(IGNORE_LABEL_ID)
+        previous_word_idx = word_idx
+    return label_ids
+
+
+def test_align_labels_matches_per_sentence_loop(tokenizer):
+    texts = [
+        "john smith went to london",
+        "the cats unable playing zzqx",
+        # more labels than fit before truncation
+        " ".join(["london paris"] * 20),
+        # unknown label and fewer labels than words
+        "new york city sat",
+        "",
+    ]
+    labels = [
+        "B-per I-per O O B-geo",
+        "O O O O B-geo",
+        " ".join(["B-geo B-geo"] * 20),
+        "B-geo B-unknown I-geo",
+        "",
+    ]
+    aligner = TokenAligner(tokenizer=tokenizer, max_length=24)
+
+    encodings = aligner.tokenize(texts, padding="max_length")
+    label_ids = aligner.align_labels(
+        word_ids=aligner.get_word_ids(encodings),
+        labels=[row.split() for row in labels],
+        labels_to_ids=LABELS_TO_IDS,
+    )
+
+    expected = [
+        align_label_loop(text, row.split(), tokenizer, LABELS_TO_IDS, max_length=24)
+        for text, row in zip(texts, labels)
+    ]
+    np.testing.assert_array_equal(label_ids, np.array(expected))
+
+
+def test_aligned_chunks_match_one_call(tokenizer):
+    texts = ["john smith went to london", "the cats sat", "paris", "unable playing on the mat"]
+    labels = ["B-per I-per O O B-geo", "O O O", "B-geo", "O O O O O"]
+    aligner = TokenAligner(tokenizer=tokenizer, max_length=16)
+
+    chunks = list(aligner.iter_aligned_chunks(texts, labels, LABELS_TO_IDS, chunk_size=3))
+
+    encodings = aligner.tokenize(texts, padding="max_length")
+    label_ids = aligner.align_labels(aligner.get_word_ids(encodings), [row.split() for row in labels], LABELS_TO_IDS)
+    assert [len(chunk_label_ids) for _, chunk_label_ids in chunks] == [3, 1]
+    np.testing.assert_array_equal(np.concatenate([chunk_label_ids for _, chunk_label_ids in chunks]), label_ids)
+    np.testing.assert_array_equal(
+        np.concatenate([chunk_encodings["input_ids"] for chunk_encodings, _ in chunks]), encodings["input_ids"]
+    )
@@ -0,0 +1,114 @@
+import os
+import time
+import pytest
+from ner.configuration.gcloud import GCloud
+from ner.configuration.storage import LocalStorageBackend
+
+
+BUCKET = "bucket"
+
+
+class CountingStorageBackend(LocalStorageBackend):
+    '''Local stand-in that records every object it downloads'''
+    def __init__(self, root_dir: str) -> None:
+        super().__init__(root_dir=root_dir)
+        self.downloads = []
+
+    def download(self, bucket_name: str, object_name: str, destination: str) -> int:
+        self.downloads.append(object_name)
+        return super().download(bucket_name, object_name, destination)
+
+
+@pytest.fixture
+def storage_backend(tmp_path) -> CountingStorageBackend:
+    return CountingStorageBackend(root_dir=str(tmp_path / "buckets"))
+
+
+def make_gcloud(tmp_path, storage_backend, max_bytes: int = 1 << 20) -> GCloud:
+    return GCloud(artifact_cache_dir=str(tmp_path / "cache"), artifact_cache_max_bytes=max_bytes, storage_backend=storage_backend)
+
+
+def write_object(storage_backend, object_name: str, content: bytes, generation: int) -> None:
+    object_path = storage_backend.get_object_path(BUCKET, object_name)
+    os.makedirs(os.path.dirname(object_path), exist_ok=True)
+    with open(object_path, "wb") as object_file:
+        object_file.write(content)
+    # the mtime is the generation of the stand-in bucket
+    os.utime(object_path, ns=(generation, generation))
+
+
+def read(path) -> bytes:
+    with open(path, "rb") as file_obj:
+        return file_obj.read()
+
+
+def test_unchanged_generation_is_served_from_cache(tmp_path, storage_backend):
+    write_object(storage_backend, "model.pt", b"weights-v1", generation=1_000_000_000)
+    gcloud = make_gcloud(tmp_path, storage_backend)
+
+    gcloud.sync_folder_from_gcloud(BUCKET, "model.pt", str(tmp_path / "first.pt"))
+    gcloud.sync_folder_from_gcloud(BUCKET, "model.pt", str(tmp_path / "second.pt"))
+
+    assert storage_backend.downloads == ["model.pt"]
+    assert read(tmp_path / "second.pt") == b"weights-v1"
+    assert gcloud.artifact_cache.get_stats() == {"hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_changed_object_is_downloaded_again(tmp_path, storage_backend):
+    write_object(storage_backend, "model.pt", b"weights-v1", generation=1_000_000_000)
+    gcloud = make_gcloud(tmp_path, storage_backend)
+    destination = str(tmp_path / "model.pt")
+    gcloud.sync_folder_from_gcloud(BUCKET, "model.pt", destination)
+
+    write_object(storage_backend, "model.pt", b"weights-v2", generation=2_000_000_000)
+    gcloud.sync_folder_from_gcloud(BUCKET, "model.pt", destination)
+
+    assert storage_backend.downloads == ["model.pt", "model.pt"]
+    assert read(destination) == b"weights-v2"
+    assert gcloud.artifact_cache.get_stats()["misses"] == 2
+
+
+def test_least_recently_used_objects_are_evicted(tmp_path, storage_backend):
+    for i, object_name in enumerate(("a.pkl", "b.pkl", "c.pkl")):
+        write_object(storage_backend, object_name, bytes(100), generation=(i + 1) * 1_000_000_000)
+    # room for two objects
+    gcloud = make_gcloud(tmp_path, storage_backend, max_bytes=250)
+
+    for object_name in ("a.pkl", "b.pkl", "a.pkl", "c.pkl"):
+        gcloud.sync_folder_from_gcloud(BUCKET, object_name, str(tmp_path / object_name))
+        time.sleep(0.01)
+    # b was used least recently, a and c are still cached
+    for object_name in ("a.pkl", "c.pkl", "b.pkl"):
+        gcloud.sync_folder_from_gcloud(BUCKET, object_name, str(tmp_path / "again" / object_name))
+
+    assert storage_backend.downloads == ["a.pkl", "b.pkl", "c.pkl", "b.pkl"]
+    assert gcloud.artifact_cache.get_stats()["evictions"] == 2
+    cached_bytes = sum(entry.stat().st_size for entry in os.scandir(tmp_path / "cache") if entry.is_file())
+    assert cached_bytes <= 250
+
+
+def test_objects_larger_than_the_cache_bypass_it(tmp_path, storage_backend):
+    write_object(storage_backend, "archive.zip", bytes(500), generation=1_000_000_000)
+    gcloud = make_gcloud(tmp_path, storage_backend, max_bytes=250)
+
+    for _ in range(2):
+        gcloud.sync_folder_from_gcloud(BUCKET, "archive.zip", str(tmp_path / "archive.zip"))
+
+    assert storage_backend.downloads == ["archive.zip", "archive.zip"]
+    assert not os.path.exists(tmp_path / "cache") or not os.listdir(tmp_path / "cache")
+
+
+def test_sync_folder_reports_missing_objects(tmp_path, storage_backend):
+    write_object(storage_backend, "tokenizer.pkl", b"tokenizer", generation=1_000_000_000)
+    gcloud = make_gcloud(tmp_path, storage_backend)
+    destination_dir = tmp_path / "best_model"
+    destination_dir.mkdir()
+
+    assert gcloud.sync_folder_from_gcloud(BUCKET, "tokenizer.pkl", str(destination_dir)) is True
+    assert gcloud.sync_folder_from_gcloud(BUCKET, "model.pt", str(destination_dir)) is False
+
+    # a directory destination receives the object under its own name, a missing object leaves it untouched
+    assert os.listdir(destination_dir) == ["tokenizer.pkl"]
+    assert gcloud.sync_objects_from_gcloud(BUCKET, [("tokenizer.pkl", str(destination_dir)), ("model.pt", str(destination_dir))]) == {
+        "tokenizer.pkl": True, "model.pt": False,
+    }
@@ -0,0 +1,95 @@
+import asyncio
+import pytest
+from ner.entity.config_entity import BatchSchedulerConfig
+from ner.pipeline.batch_scheduler import MicroBatchScheduler
+
+
+def make_scheduler(batches: list, max_batch_size: int = 4, max_wait_ms: float = 50, max_concurrent_batches: int = 1,
+                   release: asyncio.Event = None) -> MicroBatchScheduler:
+    async def predict_fn(sentences: list) -> list:
+        batches.append(list(sentences))
+        if release is not None:
+            await release.wait()
+        return [(sentence, sentence.upper()) for sentence in sentences]
+
+    return MicroBatchScheduler(
+        predict_fn=predict_fn,
+        batch_scheduler_config=BatchSchedulerConfig(
+            max_batch_size=max_batch_size, max_wait_ms=max_wait_ms, max_concurrent_batches=max_concurrent_batches,
+        ),
+    )
+
+
+def test_concurrent_requests_share_batches():
+    async def run() -> tuple:
+        batches = []
+        scheduler = make_scheduler(batches, max_batch_size=4)
+        results = await asyncio.gather(*[scheduler.submit(f"s{i}") for i in range(6)])
+        await scheduler.stop()
+        return batches, results, scheduler.get_stats()
+
+    batches, results, stats = asyncio.run(run())
+
+    assert results == [(f"s{i}", f"S{i}") for i in range(6)]
+    assert batches == [["s0", "s1", "s2", "s3"], ["s4", "s5"]]
+    assert stats["total_batches"] == 2 and stats["max_batch_size"] == 4
+
+
+def test_batch_closes_after_wait_window():
+    async def run() -> list:
+        batches = []
+        scheduler = make_scheduler(batches, max_wait_ms=100)
+
+        async def submit_later(sentence: str, delay: float) -> tuple:
+            await asyncio.sleep(delay)
+            return await scheduler.submit(sentence)
+
+        # b arrives inside the window of a, c after it closed
+        await asyncio.gather(submit_later("a", 0), submit_later("b", 0.02), submit_later("c", 0.3))
+        await scheduler.stop()
+        return batches
+
+    assert asyncio.run(run()) == [["a", "b"], ["c"]]
+
+
+def test_stop_fails_pending_requests():
+    async def run() -> tuple:
+        batches = []
+        release = asyncio.Event()
+        scheduler = make_scheduler(batches, max_batch_size=1, max_wait_ms=0, release=release)
+
+        running = asyncio.create_task(scheduler.submit("running"))
+        await asyncio.sleep(0.01)
+        # the only batch slot is taken, this one waits in the queue
+        queued = asyncio.create_task(scheduler.submit("queued"))
+        await asyncio.sleep(0.01)
+
+        stopping = asyncio.create_task(scheduler.stop())
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.wait_for(stopping, timeout=5)
+        return await running, queued
+
+    running_result, queued = asyncio.run(run())
+
+    assert running_result == ("running", "RUNNING")
+    with pytest.raises(RuntimeError, match="stopped"):
+        queued.result()
+
+
+def test_stop_fails_requests_of_open_batch():
+    async def run() -> list:
+        batches = []
+        # the window stays open, the requests are off the queue but not dispatched when stop() comes
+        scheduler = make_scheduler(batches, max_batch_size=4, max_wait_ms=10000)
+        pending = [asyncio.create_task(scheduler.submit(sentence)) for sentence in ("a", "b")]
+        await asyncio.sleep(0.05)
+
+        await asyncio.wait_for(scheduler.stop(), timeout=5)
+        await asyncio.wait_for(asyncio.gather(*pending, return_exceptions=True), timeout=5)
+        assert batches == []
+        return pending
+
+    for request in asyncio.run(run()):
+        with pytest.raises(RuntimeError, match="stopped"):
+            request.result()
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from ner.utils.batching import LengthGroupedBatchSampler
+
+
+@pytest.mark.parametrize("num_rows, batch_size, group_size", [(103, 8, 4), (64, 8, 2), (5, 8, 50), (1, 1, 1), (0, 4, 2)])
+@pytest.mark.parametrize("shuffle", [True, False])
+def test_every_row_is_sampled_exactly_once_per_epoch(num_rows, batch_size, group_size, shuffle):
+    lengths = np.random.default_rng(0).integers(1, 128, size=num_rows)
+    sampler = LengthGroupedBatchSampler(lengths=lengths, batch_size=batch_size, group_size=group_size, shuffle=shuffle)
+
+    for _ in range(3):
+        batches = list(sampler)
+        indices = [idx for batch in batches for idx in batch]
+
+        assert sorted(indices) == list(range(num_rows))
+        assert len(batches) == len(sampler)
+        assert all(0 < len(batch) <= batch_size for batch in batches)
+
+
+def test_batches_are_sorted_by_length_within_a_group():
+    lengths = np.random.default_rng(1).integers(1, 512, size=96)
+    sampler = LengthGroupedBatchSampler(lengths=lengths, batch_size=4, group_size=6, shuffle=False)
+
+    batches = list(sampler)
+
+    # without shuffling the groups are consecutive, every group of 6 batches runs from its longest to its shortest row
+    for group_start in range(0, len(batches), 6):
+        group_lengths = [lengths[idx] for batch in batches[group_start : group_start + 6] for idx in batch]
+        assert group_lengths == sorted(group_lengths, reverse=True)
+
+
+def test_shuffled_order_changes_every_epoch_and_is_reproducible():
+    lengths = np.random.default_rng(2).integers(1, 128, size=50)
+
+    first_run = LengthGroupedBatchSampler(lengths=lengths, batch_size=4, group_size=2, seed=7)
+    second_run = LengthGroupedBatchSampler(lengths=lengths, batch_size=4, group_size=2, seed=7)
+    first_epochs = [list(first_run) for _ in range(2)]
+
+    assert first_epochs[0] != first_epochs[1]
+    assert first_epochs == [list(second_run) for _ in range(2)]
@@ -0,0 +1,104 @@
+import json
+import os
+import pickle
+import pytest
+import torch
+from conftest import IDS_TO_LABELS, make_model
+from ner.configuration.gcloud import GCloud
+from ner.constants import BUCKET_NAME, GCP_MODEL_NAME, IDS_TO_LABELS_FILE_NAME, TOKENIZER_FILE_NAME
+from ner.entity.config_entity import BulkPredictorConfig
+from ner.exception import NerException
+from ner.pipeline.bulk_prediction_pipeline import BulkPredictor
+
+
+SENTENCES = [f"john smith went to london {i}" if i % 2 else f"the cat sat on the mat {i}" for i in range(10)]
+
+
+@pytest.fixture
+def bucket_dir(tmp_path, monkeypatch, tokenizer, model) -> str:
+    # stand-in bucket holding the artifacts the pusher uploads
+    monkeypatch.chdir(tmp_path)
+    object_dir = tmp_path / "buckets" / BUCKET_NAME
+    object_dir.mkdir(parents=True)
+    with open(object_dir / TOKENIZER_FILE_NAME, "wb") as tokenizer_file:
+        pickle.dump(tokenizer, tokenizer_file)
+    with open(object_dir / IDS_TO_LABELS_FILE_NAME, "wb") as ids_to_labels_file:
+        pickle.dump(IDS_TO_LABELS, ids_to_labels_file)
+    torch.save(model, object_dir / GCP_MODEL_NAME)
+
+    with open(tmp_path / "input.jsonl", "w") as input_file:
+        for i, sentence in enumerate(SENTENCES):
+            input_file.write(json.dumps(sentence if i % 3 else {"text": sentence}) + "\n")
+    return str(tmp_path / "buckets")
+
+
+def make_bulk_predictor(bucket_dir: str, shard_size: int = 4) -> BulkPredictor:
+    return BulkPredictor(
+        bulk_predictor_config=BulkPredictorConfig(
+            input_path="input.jsonl", output_path="output.jsonl", shard_size=shard_size, num_workers=1, num_threads=1,
+        ),
+        gcloud=GCloud(local_bucket_dir=bucket_dir, artifact_cache_dir="artifact_cache"),
+    )
+
+
+def read_output() -> list:
+    with open("output.jsonl", "r") as output_file:
+        return [json.loads(line) for line in output_file]
+
+
+def test_bulk_prediction_resumes_completed_shards(bucket_dir, model_predictor):
+    bulk_predictor = make_bulk_predictor(bucket_dir)
+    # an interrupted run: the model is pinned and the first shard is complete
+    model_version = bulk_predictor.prepare_shards_dir()
+    with open(bulk_predictor.get_shard_path(0), "w") as shard_file:
+        for sentence in SENTENCES[:4]:
+            shard_file.write(json.dumps({"text": sentence, "labels": ["resumed"]}) + "\n")
+
+    bulk_predictor_artifacts = make_bulk_predictor(bucket_dir).initiate_bulk_predictor()
+
+    assert bulk_predictor_artifacts.model_version == model_version
+    assert bulk_predictor_artifacts.num_shards == 3
+    assert bulk_predictor_artifacts.num_resumed_sentences == 4 and bulk_predictor_artifacts.num_sentences == 6
+
+    expected = model_predictor.predict_batch(SENTENCES)
+    assert read_output() == (
+        [{"text": sentence, "labels": ["resumed"]} for sentence in SENTENCES[:4]]
+        + [{"text": sentence, "labels": labels} for sentence, labels in expected[4:]]
+    )
+    # the serving model directory is left alone, the pinned model went away with the shards
+    assert not os.path.exists("best_model") and not os.path.exists(TOKENIZER_FILE_NAME)
+    assert not os.path.exists(bulk_predictor.shards_dir)
+
+
+def test_resume_keeps_pinned_model_when_bucket_changes(bucket_dir, tokenizer):
+    model_version = make_bulk_predictor(bucket_dir).prepare_shards_dir()
+    torch.save(make_model(tokenizer, seed=1), os.path.join(bucket_dir, BUCKET_NAME, GCP_MODEL_NAME))
+
+    assert make_bulk_predictor(bucket_dir).prepare_shards_dir() == model_version
+
+
+def test_resume_refuses_another_model_version(bucket_dir, tokenizer):
+    bulk_predictor = make_bulk_predictor(bucket_dir)
+    bulk_predictor.prepare_shards_dir()
+    # the pinned files are gone and the bucket holds a new model
+    os.remove(bulk_predictor.model_predictor.model_predictor_config.best_model_path)
+    torch.save(make_model(tokenizer, seed=1), os.path.join(bucket_dir, BUCKET_NAME, GCP_MODEL_NAME))
+
+    with pytest.raises(NerException, match="model version"):
+        make_bulk_predictor(bucket_dir).prepare_shards_dir()
+
+
+def test_resume_refuses_another_shard_size(bucket_dir):
+    make_bulk_predictor(bucket_dir, shard_size=4).prepare_shards_dir()
+
+    with pytest.raises(NerException, match="another input or shard size"):
+        make_bulk_predictor(bucket_dir, shard_size=5).prepare_shards_dir()
+
+
+def test_worker_errors_reach_the_parent(bucket_dir):
+    with open(os.path.join(bucket_dir, BUCKET_NAME, GCP_MODEL_NAME), "wb") as model_file:
+        model_file.write(b"not a model")
+
+    with pytest.raises(NerException) as exc_info:
+        make_bulk_predictor(bucket_dir).initiate_bulk_predictor()
+    assert "BrokenProcessPool" not in repr(exc_info.value) and "process pool" not in str(exc_info.value)
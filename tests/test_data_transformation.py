@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ner.components.data_transformation import DataTransformation
+from ner.entity.config_entity import DataTransformationConfig
+
+
+def make_df(num_rows: int, offset: int = 0) -> pd.DataFrame:
+    return pd.DataFrame({
+        "text": [f"john smith went to london {i}" for i in range(offset, offset + num_rows)],
+        "labels": ["B-per I-per O O B-geo O"] * num_rows,
+    }, dtype=object)
+
+
+@pytest.fixture
+def data_transformation() -> DataTransformation:
+    return DataTransformation(data_transformation_config=DataTransformationConfig(), data_ingestion_artifact=None)
+
+
+def test_split_ids_are_the_same_in_every_run(data_transformation):
+    # pandas hashes with a fixed key, not the per process string hash seed, these values hold across runs and machines
+    assert data_transformation.get_split_ids(make_df(30)).tolist() == [
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 1, 0, 2, 0, 0, 0, 2, 2, 0, 0, 0, 0, 0, 0, 0,
+    ]
+
+
+def test_split_of_a_row_does_not_depend_on_the_other_rows(data_transformation):
+    df = make_df(2000)
+    split_ids = data_transformation.get_split_ids(df)
+
+    # a larger sample, rows in another order and another index
+    grown_df = pd.concat([make_df(500, offset=2000), df.sample(frac=1, random_state=0)]).reset_index(drop=True)
+    grown_split_ids = pd.Series(data_transformation.get_split_ids(grown_df), index=grown_df["text"])
+
+    np.testing.assert_array_equal(grown_split_ids[df["text"]].values, split_ids)
+
+
+def test_split_does_not_depend_on_the_csv_engine_dtype(data_transformation):
+    df = make_df(500)
+
+    np.testing.assert_array_equal(
+        data_transformation.get_split_ids(df.astype(pd.StringDtype("python"))),
+        data_transformation.get_split_ids(df),
+    )
+
+
+def test_split_follows_the_configured_ratios(data_transformation):
+    split_ids = data_transformation.get_split_ids(make_df(20000))
+
+    shares = np.bincount(split_ids, minlength=3) / len(split_ids)
+    np.testing.assert_allclose(shares, [0.8, 0.1, 0.1], atol=0.01)
+
+
+def test_changed_ratios_only_move_rows_at_the_boundaries():
+    df = make_df(5000)
+    split_ids = DataTransformation(DataTransformationConfig(), data_ingestion_artifact=None).get_split_ids(df)
+    more_train_ids = DataTransformation(
+        DataTransformationConfig(train_split_ratio=0.85, val_split_ratio=0.1), data_ingestion_artifact=None
+    ).get_split_ids(df)
+
+    # rows already in train stay there, only val rows move to train and test rows to val
+    assert (more_train_ids[split_ids == 0] == 0).all()
+    assert set(more_train_ids[split_ids == 1]) <= {0, 1}
+    assert set(more_train_ids[split_ids == 2]) <= {1, 2}
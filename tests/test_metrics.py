@@ -0,0 +1,121 @@
+import os
+import subprocess
+import sys
+import textwrap
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client.parser import text_string_to_metric_families
+from ner.utils import metrics
+from ner.utils.metrics import MetricsMiddleware
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def scrape() -> dict:
+    # sample values by (sample name, sorted labels)
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(metrics.render_metrics().decode())
+        for sample in family.samples
+    }
+
+
+def test_metrics_render_in_the_prometheus_text_format():
+    before = scrape()
+    metrics.STAGE_SECONDS.labels(stage="forward").observe(0.003)
+    metrics.STAGE_SECONDS.labels(stage="forward").observe(100)
+    metrics.ERRORS.labels(route='/quoted "route"\n').inc()
+    metrics.SENTENCES.inc(3)
+    after = scrape()
+
+    def delta(name: str, **labels) -> float:
+        key = (name, tuple(sorted(labels.items())))
+        return after[key] - before.get(key, 0)
+
+    assert delta("ner_stage_seconds_bucket", stage="forward", le="0.0025") == 0
+    assert delta("ner_stage_seconds_bucket", stage="forward", le="0.005") == 1
+    assert delta("ner_stage_seconds_bucket", stage="forward", le="+Inf") == 2
+    assert delta("ner_stage_seconds_count", stage="forward") == 2
+    assert delta("ner_stage_seconds_sum", stage="forward") == pytest.approx(100.003)
+    # label values are escaped on the way out and read back unchanged
+    assert delta("ner_errors_total", route='/quoted "route"\n') == 1
+    assert delta("ner_sentences_total") == 3
+    assert metrics.CONTENT_TYPE_LATEST.startswith("text/plain; version=")
+
+
+def test_middleware_counts_requests_by_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"item_id": item_id}
+
+    before = scrape()
+    client = TestClient(app)
+    for item_id in (1, 2):
+        assert client.get(f"/items/{item_id}").status_code == 200
+    assert client.get("/missing").status_code == 404
+    after = scrape()
+
+    def delta(name: str, **labels) -> float:
+        key = (name, tuple(sorted(labels.items())))
+        return after[key] - before.get(key, 0)
+
+    assert delta("ner_requests_total", route="/items/{item_id}", method="GET", status="200") == 2
+    assert delta("ner_requests_total", route="unmatched", method="GET", status="404") == 1
+    assert delta("ner_request_seconds_count", route="/items/{item_id}") == 2
+
+
+def test_worker_process_metrics_reach_the_scrape(tmp_path):
+    # the multiprocess mode is fixed when prometheus_client is imported, so it runs in a fresh interpreter
+    script = textwrap.dedent(
+        """
+        import multiprocessing
+        import os
+        from concurrent.futures import ProcessPoolExecutor
+        from prometheus_client.parser import text_string_to_metric_families
+        from ner.utils import metrics
+
+
+        def record():
+            # a worker that predicts once and then stays idle, nothing is sent back with results
+            metrics.SENTENCES.inc(5)
+            metrics.QUEUE_DEPTH.set(7)
+            return os.getpid()
+
+
+        def scrape():
+            return {
+                (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+                for family in text_string_to_metric_families(metrics.render_metrics().decode())
+                for sample in family.samples
+            }
+
+
+        if __name__ == "__main__":
+            metrics.SENTENCES.inc(2)
+            metrics.QUEUE_DEPTH.set(1)
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                worker_pid = executor.submit(record).result()
+                samples = scrape()
+                assert samples[("ner_sentences_total", ())] == 7, samples
+                assert samples[("ner_batch_queue_depth", ())] == 8, samples
+
+            metrics.mark_process_dead(worker_pid)
+            samples = scrape()
+            # the counts of a stopped worker stay, its gauges no longer count
+            assert samples[("ner_sentences_total", ())] == 7, samples
+            assert samples[("ner_batch_queue_depth", ())] == 1, samples
+        """
+    )
+    script_path = tmp_path / "record_metrics.py"
+    script_path.write_text(script)
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path / "metrics"), PYTHONPATH=ROOT_DIR)
+    (tmp_path / "metrics").mkdir()
+
+    completed = subprocess.run([sys.executable, str(script_path)], env=env, cwd=tmp_path, capture_output=True, text=True)
+
+    assert completed.returncode == 0, completed.stderr
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+import torch
+from transformers import BertConfig, BertForTokenClassification
+from model.bert import BertModel, OnnxBertModel, TorchScriptBertModel
+from ner.components.model_exporter import ModelExporter
+from ner.constants import EXPORT_PARITY_ATOL
+from ner.entity.config_entity import ModelExporterConfig
+from ner.exception import NerException
+
+
+def make_model(seed: int = 0) -> BertModel:
+    # tiny random bert behind the BertModel wrapper, no pretrained weights are downloaded
+    torch.manual_seed(seed)
+    config = BertConfig(
+        vocab_size=100, hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+        intermediate_size=64, max_position_embeddings=128, num_labels=5,
+    )
+    model = BertModel.__new__(BertModel)
+    torch.nn.Module.__init__(model)
+    model.bert = BertForTokenClassification(config)
+    return model.eval()
+
+
+@pytest.fixture
+def model_exporter(tmp_path) -> ModelExporter:
+    model_exporter_config = ModelExporterConfig()
+    model_exporter_config.model_exporter_dir = str(tmp_path)
+    model_exporter_config.onnx_model_path = str(tmp_path / "model.onnx")
+    model_exporter_config.torchscript_model_path = str(tmp_path / "model_scripted.pt")
+    return ModelExporter(model_trainer_artifact=None, model_exporter_config=model_exporter_config)
+
+
+def get_inputs() -> tuple:
+    # batch size and sequence length differ from the export example, two rows are padded
+    generator = torch.Generator().manual_seed(0)
+    input_id = torch.randint(1, 100, (4, 37), generator=generator)
+    mask = torch.ones_like(input_id)
+    mask[1, 20:] = 0
+    mask[3, 5:] = 0
+    return input_id, mask
+
+
+def assert_logits_match(model: BertModel, exported_model: object) -> None:
+    input_id, mask = get_inputs()
+    with torch.no_grad():
+        eager_logits = model(input_id, mask, None)[0].numpy()
+        exported_logits = exported_model(input_id, mask, None)[0].numpy()
+
+    assert exported_logits.shape == eager_logits.shape
+    np.testing.assert_allclose(exported_logits, eager_logits, rtol=0, atol=EXPORT_PARITY_ATOL)
+
+
+def test_onnx_export_matches_eager_logits(model_exporter):
+    pytest.importorskip("onnxruntime")
+    model = make_model()
+
+    onnx_model_path = model_exporter.export_onnx_model(model=model)
+
+    assert_logits_match(model, OnnxBertModel(onnx_model_path=onnx_model_path))
+
+
+def test_torchscript_export_matches_eager_logits(model_exporter):
+    model = make_model()
+
+    torchscript_model_path = model_exporter.export_torchscript_model(model=model)
+
+    assert_logits_match(model, TorchScriptBertModel(torchscript_model_path=torchscript_model_path))
+
+
+def test_verify_exported_model_rejects_other_logits(model_exporter):
+    model = make_model()
+    torchscript_model_path = model_exporter.export_torchscript_model(model=make_model(seed=1))
+
+    with pytest.raises(NerException):
+        model_exporter.verify_exported_model(
+            model=model, exported_model=TorchScriptBertModel(torchscript_model_path=torchscript_model_path)
+        )
@@ -0,0 +1,187 @@
+import json
+import os
+import pickle
+import pytest
+import torch
+from transformers import BertConfig, BertForTokenClassification
+from conftest import IDS_TO_LABELS, LABELS, make_model
+from model.bert import BertModel
+from ner.configuration.gcloud import GCloud
+from ner.constants import BUCKET_NAME, GCP_MODEL_NAME, IDS_TO_LABELS_FILE_NAME, TOKENIZER_FILE_NAME
+from ner.exception import NerException
+from ner.pipeline.prediction_pipeline import ModelPredictor
+
+
+class Bucket:
+    '''Stand-in bucket the pusher would upload to, every push gets a new generation'''
+    def __init__(self, root_dir: str) -> None:
+        self.root_dir = root_dir
+        self.object_dir = os.path.join(root_dir, BUCKET_NAME)
+        self.generation = 1_000_000_000
+        os.makedirs(self.object_dir, exist_ok=True)
+
+    def put(self, object_name: str, write_fn) -> None:
+        object_path = os.path.join(self.object_dir, object_name)
+        write_fn(object_path)
+        self.generation += 1_000_000_000
+        os.utime(object_path, ns=(self.generation, self.generation))
+
+    def put_pickle(self, object_name: str, obj: object) -> None:
+        def write_pickle(path: str) -> None:
+            with open(path, "wb") as pickle_file:
+                pickle.dump(obj, pickle_file)
+
+        self.put(object_name, write_pickle)
+
+    def push_model(self, model) -> None:
+        self.put(GCP_MODEL_NAME, lambda path: torch.save(model, path))
+
+
+def make_broken_model() -> BertModel:
+    # loads fine, but its embedding table is smaller than the tokenizer vocabulary, so the warm-up forward pass fails
+    config = BertConfig(vocab_size=4, hidden_size=32, num_hidden_layers=1, num_attention_heads=2,
+                        intermediate_size=64, num_labels=len(LABELS))
+    model = BertModel.__new__(BertModel)
+    torch.nn.Module.__init__(model)
+    model.bert = BertForTokenClassification(config)
+    return model.eval()
+
+
+@pytest.fixture
+def bucket(tmp_path, monkeypatch, tokenizer, model) -> Bucket:
+    monkeypatch.chdir(tmp_path)
+    bucket = Bucket(str(tmp_path / "buckets"))
+    bucket.put_pickle(TOKENIZER_FILE_NAME, tokenizer)
+    bucket.put_pickle(IDS_TO_LABELS_FILE_NAME, IDS_TO_LABELS)
+    bucket.push_model(model)
+    return bucket
+
+
+def make_predictor(bucket: Bucket) -> ModelPredictor:
+    # every instance stands for one serving process sharing best_model
+    return ModelPredictor(gcloud=GCloud(local_bucket_dir=bucket.root_dir, artifact_cache_dir="artifact_cache"))
+
+
+def get_snapshot_source_version(model_predictor: ModelPredictor) -> str:
+    # version of the files a rollback would load
+    with open(os.path.join(model_predictor.model_predictor_config.previous_model_dir, "version.json")) as version_file:
+        return json.load(version_file)["source_version"]
+
+
+def test_update_swaps_in_new_bucket_version(bucket, tokenizer):
+    model_predictor = make_predictor(bucket)
+    first_artifacts = model_predictor.get_model_artifacts()
+    assert model_predictor.update_model_artifacts() is False
+
+    bucket.push_model(make_model(tokenizer, seed=1))
+    assert model_predictor.is_update_available(first_artifacts.source_version)
+    assert model_predictor.update_model_artifacts() is True
+
+    status = model_predictor.get_model_status()
+    assert status["source_version"] != first_artifacts.source_version
+    assert status["model_version"] != first_artifacts.model_version
+    assert status["can_roll_back"] and status["rejected_versions"] == []
+    assert get_snapshot_source_version(model_predictor) == first_artifacts.source_version
+    assert not os.path.exists(model_predictor.model_predictor_config.previous_model_dir + ".bak")
+
+
+def test_failed_warm_up_rejects_the_version(bucket):
+    model_predictor = make_predictor(bucket)
+    first_artifacts = model_predictor.get_model_artifacts()
+
+    bucket.push_model(make_broken_model())
+    with pytest.raises(NerException):
+        model_predictor.update_model_artifacts()
+
+    # the serving model and its files stay, the broken version is not tried again
+    assert model_predictor.model_predictor_artifacts is first_artifacts
+    assert model_predictor.get_model_version() == first_artifacts.model_version
+    status = model_predictor.get_model_status()
+    assert len(status["rejected_versions"]) == 1 and not status["can_roll_back"]
+    assert not model_predictor.is_update_available(first_artifacts.source_version)
+    assert model_predictor.update_model_artifacts() is False
+    assert not os.path.exists(model_predictor.model_predictor_config.previous_model_dir + ".bak")
+
+
+def test_rollback_restores_previous_version(bucket, tokenizer):
+    model_predictor = make_predictor(bucket)
+    first_artifacts = model_predictor.get_model_artifacts()
+    bucket.push_model(make_model(tokenizer, seed=1))
+    model_predictor.update_model_artifacts()
+    second_source_version = model_predictor.model_predictor_artifacts.source_version
+
+    rolled_back_artifacts = model_predictor.rollback_model_artifacts()
+
+    assert rolled_back_artifacts.source_version == first_artifacts.source_version
+    assert rolled_back_artifacts.model_version == first_artifacts.model_version
+    assert model_predictor.get_model_version() == first_artifacts.model_version
+    # the version rolled back from stays in the bucket but is not picked up again
+    assert model_predictor.get_model_status()["rejected_versions"] == [second_source_version]
+    assert model_predictor.update_model_artifacts() is False
+    assert get_snapshot_source_version(model_predictor) == second_source_version
+
+
+def test_rollback_then_update_to_next_version(bucket, tokenizer):
+    model_predictor = make_predictor(bucket)
+    first_artifacts = model_predictor.get_model_artifacts()
+    bucket.push_model(make_model(tokenizer, seed=1))
+    model_predictor.update_model_artifacts()
+    model_predictor.rollback_model_artifacts()
+
+    bucket.push_model(make_model(tokenizer, seed=2))
+    assert model_predictor.update_model_artifacts() is True
+    third_source_version = model_predictor.model_predictor_artifacts.source_version
+    assert third_source_version not in model_predictor.get_model_status()["rejected_versions"]
+    assert get_snapshot_source_version(model_predictor) == first_artifacts.source_version
+
+    assert model_predictor.rollback_model_artifacts().model_version == first_artifacts.model_version
+
+
+def test_reload_does_not_load_rejected_version(bucket, tokenizer):
+    model_predictor = make_predictor(bucket)
+    first_artifacts = model_predictor.get_model_artifacts()
+    bucket.push_model(make_model(tokenizer, seed=1))
+    model_predictor.update_model_artifacts()
+    second_source_version = model_predictor.model_predictor_artifacts.source_version
+    model_predictor.rollback_model_artifacts()
+
+    reloaded_artifacts = model_predictor.reload_model_artifacts()
+
+    assert reloaded_artifacts.source_version == first_artifacts.source_version
+    assert model_predictor.get_model_version() == first_artifacts.model_version
+    # the snapshot still holds the version rolled back from, not a copy of the serving one
+    assert get_snapshot_source_version(model_predictor) == second_source_version
+
+
+def test_reload_warms_up_and_snapshots_new_version(bucket, tokenizer):
+    model_predictor = make_predictor(bucket)
+    first_artifacts = model_predictor.get_model_artifacts()
+
+    bucket.push_model(make_broken_model())
+    with pytest.raises(NerException):
+        model_predictor.reload_model_artifacts()
+    assert model_predictor.model_predictor_artifacts is first_artifacts
+
+    bucket.push_model(make_model(tokenizer, seed=1))
+    reloaded_artifacts = model_predictor.reload_model_artifacts()
+    assert reloaded_artifacts.source_version != first_artifacts.source_version
+    assert get_snapshot_source_version(model_predictor) == first_artifacts.source_version
+
+
+def test_other_processes_follow_without_downloading(bucket, tokenizer, monkeypatch):
+    leader, follower = make_predictor(bucket), make_predictor(bucket)
+    first_artifacts = leader.get_model_artifacts()
+    assert follower.get_model_artifacts().source_version == first_artifacts.source_version
+
+    def download_objects(*args, **kwargs):
+        raise AssertionError("the follower must load the files the leader left in best_model")
+
+    monkeypatch.setattr(follower.gcloud, "sync_objects_from_gcloud", download_objects)
+    bucket.push_model(make_model(tokenizer, seed=1))
+    assert leader.update_model_artifacts() is True
+    assert follower.update_model_artifacts() is True
+    assert follower.model_predictor_artifacts.model_version == leader.model_predictor_artifacts.model_version
+
+    leader.rollback_model_artifacts()
+    assert follower.update_model_artifacts() is True
+    assert follower.model_predictor_artifacts.model_version == first_artifacts.model_version
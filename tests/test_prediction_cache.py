@@ -0,0 +1,83 @@
+import types
+import pytest
+from ner.utils import prediction_cache as prediction_cache_module
+from ner.utils.prediction_cache import PredictionCache
+
+
+@pytest.fixture
+def clock(monkeypatch) -> list:
+    # time.monotonic of the cache module reads now[0]
+    now = [1000.0]
+    monkeypatch.setattr(prediction_cache_module, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(max_entries=2, max_bytes=1 << 20)
+    cache.set("a", ["O"])
+    cache.set("b", ["B-geo"])
+    assert cache.get("a") == ["O"]
+
+    cache.set("c", ["B-per"])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == ["O"] and cache.get("c") == ["B-per"]
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = PredictionCache(max_entries=10, max_bytes=1 << 20, ttl_seconds=60)
+    cache.set("a", ["O"])
+
+    clock[0] += 59
+    assert cache.get("a") == ["O"]
+    clock[0] += 2
+    assert cache.get("a") is None
+
+    stats = cache.get_stats()
+    assert stats["expirations"] == 1 and stats["entries"] == 0 and stats["bytes"] == 0
+
+
+def test_byte_limit_evicts_and_skips_oversized_entries():
+    entry_size = PredictionCache.get_size("a", ["O"] * 10)
+    cache = PredictionCache(max_entries=100, max_bytes=entry_size * 2)
+
+    for key in ("a", "b", "c"):
+        cache.set(key, ["O"] * 10)
+    # one entry alone over max_bytes is never stored
+    cache.set("large", ["O"] * 1000)
+
+    assert cache.get("a") is None and cache.get("large") is None
+    assert cache.get("b") is not None and cache.get("c") is not None
+    assert cache.current_bytes <= cache.max_bytes
+
+
+def test_replacing_a_key_keeps_the_byte_count():
+    cache = PredictionCache(max_entries=10, max_bytes=1 << 20)
+    cache.set("a", ["O"])
+    cache.set("a", ["O", "B-geo"])
+
+    assert cache.get("a") == ["O", "B-geo"]
+    assert cache.current_bytes == PredictionCache.get_size("a", ["O", "B-geo"])
+
+
+def test_zero_entries_disables_cache():
+    cache = PredictionCache(max_entries=0, max_bytes=1 << 20)
+    cache.set("a", ["O"])
+
+    assert cache.get("a") is None
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_cached_predictions_are_returned_and_dropped_on_swap(model_predictor):
+    sentences = ["john smith went to london", "the cat sat on the mat"]
+
+    first_results = model_predictor.predict_batch(sentences)
+    # whitespace differences hit the same entry
+    second_results = model_predictor.predict_batch(["john  smith went to london ", sentences[1]])
+
+    assert [labels for _, labels in second_results] == [labels for _, labels in first_results]
+    assert model_predictor.get_cache_stats()["hits"] == 2
+
+    model_predictor.swap_model_artifacts(model_predictor.model_predictor_artifacts)
+    assert model_predictor.get_cache_stats()["entries"] == 0
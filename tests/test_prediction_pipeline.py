@@ -0,0 +1,143 @@
+import os
+import random
+import torch
+from conftest import IDS_TO_LABELS, WORDS
+from model.bert import quantize_model
+
+
+def make_sentences(num_sentences: int, max_words: int = 40, seed: int = 1) -> list:
+    # known words, words split into word pieces and out of vocabulary words
+    generator = random.Random(seed)
+    words = WORDS[:11] + ["unable", "playing", "cats", "zzqx"]
+    return [
+        " ".join(generator.choice(words) for _ in range(generator.randint(1, max_words)))
+        for _ in range(num_sentences)
+    ]
+
+
+def predict(model_predictor, sentences: list) -> list:
+    model_predictor_artifacts = model_predictor.model_predictor_artifacts
+    return model_predictor.evaluate_batch_texts(
+        model=model_predictor_artifacts.model,
+        sentences=sentences,
+        tokenizer=model_predictor_artifacts.tokenizer,
+        ids_to_labels=model_predictor_artifacts.ids_to_labels,
+    )
+
+
+def test_length_buckets_predict_like_max_length_padding(model_predictor):
+    sentences = make_sentences(16)
+
+    model_predictor.model_predictor_config.length_buckets = (512,)
+    max_length_results = predict(model_predictor, sentences)
+    model_predictor.model_predictor_config.length_buckets = (32, 64, 128, 256, 512)
+    bucket_results = predict(model_predictor, sentences)
+
+    assert bucket_results == max_length_results
+    assert all(len(labels) == len(sentence.split()) for sentence, labels in bucket_results)
+
+
+def test_padding_length_picks_smallest_bucket(model_predictor):
+    model_predictor.model_predictor_config.length_buckets = (32, 64, 128)
+
+    assert model_predictor.get_padding_length(5) == 32
+    assert model_predictor.get_padding_length(33) == 64
+    assert model_predictor.get_padding_length(300) == 300
+    assert model_predictor.get_padding_length(600) == 512
+
+
+def test_predict_batch_matches_one_text_predictions(model_predictor):
+    model_predictor.model_predictor_config.batch_size = 4
+    model_predictor_artifacts = model_predictor.model_predictor_artifacts
+    sentences = make_sentences(10) + ["john smith went to london"] * 2
+
+    batch_results = model_predictor.predict_batch(sentences)
+
+    one_text_results = [
+        model_predictor.evaluate_one_text(
+            model=model_predictor_artifacts.model,
+            sentence=sentence,
+            tokenizer=model_predictor_artifacts.tokenizer,
+            ids_to_labels=model_predictor_artifacts.ids_to_labels,
+        )
+        for sentence in sentences
+    ]
+    assert batch_results == one_text_results
+
+
+def test_quantized_backend_loads_pickled_int8_model(model_predictor):
+    model_predictor_config = model_predictor.model_predictor_config
+    model_predictor_config.backend = "quantized"
+    os.makedirs(model_predictor_config.best_model_dir, exist_ok=True)
+    torch.save(quantize_model(model_predictor.model_predictor_artifacts.model), model_predictor_config.best_quantized_model_path)
+
+    model = model_predictor.load_model(download_model=False)
+
+    assert model_predictor.get_model_path() == model_predictor_config.best_quantized_model_path
+    results = model_predictor.evaluate_batch_texts(
+        model=model, sentences=["john smith went to london"],
+        tokenizer=model_predictor.model_predictor_artifacts.tokenizer, ids_to_labels=IDS_TO_LABELS,
+    )
+    assert len(results[0][1]) == 5
+
+
+def test_window_starts_cover_every_token(model_predictor):
+    model_predictor.model_predictor_config.long_document_stride = 8
+
+    assert model_predictor.get_window_starts(num_tokens=100, window_size=30) == [0, 22, 44, 66, 70]
+    assert model_predictor.get_window_starts(num_tokens=10, window_size=30) == [0]
+
+
+def predict_windows_one_by_one(model_predictor, sentence: str) -> list:
+    # every window in its own unpadded forward pass, each token keeps the prediction of the first window
+    # where it is furthest from both window edges
+    model_predictor_artifacts = model_predictor.model_predictor_artifacts
+    tokenizer = model_predictor_artifacts.tokenizer
+    encoding = tokenizer([sentence], add_special_tokens=False)
+    token_ids = encoding["input_ids"][0]
+    window_size = model_predictor.model_predictor_config.max_length - 2
+
+    best = {}
+    for start in model_predictor.get_window_starts(num_tokens=len(token_ids), window_size=window_size):
+        window = token_ids[start : start + window_size]
+        input_id = torch.tensor([[tokenizer.cls_token_id] + window + [tokenizer.sep_token_id]])
+        with torch.no_grad():
+            predictions = model_predictor_artifacts.model(input_id, torch.ones_like(input_id), None)[0][0].argmax(dim=-1)
+        for offset in range(len(window)):
+            centrality = min(offset, len(window) - 1 - offset)
+            if start + offset not in best or centrality > best[start + offset][0]:
+                best[start + offset] = (centrality, predictions[offset + 1].item())
+
+    word_ids = encoding.word_ids(0)
+    return [
+        IDS_TO_LABELS[best[position][1]]
+        for position, word_id in enumerate(word_ids)
+        if word_id is not None and (position == 0 or word_ids[position - 1] != word_id)
+    ]
+
+
+def test_long_text_merges_windows_by_centrality(model_predictor):
+    model_predictor_config = model_predictor.model_predictor_config
+    model_predictor_config.max_length = 32
+    model_predictor_config.long_document_stride = 8
+    model_predictor_config.batch_size = 2
+    model_predictor_artifacts = model_predictor.model_predictor_artifacts
+    sentence = " ".join(make_sentences(6, max_words=20, seed=3))
+
+    _, prediction_label = model_predictor.evaluate_long_text(
+        model=model_predictor_artifacts.model, sentence=sentence,
+        tokenizer=model_predictor_artifacts.tokenizer, ids_to_labels=IDS_TO_LABELS,
+    )
+
+    assert len(model_predictor_artifacts.tokenizer(sentence, add_special_tokens=False)["input_ids"]) > 3 * 30
+    assert len(prediction_label) == len(sentence.split())
+    assert prediction_label == predict_windows_one_by_one(model_predictor, sentence)
+
+
+def test_short_text_predicts_like_one_text(model_predictor):
+    model_predictor_artifacts = model_predictor.model_predictor_artifacts
+    sentence = "john smith went to london and played in paris"
+    kwargs = dict(model=model_predictor_artifacts.model, sentence=sentence,
+                  tokenizer=model_predictor_artifacts.tokenizer, ids_to_labels=IDS_TO_LABELS)
+
+    assert model_predictor.evaluate_long_text(**kwargs) == model_predictor.evaluate_one_text(**kwargs)
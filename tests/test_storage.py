@@ -0,0 +1,43 @@
+import os
+import pytest
+from ner.configuration import storage
+from ner.configuration.storage import GcsStorageBackend, LocalStorageBackend, StorageBackend
+
+
+def test_incomplete_backend_fails_on_creation():
+    class DownloadOnlyBackend(StorageBackend):
+        def download(self, bucket_name: str, object_name: str, destination: str) -> int:
+            return 0
+
+    with pytest.raises(TypeError, match="abstract"):
+        DownloadOnlyBackend()
+
+
+def test_local_backend_round_trip(tmp_path):
+    source = tmp_path / "model.pt"
+    source.write_bytes(b"weights")
+    storage_backend = LocalStorageBackend(root_dir=str(tmp_path / "buckets"))
+
+    assert storage_backend.upload(str(source), "bucket", "model.pt") == 7
+    assert storage_backend.get_object_metadata("bucket", "model.pt")["size"] == 7
+    assert storage_backend.download("bucket", "model.pt", str(tmp_path / "copy.pt")) == 7
+    assert storage_backend.delete("bucket", "model.pt") is True
+    assert storage_backend.delete("bucket", "model.pt") is False
+    assert storage_backend.get_object_metadata("bucket", "model.pt") is None
+    assert not os.listdir(tmp_path / "buckets" / "bucket")
+
+
+def test_gcs_client_gets_a_session_sized_for_parallel_transfers(monkeypatch):
+    google_auth = pytest.importorskip("google.auth")
+    from google.auth.credentials import AnonymousCredentials
+
+    monkeypatch.setattr(google_auth, "default", lambda: (AnonymousCredentials(), "test-project"))
+    monkeypatch.setattr(storage, "_gcs_clients", {})
+
+    client = GcsStorageBackend(max_workers=4).get_client()
+
+    adapter = client._http.get_adapter("https://storage.googleapis.com")
+    assert adapter._pool_maxsize == 4 * storage.STORAGE_MAX_CONCURRENT_FETCHES
+    assert client.project == "test-project"
+    # one client per process
+    assert GcsStorageBackend().get_client() is client
@@ -0,0 +1,67 @@
+import asyncio
+import json
+from ner.entity.config_entity import StreamPredictorConfig
+from ner.pipeline.stream_pipeline import NdjsonStreamPredictor
+
+
+async def predict_upper(sentences: list) -> list:
+    return [(sentence, sentence.upper().split()) for sentence in sentences]
+
+
+async def iter_chunks(chunks: list):
+    for chunk in chunks:
+        yield chunk
+
+
+def stream(chunks: list, predict_fn=predict_upper, batch_size: int = 2) -> list:
+    stream_predictor = NdjsonStreamPredictor(
+        predict_fn=predict_fn, stream_predictor_config=StreamPredictorConfig(batch_size=batch_size)
+    )
+
+    async def run() -> list:
+        return [json.loads(line) async for line in stream_predictor.predict_stream(iter_chunks(chunks))]
+
+    return asyncio.run(run())
+
+
+def test_every_line_gets_a_result_in_order():
+    body = b'"john went"\n{"text": "to london"}\n\n{bad json\n["a list"]\n{"text": 5}\n"paris"'
+    # chunk boundaries fall inside lines
+    chunks = [body[i : i + 7] for i in range(0, len(body), 7)]
+
+    lines = stream(chunks)
+
+    assert lines[0] == {"line": 0, "text": "john went", "labels": ["JOHN", "WENT"]}
+    assert lines[1] == {"line": 1, "text": "to london", "labels": ["TO", "LONDON"]}
+    assert [line["line"] for line in lines] == [0, 1, 2, 3, 4, 5]
+    assert all(set(line) == {"line", "error"} for line in lines[2:5])
+    assert lines[5] == {"line": 5, "text": "paris", "labels": ["PARIS"]}
+
+
+def test_batch_of_invalid_lines_skips_prediction():
+    calls = []
+
+    async def predict_fn(sentences: list) -> list:
+        calls.append(sentences)
+        return await predict_upper(sentences)
+
+    lines = stream([b'{bad\n[1]\n"cat"\n'], predict_fn=predict_fn, batch_size=2)
+
+    assert calls == [["cat"]]
+    assert "error" in lines[0] and "error" in lines[1] and lines[2]["labels"] == ["CAT"]
+
+
+def test_failed_prediction_ends_with_error_line():
+    async def predict_fn(sentences: list) -> list:
+        if "fail" in sentences:
+            raise RuntimeError("model unavailable")
+        return await predict_upper(sentences)
+
+    lines = stream([b'"a"\n"b"\n"fail"\n"c"\n'], predict_fn=predict_fn, batch_size=2)
+
+    assert [line.get("text") for line in lines[:2]] == ["a", "b"]
+    assert len(lines) == 3 and "model unavailable" in lines[2]["error"]
+
+
+def test_empty_body_streams_nothing():
+    assert stream([b"", b"\n\n"]) == []
@@ -0,0 +1,113 @@
+import os
+import subprocess
+import sys
+import textwrap
+import numpy as np
+import pandas as pd
+from conftest import LABELS_TO_IDS
+from ner.utils.tokenized_dataset import META_FILE_NAME, TokenizedDatasetStore
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_df(num_rows: int = 20, offset: int = 0) -> pd.DataFrame:
+    return pd.DataFrame({
+        "text": [f"john smith went to london {i + offset}" for i in range(num_rows)],
+        "labels": ["B-per I-per O O B-geo O"] * num_rows,
+    })
+
+
+def count_builds(store: TokenizedDatasetStore, monkeypatch) -> list:
+    builds = []
+    build = store.build
+
+    def counting_build(**kwargs):
+        builds.append(os.path.basename(kwargs["dataset_dir"]))
+        build(**kwargs)
+
+    monkeypatch.setattr(store, "build", counting_build)
+    return builds
+
+
+def test_second_training_run_reuses_stored_dataset(tmp_path):
+    # every run is a new interpreter with its own string hash seed, the order of a set of labels changes between them
+    script = textwrap.dedent(
+        """
+        import os
+        import sys
+        import pandas as pd
+        from conftest import make_tokenizer
+        from ner.components.data_transformation import DataTransformation
+        from ner.entity.config_entity import DataTransformationConfig
+        from ner.utils.tokenized_dataset import TokenizedDatasetStore
+
+        labels = ["B-art", "B-eve", "B-geo", "B-gpe", "B-nat", "B-org", "B-per", "B-tim", "I-geo", "I-per", "O"]
+        df = pd.DataFrame({
+            "text": [" ".join(["london"] * len(labels)) + f" {i}" for i in range(30)],
+            "labels": [" ".join(labels[i:] + labels[:i]) for i in range(len(labels))] * 2 + [" ".join(labels)] * 8,
+        })
+        labels_to_ids, _, df_train, _, _, _ = DataTransformation(DataTransformationConfig(), None).splitting_data(df)
+
+        store = TokenizedDatasetStore(store_dir=sys.argv[1], chunk_size=8, max_datasets=6)
+        reused = os.path.exists(store.get_dataset_dir(
+            store.get_key(df=df_train, tokenizer=make_tokenizer(), labels_to_ids=labels_to_ids, max_length=32)
+        ))
+        store.get_dataset(df=df_train, tokenizer=make_tokenizer(), labels_to_ids=labels_to_ids, max_length=32)
+        print("reused" if reused else "built")
+        """
+    )
+    script_path = tmp_path / "training_run.py"
+    script_path.write_text(script)
+    store_dir = tmp_path / "tokenized_datasets"
+
+    outputs = []
+    for hash_seed in ("1", "2"):
+        env = dict(os.environ, PYTHONHASHSEED=hash_seed, PYTHONPATH=os.pathsep.join([ROOT_DIR, os.path.join(ROOT_DIR, "tests")]))
+        completed = subprocess.run([sys.executable, str(script_path), str(store_dir)], env=env, cwd=tmp_path,
+                                   capture_output=True, text=True)
+        assert completed.returncode == 0, completed.stderr
+        outputs.append(completed.stdout.strip())
+
+    assert outputs == ["built", "reused"]
+    assert len([name for name in os.listdir(store_dir) if not name.startswith(".")]) == 1
+
+
+def test_get_dataset_builds_once(tmp_path, tokenizer, monkeypatch):
+    store = TokenizedDatasetStore(store_dir=str(tmp_path), chunk_size=8)
+    builds = count_builds(store, monkeypatch)
+    df = make_df()
+
+    first = store.get_dataset(df=df, tokenizer=tokenizer, labels_to_ids=LABELS_TO_IDS, max_length=32)
+    second = store.get_dataset(df=df, tokenizer=tokenizer, labels_to_ids=LABELS_TO_IDS, max_length=32)
+
+    assert len(builds) == 1
+    assert len(second) == len(df)
+    np.testing.assert_array_equal(first.get_row(3)[0], second.get_row(3)[0])
+
+
+def test_least_recently_used_datasets_are_evicted(tmp_path, tokenizer, monkeypatch):
+    store = TokenizedDatasetStore(store_dir=str(tmp_path), chunk_size=8, max_datasets=2)
+    builds = count_builds(store, monkeypatch)
+    dfs = [make_df(offset=i * 100) for i in range(3)]
+    keys = [store.get_key(df=df, tokenizer=tokenizer, labels_to_ids=LABELS_TO_IDS, max_length=32) for df in dfs]
+
+    def get_dataset(i: int, last_used: int) -> None:
+        store.get_dataset(df=dfs[i], tokenizer=tokenizer, labels_to_ids=LABELS_TO_IDS, max_length=32)
+        # explicit last use times, file system timestamps can be coarser than the gaps between the calls
+        meta_path = os.path.join(store.get_dataset_dir(keys[i]), META_FILE_NAME)
+        os.utime(meta_path, ns=(last_used, last_used))
+
+    get_dataset(0, last_used=1_000_000_000)
+    get_dataset(1, last_used=2_000_000_000)
+    # using 0 again makes 1 the least recently used
+    get_dataset(0, last_used=3_000_000_000)
+    get_dataset(2, last_used=4_000_000_000)
+
+    assert sorted(os.listdir(tmp_path)) == sorted([keys[0], keys[2]])
+    assert builds == [keys[0], keys[1], keys[2]]
+
+    # an evicted dataset is built again, the least recently used one makes room
+    get_dataset(1, last_used=5_000_000_000)
+    assert sorted(os.listdir(tmp_path)) == sorted([keys[1], keys[2]])
+    assert builds == [keys[0], keys[1], keys[2], keys[1]]